@@ -0,0 +1,89 @@
+"""
+Benchmark the per-iteration cost of the CMAES explorer's covariance models.
+
+The search dimension is `len(starting_sequence) * len(alphabet)`, so we use the
+sequence lengths of the GFP and AAV problems from the landscape registries.
+By default the objective is a cheap stand-in for the model, so that the timings
+reflect the cost of cma's sampling and covariance updates rather than the model.
+Pass `--landscape` to score with the real ground truth landscape instead
+(requires the GFP model weights or the AAV data files).
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+import flexs
+from flexs import baselines
+from flexs.landscapes.additive_aav_packaging import AAV2_WT
+from flexs.utils import sequence_utils as s_utils
+
+
+class ConstantModel(flexs.Model):
+    def __init__(self, landscape=None):
+        super().__init__("ConstantModel")
+        self.landscape = landscape
+
+    def _fitness_function(self, sequences):
+        if self.landscape is not None:
+            return self.landscape.get_fitness(sequences)
+        return np.zeros(len(sequences))
+
+    def train(self, sequences, labels):
+        pass
+
+
+def problems(use_landscape):
+    gfp_start = flexs.landscapes.BertGFPBrightness.starts["ed_10_wt"]
+    aav_params = flexs.landscapes.additive_aav_packaging.registry()["heart"]["params"]
+    aav_start = AAV2_WT[aav_params["start"] : aav_params["end"]]
+
+    gfp_landscape = aav_landscape = None
+    if use_landscape:
+        gfp_landscape = flexs.landscapes.BertGFPBrightness()
+        aav_landscape = flexs.landscapes.AdditiveAAVPackaging(**aav_params)
+
+    return {
+        "gfp": (gfp_start, gfp_landscape),
+        "aav_heart": (aav_start, aav_landscape),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--population_size", type=int, default=15)
+    parser.add_argument("--landscape", action="store_true")
+    args = parser.parse_args()
+
+    for problem_name, (start, landscape) in problems(args.landscape).items():
+        for covariance in ["full", "diagonal", "vd"]:
+            explorer = baselines.explorers.CMAES(
+                ConstantModel(landscape),
+                rounds=1,
+                sequences_batch_size=args.population_size,
+                model_queries_per_batch=args.population_size * args.iterations,
+                starting_sequence=start,
+                alphabet=s_utils.AAS,
+                population_size=args.population_size,
+                max_iter=args.iterations,
+                covariance=covariance,
+            )
+
+            measured_sequences = pd.DataFrame(
+                {"sequence": [start], "true_score": [0.0], "round": [0]}
+            )
+            start_time = time.time()
+            explorer.propose_sequences(measured_sequences)
+            elapsed = time.time() - start_time
+
+            print(
+                f"{problem_name} (dim={len(start) * len(s_utils.AAS)}), "
+                f"covariance={covariance}: "
+                f"{1000 * elapsed / args.iterations:.1f}ms per iteration"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Benchmark VAE and KerasModel throughput with and without eager execution.
+
+`VAE` used to call `tf.config.run_functions_eagerly(True)`, which disabled
+`tf.function` compilation for every keras model in the process. This script
+times the same workloads with functions run eagerly (the old behaviour) and
+compiled into graphs (the current behaviour).
+"""
+import argparse
+import time
+
+import numpy as np
+import tensorflow as tf
+
+from flexs import baselines
+from flexs.utils import sequence_utils as s_utils
+
+
+def time_vae(seq_len, num_samples, epochs):
+    vae = baselines.explorers.VAE(
+        seq_len, s_utils.AAS, batch_size=100, epochs=epochs, verbose=False
+    )
+    samples = s_utils.generate_random_sequences(seq_len, num_samples, s_utils.AAS)
+    one_hots = vae.one_hot_encode(samples)
+
+    start_time = time.time()
+    vae.fit(one_hots, np.ones(num_samples))
+    vae.generate(num_samples, set(), None)
+    return num_samples / (time.time() - start_time)
+
+
+def time_keras_model(model, seq_len, num_samples):
+    samples = s_utils.generate_random_sequences(seq_len, num_samples, s_utils.AAS)
+    labels = np.random.random(num_samples)
+
+    start_time = time.time()
+    model.train(samples, labels)
+    model.get_fitness(samples)
+    return num_samples / (time.time() - start_time)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seq_len", type=int, default=90)
+    parser.add_argument("--num_samples", type=int, default=2000)
+    parser.add_argument("--epochs", type=int, default=5)
+    args = parser.parse_args()
+
+    for run_eagerly in [True, False]:
+        tf.config.run_functions_eagerly(run_eagerly)
+
+        workloads = {
+            "VAE": lambda: time_vae(args.seq_len, args.num_samples, args.epochs),
+            "MLP": lambda: time_keras_model(
+                baselines.models.MLP(
+                    args.seq_len, 200, s_utils.AAS, epochs=args.epochs
+                ),
+                args.seq_len,
+                args.num_samples,
+            ),
+            "CNN": lambda: time_keras_model(
+                baselines.models.CNN(
+                    args.seq_len, 32, 100, s_utils.AAS, epochs=args.epochs
+                ),
+                args.seq_len,
+                args.num_samples,
+            ),
+        }
+
+        for name, workload in workloads.items():
+            print(
+                f"{name}, run_functions_eagerly={run_eagerly}: "
+                f"{workload():.0f} samples/s"
+            )
+
+
+if __name__ == "__main__":
+    main()
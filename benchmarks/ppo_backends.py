@@ -0,0 +1,88 @@
+"""
+Benchmark wall time per round of the PPO-based explorers with each PPO backend.
+
+Compares tf_agents' drivers, replay buffer and PPO agent against the in-repo
+`TorchPPOAgent`. The model and landscape are cheap random stand-ins, so the timings
+reflect the cost of environment stepping, policy evaluation and training rather
+than fitness queries.
+"""
+import argparse
+import time
+
+import numpy as np
+
+import flexs
+from flexs import baselines
+from flexs.utils import sequence_utils as s_utils
+
+
+class RandomModel(flexs.Model):
+    def __init__(self):
+        super().__init__("RandomModel")
+
+    def _fitness_function(self, sequences):
+        return np.random.random(len(sequences))
+
+    def train(self, sequences, labels):
+        pass
+
+
+class RandomLandscape(flexs.Landscape):
+    def __init__(self):
+        super().__init__("RandomLandscape")
+
+    def _fitness_function(self, sequences):
+        return np.random.random(len(sequences))
+
+
+def make_explorer(name, backend, args):
+    kwargs = dict(
+        rounds=args.rounds,
+        sequences_batch_size=args.sequences_batch_size,
+        model_queries_per_batch=args.model_queries_per_batch,
+        starting_sequence=s_utils.generate_random_sequences(
+            args.seq_len, 1, s_utils.RNAA
+        )[0],
+        alphabet=s_utils.RNAA,
+        env_batch_size=args.env_batch_size,
+        backend=backend,
+    )
+
+    if name == "PPO":
+        return baselines.explorers.PPO(model=RandomModel(), **kwargs)
+    if name == "DynaPPO":
+        return baselines.explorers.DynaPPO(
+            landscape=RandomLandscape(), model=RandomModel(), **kwargs
+        )
+    return baselines.explorers.DynaPPOMutative(
+        landscape=RandomLandscape(), model=RandomModel(), **kwargs
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--seq_len", type=int, default=20)
+    parser.add_argument("--sequences_batch_size", type=int, default=100)
+    parser.add_argument("--model_queries_per_batch", type=int, default=1000)
+    parser.add_argument("--env_batch_size", type=int, default=16)
+    args = parser.parse_args()
+
+    for name in ["PPO", "DynaPPO", "DynaPPOMutative"]:
+        for backend in ["tf_agents", "torch"]:
+            start_time = time.time()
+            explorer = make_explorer(name, backend, args)
+            setup_time = time.time() - start_time
+
+            start_time = time.time()
+            explorer.run(RandomLandscape(), verbose=False)
+            elapsed = time.time() - start_time
+
+            print(
+                f"{name}, backend={backend}: setup {setup_time:.1f}s, "
+                f"{elapsed / args.rounds:.2f}s per round"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -5,6 +5,7 @@ from flexs import types  # isort:skip  # noqa: F401
 from flexs.landscape import Landscape  # isort:skip  # noqa: F401
 from flexs.model import Model, LandscapeAsModel  # isort:skip  # noqa: F401
 from flexs.ensemble import Ensemble  # isort:skip  # noqa: F401
+from flexs.model_cache import ModelCache, CachedModel  # isort:skip  # noqa: F401
 from flexs.explorer import Explorer  # isort:skip  # noqa: F401
 
 
@@ -7,6 +7,7 @@ import pandas as pd
 
 import flexs
 from flexs.utils import sequence_utils as s_utils
+from flexs.utils.candidate_pool import CandidatePool
 
 
 class Adalead(flexs.Explorer):
@@ -110,9 +111,21 @@ class Adalead(flexs.Explorer):
             self.sequences_batch_size,
         )
 
-        sequences = {}
+        # Every child scored this round, for deduplication, and the best of them
+        seen_children = set()
+        sequences = CandidatePool(
+            self.sequences_batch_size, exclude=measured_sequence_set
+        )
         previous_model_cost = self.model.cost
-        while self.model.cost - previous_model_cost < self.model_queries_per_batch:
+
+        def out_of_time():
+            # Keep going until there is at least one sequence to propose
+            return len(sequences) > 0 and self.time_budget_spent()
+
+        while (
+            self.model.cost - previous_model_cost < self.model_queries_per_batch
+            and not out_of_time()
+        ):
             # generate recombinant mutants
             for i in range(self.rho):
                 parents = self._recombine_population(parents)
@@ -128,6 +141,7 @@ class Adalead(flexs.Explorer):
                     len(nodes) > 0
                     and self.model.cost - previous_model_cost + self.eval_batch_size
                     < self.model_queries_per_batch
+                    and not out_of_time()
                 ):
                     child_idxs = []
                     children = []
@@ -144,7 +158,7 @@ class Adalead(flexs.Explorer):
                         # before
                         if (
                             child not in measured_sequence_set
-                            and child not in sequences
+                            and child not in seen_children
                         ):
                             child_idxs.append(idx)
                             children.append(child)
@@ -154,7 +168,8 @@ class Adalead(flexs.Explorer):
                     # Otherwise, set node = child and add child to the list
                     # of sequences to propose.
                     fitnesses = self.model.get_fitness(children)
-                    sequences.update(zip(children, fitnesses))
+                    seen_children.update(children)
+                    sequences.add(children, fitnesses)
 
                     nodes = []
                     for idx, child, fitness in zip(child_idxs, children, fitnesses):
@@ -168,8 +183,4 @@ class Adalead(flexs.Explorer):
             )
 
         # We propose the top `self.sequences_batch_size` new sequences we have generated
-        new_seqs = np.array(list(sequences.keys()))
-        preds = np.array(list(sequences.values()))
-        sorted_order = np.argsort(preds)[: -self.sequences_batch_size : -1]
-
-        return new_seqs[sorted_order], preds[sorted_order]
+        return sequences.top()
@@ -1,14 +1,16 @@
 """BO explorer."""
-from bisect import bisect_left
+import concurrent.futures
+import multiprocessing
 from typing import Optional, Tuple
 
 import numpy as np
 import pandas as pd
 
 import flexs
+from flexs.baselines.models.stacked_ensemble import StackedEnsemble
+from flexs.utils import sequence_utils as s_utils
 from flexs.utils.replay_buffers import PrioritizedReplayBuffer
 from flexs.utils.sequence_utils import (
-    construct_mutant_from_sample,
     generate_random_sequences,
     one_hot_to_string,
     string_to_one_hot,
@@ -42,6 +44,7 @@ class BO(flexs.Explorer):
         log_file: Optional[str] = None,
         method: str = "EI",
         recomb_rate: float = 0,
+        num_chains: int = 1,
     ):
         """
         Args:
@@ -49,10 +52,17 @@ class BO(flexs.Explorer):
                 default EI.
             recomb_rate: The recombination rate on the previous batch before
                 BO proposes samples, default 0.
+            num_chains: Number of BO chains advanced in lockstep. The candidate
+                actions of all chains are scored with a single model call.
 
         """
+        if num_chains < 1:
+            raise ValueError("`num_chains` must be at least 1")
+
         name = f"BO_method={method}"
-        if not isinstance(model, flexs.Ensemble):
+        if num_chains > 1:
+            name += f"_chains={num_chains}"
+        if not isinstance(model, (flexs.Ensemble, StackedEnsemble)):
             model = flexs.Ensemble([model], combine_with=lambda x: x)
 
         super().__init__(
@@ -67,16 +77,21 @@ class BO(flexs.Explorer):
         self.alphabet = alphabet
         self.method = method
         self.recomb_rate = recomb_rate
+        self.num_chains = num_chains
         self.best_fitness = 0
         self.num_actions = 0
-        self.state = None
+        self.states = None
         self.seq_len = None
         self.memory = None
         self.initial_uncertainty = None
 
     def initialize_data_structures(self):
         """Initialize."""
-        self.state = string_to_one_hot(self.starting_sequence, self.alphabet)
+        self.states = np.repeat(
+            s_utils.sequences_to_indices([self.starting_sequence], self.alphabet),
+            self.num_chains,
+            axis=0,
+        )
         self.seq_len = len(self.starting_sequence)
         # use PER buffer, same as in DQN
         self.memory = PrioritizedReplayBuffer(
@@ -85,6 +100,8 @@ class BO(flexs.Explorer):
 
     def train_models(self):
         """Train the model."""
+        if len(self.memory) == 0:
+            return
         if len(self.memory) >= self.sequences_batch_size:
             batch = self.memory.sample_batch()
         else:
@@ -123,125 +140,166 @@ class BO(flexs.Explorer):
         return ret
 
     def EI(self, vals):
-        """Compute expected improvement."""
-        return np.mean([max(val - self.best_fitness, 0) for val in vals])
+        """Compute expected improvement over the last axis of ensemble predictions."""
+        return np.mean(np.maximum(vals - self.best_fitness, 0), axis=-1)
 
     @staticmethod
     def UCB(vals):
-        """Upper confidence bound."""
+        """Upper confidence bound over the last axis of ensemble predictions."""
         discount = 0.01
-        return np.mean(vals) - discount * np.std(vals)
+        return np.mean(vals, axis=-1) - discount * np.std(vals, axis=-1)
 
     def sample_actions(self):
-        """Sample actions resulting in sequences to screen."""
-        actions = set()
-        pos_changes = []
-        for pos in range(self.seq_len):
-            pos_changes.append([])
-            for res in range(len(self.alphabet)):
-                if self.state[pos, res] == 0:
-                    pos_changes[pos].append((pos, res))
-
-        while len(actions) < self.model_queries_per_batch / self.sequences_batch_size:
-            action = []
-            for pos in range(self.seq_len):
-                if np.random.random() < 1 / self.seq_len:
-                    pos_tuple = pos_changes[pos][
-                        np.random.randint(len(self.alphabet) - 1)
-                    ]
-                    action.append(pos_tuple)
-            if len(action) > 0 and tuple(action) not in actions:
-                actions.add(tuple(action))
-        return list(actions)
+        """
+        Sample actions resulting in sequences to screen.
+
+        Returns:
+            An integer array of shape `(num_chains, num_actions, seq_len)` holding,
+            for each position, the offset (modulo alphabet size) added to the
+            residue index of the chain's state. Zero means no change. Every action
+            changes at least one position and actions are unique within a chain.
+
+        """
+        alphabet_len = len(self.alphabet)
+        num_actions = max(self.model_queries_per_batch // self.sequences_batch_size, 1)
+        actions = np.zeros((self.num_chains, num_actions, self.seq_len), dtype=int)
+
+        for chain in range(self.num_chains):
+            chain_actions = np.zeros((0, self.seq_len), dtype=int)
+            while len(chain_actions) < num_actions:
+                size = (2 * num_actions, self.seq_len)
+                offsets = np.random.randint(1, alphabet_len, size=size)
+                offsets *= np.random.random(size=size) < 1 / self.seq_len
+                offsets = offsets[offsets.any(axis=1)]
+
+                # Deduplicate while keeping the sampling order
+                chain_actions = np.concatenate([chain_actions, offsets])
+                _, first = np.unique(
+                    s_utils.hash_indices(chain_actions), return_index=True
+                )
+                chain_actions = chain_actions[np.sort(first)]
+
+            actions[chain] = chain_actions[:num_actions]
+
+        return actions
 
     def pick_action(self, all_measured_seqs):
-        """Pick action."""
-        state = self.state.copy()
+        """
+        Advance every chain by one action.
+
+        Returns:
+            Ensemble standard deviation of the picked candidate, new sequence and
+            its predicted fitness, for each chain.
+
+        """
+        alphabet_len = len(self.alphabet)
+        states = self.states
         actions = self.sample_actions()
-        actions_to_screen = []
-        states_to_screen = []
-        for i in range(self.model_queries_per_batch // self.sequences_batch_size):
-            x = np.zeros((self.seq_len, len(self.alphabet)))
-            for action in actions[i]:
-                x[action] = 1
-            actions_to_screen.append(x)
-            state_to_screen = construct_mutant_from_sample(x, state)
-            states_to_screen.append(one_hot_to_string(state_to_screen, self.alphabet))
-        ensemble_preds = self.model.get_fitness(states_to_screen)
+        num_actions = actions.shape[1]
+
+        candidates = (states[:, None, :] + actions) % alphabet_len
+        candidate_seqs = s_utils.indices_to_sequences(
+            candidates.reshape(-1, self.seq_len), self.alphabet
+        ).reshape(self.num_chains, num_actions)
+        ensemble_preds = self.model.get_fitness(candidate_seqs.ravel()).reshape(
+            self.num_chains, num_actions, -1
+        )
         method_pred = (
-            [self.EI(vals) for vals in ensemble_preds]
-            if self.method == "EI"
-            else [self.UCB(vals) for vals in ensemble_preds]
+            self.EI(ensemble_preds) if self.method == "EI" else self.UCB(ensemble_preds)
         )
-        action_ind = np.argmax(method_pred)
-        uncertainty = np.std(method_pred[action_ind])
-        action = actions_to_screen[action_ind]
-        new_state_string = states_to_screen[action_ind]
-        self.state = string_to_one_hot(new_state_string, self.alphabet)
-        new_state = self.state
-        reward = np.mean(ensemble_preds[action_ind])
-        if new_state_string not in all_measured_seqs:
-            self.best_fitness = max(self.best_fitness, reward)
-            self.memory.store(state.ravel(), action.ravel(), reward, new_state.ravel())
+
+        chains = np.arange(self.num_chains)
+        action_inds = np.argmax(method_pred, axis=1)
+        picked_preds = ensemble_preds[chains, action_inds]
+        uncertainties = np.std(picked_preds, axis=1)
+        rewards = np.mean(picked_preds, axis=1)
+        new_state_strings = candidate_seqs[chains, action_inds]
+        self.states = candidates[chains, action_inds]
+
+        one_hots = np.eye(alphabet_len)
+        for chain in chains:
+            if new_state_strings[chain] in all_measured_seqs:
+                continue
+            self.best_fitness = max(self.best_fitness, rewards[chain])
+            changed = actions[chain, action_inds[chain]] != 0
+            action = one_hots[self.states[chain]] * changed[:, None]
+            self.memory.store(
+                one_hots[states[chain]].ravel(),
+                action.ravel(),
+                rewards[chain],
+                one_hots[self.states[chain]].ravel(),
+            )
         self.num_actions += 1
-        return uncertainty, new_state_string, reward
+        return uncertainties, new_state_strings, rewards
 
     @staticmethod
-    def Thompson_sample(measured_batch):
-        """Pick a sequence via Thompson sampling."""
-        fitnesses = np.cumsum([np.exp(10 * x[0]) for x in measured_batch])
-        fitnesses = fitnesses / fitnesses[-1]
-        x = np.random.uniform()
-        index = bisect_left(fitnesses, x)
-        sequences = [x[1] for x in measured_batch]
-        return sequences[index]
+    def Thompson_sample(measured_batch, num_samples=None):
+        """
+        Pick a sequence via Thompson sampling.
+
+        If `num_samples` is given, an array of `num_samples` sequences drawn
+        independently is returned instead.
+        """
+        fitnesses = np.array([x[0] for x in measured_batch], dtype=float)
+        # Subtract the max before exponentiating so large fitnesses do not overflow
+        weights = np.cumsum(np.exp(10 * (fitnesses - fitnesses.max())))
+        weights = weights / weights[-1]
+        indices = np.searchsorted(weights, np.random.uniform(size=num_samples))
+        sequences = np.array([x[1] for x in measured_batch])
+        return sequences[indices]
 
     def propose_sequences(
         self, measured_sequences: pd.DataFrame
     ) -> Tuple[np.ndarray, np.ndarray]:
         """Propose top `sequences_batch_size` sequences for evaluation."""
+        last_round_num = measured_sequences["round"].max()
+        last_batch = measured_sequences[measured_sequences["round"] == last_round_num]
+        last_batch_scores = dict(
+            zip(last_batch["sequence"].tolist(), last_batch["true_score"].tolist())
+        )
+        last_batch_seqs = list(last_batch_scores)
+        if self.recomb_rate > 0 and len(last_batch) > 1:
+            last_batch_seqs = self._recombine_population(last_batch_seqs)
+        unmeasured = [seq for seq in last_batch_seqs if seq not in last_batch_scores]
+        if len(unmeasured) > 0:
+            last_batch_scores.update(
+                zip(unmeasured, np.mean(self.model.get_fitness(unmeasured), axis=1))
+            )
+        measured_batch = sorted(
+            (last_batch_scores[seq], seq) for seq in last_batch_seqs
+        )
+
         if self.num_actions == 0:
             # indicates model was reset
             self.initialize_data_structures()
         else:
-            # set state to best measured sequence from prior batch
-            last_round_num = measured_sequences["round"].max()
-            last_batch = measured_sequences[
-                measured_sequences["round"] == last_round_num
-            ]
-            _last_batch_seqs = last_batch["sequence"].tolist()
-            _last_batch_true_scores = last_batch["true_score"].tolist()
-            last_batch_seqs = _last_batch_seqs
-            if self.recomb_rate > 0 and len(last_batch) > 1:
-                last_batch_seqs = self._recombine_population(last_batch_seqs)
-            measured_batch = []
-            for seq in last_batch_seqs:
-                if seq in _last_batch_seqs:
-                    measured_batch.append(
-                        (_last_batch_true_scores[_last_batch_seqs.index(seq)], seq)
-                    )
-                else:
-                    measured_batch.append((np.mean(self.model.get_fitness([seq])), seq))
-            measured_batch = sorted(measured_batch)
-            sampled_seq = self.Thompson_sample(measured_batch)
-            self.state = string_to_one_hot(sampled_seq, self.alphabet)
+            # set state to Thompson sampled measured sequences from prior batch
+            sampled_seqs = self.Thompson_sample(measured_batch, self.num_chains)
+            self.states = s_utils.sequences_to_indices(sampled_seqs, self.alphabet)
+
         # generate next batch by picking actions
-        self.initial_uncertainty = None
+        self.initial_uncertainty = np.full(self.num_chains, np.nan)
         samples = set()
         prev_cost = self.model.cost
         all_measured_seqs = set(measured_sequences["sequence"].tolist())
-        while self.model.cost - prev_cost < self.model_queries_per_batch:
-            uncertainty, new_state_string, _ = self.pick_action(all_measured_seqs)
-            all_measured_seqs.add(new_state_string)
-            samples.add(new_state_string)
-            if self.initial_uncertainty is None:
-                self.initial_uncertainty = uncertainty
-            if uncertainty > 2 * self.initial_uncertainty:
-                # reset sequence to starting sequence if we're in territory that's too
-                # uncharted
-                sampled_seq = self.Thompson_sample(measured_batch)
-                self.state = string_to_one_hot(sampled_seq, self.alphabet)
-                self.initial_uncertainty = None
+        while self.model.cost - prev_cost < self.model_queries_per_batch and not (
+            len(samples) > 0 and self.time_budget_spent()
+        ):
+            uncertainties, new_state_strings, _ = self.pick_action(all_measured_seqs)
+            all_measured_seqs.update(new_state_strings)
+            samples.update(new_state_strings)
+
+            unset = np.isnan(self.initial_uncertainty)
+            self.initial_uncertainty[unset] = uncertainties[unset]
+            # reset chains to a measured sequence if they are in territory that's
+            # too uncharted
+            reset = uncertainties > 2 * self.initial_uncertainty
+            if reset.any():
+                sampled_seqs = self.Thompson_sample(measured_batch, reset.sum())
+                self.states[reset] = s_utils.sequences_to_indices(
+                    sampled_seqs, self.alphabet
+                )
+                self.initial_uncertainty[reset] = np.nan
 
         if len(samples) < self.sequences_batch_size:
             random_sequences = generate_random_sequences(
@@ -257,6 +315,101 @@ class BO(flexs.Explorer):
         return samples, preds
 
 
+def _acquisition_values(
+    preds: np.ndarray, method: str, rng: np.random.Generator
+) -> np.ndarray:
+    """Compute acquisition values of ensemble predictions (num_seqs, num_models)."""
+    preds = np.asarray(preds)
+    if preds.ndim == 1:
+        mu, sigma = preds, np.zeros_like(preds)
+    else:
+        mu, sigma = np.mean(preds, axis=1), np.std(preds, axis=1)
+
+    if method == "Greedy":
+        return mu
+    if method == "UCB":
+        return mu + 0.01 * sigma
+    # Then method == "Thompson"
+    return rng.normal(mu, sigma)
+
+
+def _top_k_in_range(
+    model: flexs.Model,
+    alphabet: str,
+    seq_len: int,
+    start: int,
+    stop: int,
+    k: int,
+    method: str,
+    chunk_size: int,
+    excluded_indices: np.ndarray,
+    seed: int,
+) -> Tuple[np.ndarray, np.ndarray, int]:
+    """
+    Score sequences `start` to `stop` of the sequence space and keep the top `k`.
+
+    Sequences are identified by their base-`len(alphabet)` index in the space,
+    and are generated and scored in chunks of `chunk_size` with one batched model
+    call per chunk, so memory use is O(chunk_size + k).
+
+    Returns:
+        Acquisition values and indices of the top `k` sequences, and the number
+        of model queries made.
+
+    """
+    rng = np.random.default_rng(seed)
+    place_values = len(alphabet) ** np.arange(seq_len - 1, -1, -1, dtype=np.int64)
+
+    top_values = np.zeros(0)
+    top_indices = np.zeros(0, dtype=np.int64)
+    num_scored = 0
+    for chunk_start in range(start, stop, chunk_size):
+        indices = np.arange(chunk_start, min(chunk_start + chunk_size, stop))
+        indices = indices[~np.isin(indices, excluded_indices)]
+        if len(indices) == 0:
+            continue
+
+        codes = (indices[:, None] // place_values) % len(alphabet)
+        preds = model.get_fitness(s_utils.indices_to_sequences(codes, alphabet))
+        num_scored += len(indices)
+
+        values = _acquisition_values(preds, method, rng)
+        top_values = np.concatenate([top_values, values])
+        top_indices = np.concatenate([top_indices, indices])
+        if len(top_values) > k:
+            top = np.argpartition(-top_values, k - 1)[:k]
+            top_values, top_indices = top_values[top], top_indices[top]
+
+    return top_values, top_indices, num_scored
+
+
+# Arguments shared by every range scored in a worker, set by `_init_top_k_worker`
+_worker_args = None
+
+
+def _init_top_k_worker(
+    model, alphabet, seq_len, k, method, chunk_size, excluded_indices
+):
+    global _worker_args
+    _worker_args = (model, alphabet, seq_len, k, method, chunk_size, excluded_indices)
+
+
+def _top_k_in_worker_range(start, stop, seed):
+    model, alphabet, seq_len, k, method, chunk_size, excluded_indices = _worker_args
+    return _top_k_in_range(
+        model,
+        alphabet,
+        seq_len,
+        start,
+        stop,
+        k,
+        method,
+        chunk_size,
+        excluded_indices,
+        seed,
+    )
+
+
 class GPR_BO(flexs.Explorer):
     """Explorer using GP-based Bayesian Optimization.
 
@@ -278,8 +431,19 @@ class GPR_BO(flexs.Explorer):
         alphabet,
         log_file=None,
         seq_proposal_method="Thompson",
+        chunk_size=4096,
+        num_workers=1,
     ):
-        """Initialize the explorer."""
+        """
+        Initialize the explorer.
+
+        Args:
+            seq_proposal_method: One of "Thompson", "Greedy" or "UCB".
+            chunk_size: Number of sequences enumerated and scored per model call.
+            num_workers: Number of processes to split the enumeration across.
+                If greater than 1, `model` must be picklable.
+
+        """
         name = f"GPR_BO_Explorer-seq_proposal_method={seq_proposal_method}"
         super().__init__(
             model,
@@ -293,105 +457,140 @@ class GPR_BO(flexs.Explorer):
         self.alphabet = alphabet
         self.alphabet_len = len(alphabet)
         self.seq_proposal_method = seq_proposal_method
+        self.chunk_size = chunk_size
+        self.num_workers = num_workers
         self.best_fitness = 0
         self.top_sequence = []
 
         self.seq_len = len(starting_sequence)
         self.maxima = None
 
+        if self.alphabet_len**self.seq_len >= 2**62:
+            raise ValueError("Sequence space is too large to enumerate")
+
     def reset(self):
         """Reset."""
         self.best_fitness = 0
         self._reset = True
 
-    def propose_sequences_via_thompson(self):
-        """Propose a batch of new sequences.
-        Based on Thompson sampling with a Gaussian posterior.
+    def _propose_top_k(self, method, measured_sequences=None):
         """
-        print("Enumerating all sequences in the space.")
-
-        self.maxima = []
-
-        def enum_and_eval(curr_seq):
-            # if we have a full sequence, then let's evaluate
-            if len(curr_seq) == self.seq_len:
-                mus = self.model.get_fitness(curr_seq)
-                mu, sigma = np.mean(mus), np.std(mus)
-                estimated_fitness = np.random.normal(mu, sigma)
-                self.maxima.append([estimated_fitness, curr_seq])
-            else:
-                for char in list(self.alphabet):
-                    enum_and_eval(curr_seq + char)
+        Enumerate and score the whole sequence space, keeping only the
+        `sequences_batch_size` sequences with highest acquisition value that have
+        not been measured yet.
 
-        enum_and_eval("")
+        Returns:
+            A list of `[acquisition_value, sequence]` sorted in descending order.
 
-        # Sort descending based on the value.
-        return sorted(self.maxima, reverse=True, key=lambda x: x[0])
-
-    def propose_sequences_via_greedy(self):
-        """Propose a batch of new sequences.
-
-        Based on greedy in the expectation of the Gaussian posterior.
         """
         print("Enumerating all sequences in the space.")
 
-        self.maxima = []
+        excluded_indices = np.zeros(0, dtype=np.int64)
+        if measured_sequences is not None and len(measured_sequences) > 0:
+            place_values = self.alphabet_len ** np.arange(
+                self.seq_len - 1, -1, -1, dtype=np.int64
+            )
+            excluded_indices = (
+                s_utils.sequences_to_indices(measured_sequences, self.alphabet)
+                @ place_values
+            )
+
+        space_size = self.alphabet_len**self.seq_len
+        k = self.sequences_batch_size
+        if self.num_workers <= 1:
+            top_values, top_indices, _ = _top_k_in_range(
+                self.model,
+                self.alphabet,
+                self.seq_len,
+                0,
+                space_size,
+                k,
+                method,
+                self.chunk_size,
+                excluded_indices,
+                np.random.randint(2**31),
+            )
+        else:
+            # Split the space into contiguous ranges scored in separate processes,
+            # then merge their top-k lists and model query counts back here
+            bounds = np.linspace(0, space_size, 4 * self.num_workers + 1)
+            bounds = bounds.astype(np.int64)
+            # Spawn rather than fork workers, as forking after TensorFlow or
+            # PyTorch have started their thread pools can deadlock
+            with concurrent.futures.ProcessPoolExecutor(
+                self.num_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_top_k_worker,
+                initargs=(
+                    self.model,
+                    self.alphabet,
+                    self.seq_len,
+                    k,
+                    method,
+                    self.chunk_size,
+                    excluded_indices,
+                ),
+            ) as executor:
+                futures = [
+                    executor.submit(
+                        _top_k_in_worker_range, start, stop, np.random.randint(2**31)
+                    )
+                    for start, stop in zip(bounds[:-1], bounds[1:])
+                ]
+                results = [future.result() for future in futures]
 
-        def enum_and_eval(curr_seq):
-            # if we have a full sequence, then let's evaluate
-            if len(curr_seq) == self.seq_len:
-                mus = self.model.get_fitness(curr_seq)
-                mu = np.mean(mus)
-                self.maxima.append([mu, curr_seq])
-            else:
-                for char in list(self.alphabet):
-                    enum_and_eval(curr_seq + char)
+            top_values = np.concatenate([values for values, _, _ in results])
+            top_indices = np.concatenate([indices for _, indices, _ in results])
+            self.model.cost += sum(num_scored for _, _, num_scored in results)
 
-        enum_and_eval("")
+        sorted_order = np.argsort(top_values)[::-1][:k]
+        top_values, top_indices = top_values[sorted_order], top_indices[sorted_order]
 
-        # Sort descending based on the value.
-        return sorted(self.maxima, reverse=True, key=lambda x: x[0])
+        place_values = self.alphabet_len ** np.arange(
+            self.seq_len - 1, -1, -1, dtype=np.int64
+        )
+        top_seqs = s_utils.indices_to_sequences(
+            (top_indices[:, None] // place_values) % self.alphabet_len, self.alphabet
+        )
+
+        self.maxima = [[value, seq] for value, seq in zip(top_values, top_seqs)]
+        return self.maxima
 
-    def propose_sequences_via_ucb(self):
+    def propose_sequences_via_thompson(self, measured_sequences=None):
         """Propose a batch of new sequences.
-        Based on upper confidence bound.
+        Based on Thompson sampling with a Gaussian posterior.
         """
-        print("Enumerating all sequences in the space.")
+        return self._propose_top_k("Thompson", measured_sequences)
 
-        self.maxima = []
-
-        def enum_and_eval(curr_seq):
-            # if we have a full sequence, then let's evaluate
-            if len(curr_seq) == self.seq_len:
-                mus = self.model.get_fitness(curr_seq)
-                mu, sigma = np.mean(mus), np.std(mus)
-                self.maxima.append([mu + 0.01 * sigma, curr_seq])
-            else:
-                for char in list(self.alphabet):
-                    enum_and_eval(curr_seq + char)
+    def propose_sequences_via_greedy(self, measured_sequences=None):
+        """Propose a batch of new sequences.
 
-        enum_and_eval("")
+        Based on greedy in the expectation of the Gaussian posterior.
+        """
+        return self._propose_top_k("Greedy", measured_sequences)
 
-        # Sort descending based on the value.
-        return sorted(self.maxima, reverse=True, key=lambda x: x[0])
+    def propose_sequences_via_ucb(self, measured_sequences=None):
+        """Propose a batch of new sequences.
+        Based on upper confidence bound.
+        """
+        return self._propose_top_k("UCB", measured_sequences)
 
     def propose_sequences(
         self, measured_sequences: pd.DataFrame
     ) -> Tuple[np.ndarray, np.ndarray]:
         """Propose `batch_size` samples."""
-        samples = set()
-        # TODO: Add UCB and Thompson proposal methods
+        samples = []
         seq_proposal_funcs = {
             "Greedy": self.propose_sequences_via_greedy,
             "Thompson": self.propose_sequences_via_thompson,
             "UCB": self.propose_sequences_via_ucb,
         }
         seq_proposal_func = seq_proposal_funcs[self.seq_proposal_method]
-        new_seqs = seq_proposal_func()
+        all_measured_seqs = set(measured_sequences["sequence"].values)
+        new_seqs = seq_proposal_func(list(all_measured_seqs))
         new_states = []
         new_fitnesses = []
         i = 0
-        all_measured_seqs = set(measured_sequences["sequence"].values)
         while (len(new_states) < self.sequences_batch_size) and i < len(new_seqs):
             new_fitness, new_seq = new_seqs[i]
             if new_seq not in all_measured_seqs:
@@ -399,7 +598,7 @@ class GPR_BO(flexs.Explorer):
                 if new_fitness >= self.best_fitness:
                     self.top_sequence.append((new_fitness, new_state, self.model.cost))
                     self.best_fitness = new_fitness
-                samples.add(new_seq)
+                samples.append(new_seq)
                 all_measured_seqs.add(new_seq)
                 new_states.append(new_state)
                 new_fitnesses.append(new_fitness)
@@ -407,4 +606,4 @@ class GPR_BO(flexs.Explorer):
 
         print("Current best fitness:", self.best_fitness)
 
-        return list(samples), new_fitnesses
+        return np.array(samples), np.array(new_fitnesses)
@@ -7,6 +7,8 @@ import pandas as pd
 
 import flexs
 from flexs.utils import sequence_utils as s_utils
+from flexs.utils.candidate_pool import CandidatePool
+from flexs.utils.replay_buffers import WeightedSampleBuffer
 from flexs.utils.VAE_utils import VAE
 
 
@@ -27,6 +29,7 @@ class CbAS(flexs.Explorer):
         cycle_batch_size: int = 100,
         mutation_rate: float = 0.2,
         log_file: Optional[str] = None,
+        replay_size: Optional[int] = None,
     ):
         """
         Explorer which implements Conditioning by Adaptive Sampling (CbAS)
@@ -41,6 +44,10 @@ class CbAS(flexs.Explorer):
             Q: Percentile used as fitness threshold.
             cycle_batch_size: Number of sequences to propose per cycle.
             mutation_rate: Probability of mutation per residue.
+            replay_size: If None, the generator is retrained on the whole weighted
+                sample pool every cycle. Otherwise, it is trained only on the new
+                cycle's samples plus `replay_size` previous samples (with non-zero
+                weight) drawn at random from the pool.
 
         """
         name = f"{algo}_Q={Q}_generator={generator.name}"
@@ -63,6 +70,7 @@ class CbAS(flexs.Explorer):
         self.Q = Q  # percentile used as the fitness threshold
         self.cycle_batch_size = cycle_batch_size
         self.mutation_rate = mutation_rate
+        self.replay_size = replay_size
 
     def _extend_samples(self, samples, weights):
         # generate random seqs around the input seq if the sample size is too small
@@ -119,40 +127,34 @@ class CbAS(flexs.Explorer):
         initial_batch, initial_weights = self._extend_samples(
             initial_batch, initial_weights
         )
-        all_samples_and_weights = tuple((initial_batch, initial_weights))
+
+        # All samples (and their weights) that the generator is trained on are kept
+        # one-hot encoded in a growable buffer, along with a set of the sample
+        # strings to reject repeated proposals
+        initial_one_hots = self.generator.one_hot_encode(initial_batch)
+        all_samples_and_weights = WeightedSampleBuffer(initial_one_hots.shape[1])
+        all_samples_and_weights.add(initial_one_hots, initial_weights)
+        all_samples = set(initial_batch)
 
         # this will be the current state of the generator
-        self.generator.train_model(initial_batch, initial_weights)
-
-        # save the weights of the initial vae and save it as vae_0:
-        # there are issues with keras model saving and loading,
-        # so we have to recompile it
-        generator_0 = VAE(
-            seq_length=self.generator.seq_length,
-            alphabet=self.generator.alphabet,
-            batch_size=self.generator.batch_size,
-            latent_dim=self.generator.latent_dim,
-            intermediate_dim=self.generator.intermediate_dim,
-            epochs=self.generator.epochs,
-            epsilon_std=self.generator.epsilon_std,
-            beta=self.generator.beta,
-            validation_split=self.generator.validation_split,
-            verbose=self.generator.verbose,
-        )
-        original_weights = self.generator.vae.get_weights()
-        generator_0.vae.set_weights(original_weights)
-        vae_0 = generator_0.vae
+        self.generator.fit(initial_one_hots, initial_weights)
+
+        # save a frozen snapshot of the initial vae's weights (vae_0), which are
+        # swapped in to compute importance weights
+        weights_0 = self.generator.vae.get_weights()
 
-        sequences = {}
+        sequences = CandidatePool(self.sequences_batch_size)
         previous_model_cost = self.model.cost
-        while self.model.cost - previous_model_cost < self.model_queries_per_batch:
-            # generate new samples using the generator (second argument is a list of all
+        while (
+            self.model.cost - previous_model_cost < self.model_queries_per_batch
+            and not (len(sequences) > 0 and self.time_budget_spent())
+        ):
+            # generate new samples using the generator (second argument is a set of all
             # existing measured and proposed seqs)
-            proposals = []
             proposals = self.generator.generate(
                 self.cycle_batch_size,
-                all_samples_and_weights[0],
-                all_samples_and_weights[1],
+                all_samples,
+                all_samples_and_weights.weights,
             )
 
             # calculate the scores of the new samples using the model
@@ -167,7 +169,7 @@ class CbAS(flexs.Explorer):
             if self.algo == "cbas":
                 # calculate the weights for the proposed batch
                 log_probs_0 = self.generator.calculate_log_probability(
-                    proposals, vae=vae_0
+                    proposals, weights=weights_0
                 )
                 log_probs_t = self.generator.calculate_log_probability(proposals)
 
@@ -181,21 +183,27 @@ class CbAS(flexs.Explorer):
             weights[scores < gamma] = 0
 
             # add proposed samples to the total sample pool
-            all_samples = np.append(all_samples_and_weights[0], proposals)
-            all_weights = np.append(all_samples_and_weights[1], weights)
-            all_samples_and_weights = (all_samples, all_weights)
-
-            # update the generator
-            # print('New training set size: ', len(all_samples_and_weights[0]))
-            self.generator.train_model(
-                all_samples_and_weights[0], all_samples_and_weights[1]
-            )
+            num_previous_samples = len(all_samples_and_weights)
+            proposal_one_hots = self.generator.one_hot_encode(proposals)
+            all_samples_and_weights.add(proposal_one_hots, weights)
+            all_samples.update(proposals)
+
+            # update the generator, either on the whole pool or only on the new
+            # samples plus a replayed subset of the previous ones
+            if self.replay_size is None:
+                self.generator.fit(
+                    all_samples_and_weights.samples, all_samples_and_weights.weights
+                )
+            else:
+                replay = all_samples_and_weights.sample_batch(
+                    self.replay_size, end=num_previous_samples
+                )
+                self.generator.fit(
+                    np.concatenate([proposal_one_hots, replay["samples"]]),
+                    np.concatenate([weights, replay["weights"]]),
+                )
 
-            sequences.update(zip(proposals, scores))
+            sequences.add(proposals, scores)
 
         # We propose the top `self.sequences_batch_size` new sequences we have generated
-        new_seqs = np.array(list(sequences.keys()))
-        preds = np.array(list(sequences.values()))
-        sorted_order = np.argsort(preds)[: -self.sequences_batch_size : -1]
-
-        return new_seqs[sorted_order], preds[sorted_order]
+        return sequences.top()
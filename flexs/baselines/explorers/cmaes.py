@@ -4,9 +4,11 @@ from typing import Optional, Tuple
 import cma
 import numpy as np
 import pandas as pd
+from cma.restricted_gaussian_sampler import GaussVDSampler
 
 import flexs
 from flexs.utils import sequence_utils as s_utils
+from flexs.utils.candidate_pool import CandidatePool
 
 
 class CMAES(flexs.Explorer):
@@ -19,6 +21,11 @@ class CMAES(flexs.Explorer):
     sequences for the objective function.
 
     http://blog.otoro.net/2017/10/29/visual-evolution-strategies/ is a helpful guide.
+
+    The relaxation has `len(starting_sequence) * len(alphabet)` dimensions, so for
+    long protein sequences a full covariance matrix is expensive to store and
+    update. The `covariance` argument selects a restricted covariance model whose
+    per-iteration cost is linear in the dimension instead.
     """
 
     def __init__(
@@ -32,15 +39,27 @@ class CMAES(flexs.Explorer):
         population_size: int = 15,
         max_iter: int = 400,
         initial_variance: float = 0.2,
+        covariance: str = "full",
         log_file: Optional[str] = None,
     ):
         """
         Args:
-            population_size: Number of proposed solutions per iteration.
+            population_size: Number of proposed solutions per iteration. Each
+                population is scored with a single batched model call, so larger
+                populations are cheap on models that predict in batches.
             max_iter: Maximum number of iterations.
             initial_variance: Initial variance passed into cma.
+            covariance: Covariance model used by cma. One of "full" (standard
+                CMA-ES), "diagonal" (sep-CMA-ES, diagonal covariance matrix) or
+                "vd" (VD-CMA-ES, diagonal plus rank-one covariance matrix).
         """
+        valid_covariances = ["full", "diagonal", "vd"]
+        if covariance not in valid_covariances:
+            raise ValueError(f"covariance must be one of {valid_covariances}")
+
         name = f"CMAES_popsize{population_size}"
+        if covariance != "full":
+            name += f"_covariance={covariance}"
 
         super().__init__(
             model,
@@ -56,15 +75,26 @@ class CMAES(flexs.Explorer):
         self.population_size = population_size
         self.max_iter = max_iter
         self.initial_variance = initial_variance
+        self.covariance = covariance
         self.round = 0
 
-    def _soln_to_string(self, soln):
-        x = soln.reshape((len(self.starting_sequence), len(self.alphabet)))
+    def _cma_options(self):
+        opts = {"popsize": self.population_size, "verbose": -9, "verb_log": 0}
 
-        one_hot = np.zeros(x.shape)
-        one_hot[np.arange(len(one_hot)), np.argmax(x, axis=1)] = 1
+        if self.covariance == "diagonal":
+            opts["CMA_diagonal"] = True
+        elif self.covariance == "vd":
+            opts = GaussVDSampler.extend_cma_options(opts)
 
-        return s_utils.one_hot_to_string(one_hot, self.alphabet)
+        return opts
+
+    def _solns_to_strings(self, solns):
+        """Decode a population of solutions into sequences with a single argmax."""
+        x = np.reshape(
+            solns, (len(solns), len(self.starting_sequence), len(self.alphabet))
+        )
+        residue_idxs = np.argmax(x, axis=2)
+        return s_utils.indices_to_sequences(residue_idxs, self.alphabet)
 
     def propose_sequences(
         self, measured_sequences: pd.DataFrame
@@ -74,49 +104,60 @@ class CMAES(flexs.Explorer):
             zip(measured_sequences["sequence"], measured_sequences["true_score"])
         )
 
-        # Keep track of new sequences generated this round
+        # Keep track of the best new sequences generated this round, and of the
+        # scores of this generation's members so repeats are not rescored
         top_idx = measured_sequences["true_score"].argmax()
         top_seq = measured_sequences["sequence"].to_numpy()[top_idx]
-        top_val = measured_sequences["true_score"].to_numpy()[top_idx]
-        sequences = {top_seq: top_val}
-
-        def objective_function(soln):
-            seq = self._soln_to_string(soln)
-
-            if seq in sequences:
-                return sequences[seq]
-            if seq in measured_sequence_dict:
-                return measured_sequence_dict[seq]
-
-            return self.model.get_fitness([seq]).item()
+        sequences = CandidatePool(
+            self.sequences_batch_size, exclude=measured_sequence_dict.keys()
+        )
+        previous_generation = {}
 
         # Starting solution gives equal weight to all residues at all positions
         x0 = s_utils.string_to_one_hot(top_seq, self.alphabet).flatten()
-        opts = {"popsize": self.population_size, "verbose": -9, "verb_log": 0}
-        es = cma.CMAEvolutionStrategy(x0, np.sqrt(self.initial_variance), opts)
+        es = cma.CMAEvolutionStrategy(
+            x0, np.sqrt(self.initial_variance), self._cma_options()
+        )
 
         # Explore until we reach `self.max_iter` or run out of model queries
         initial_cost = self.model.cost
         for _ in range(self.max_iter):
 
-            # Stop exploring if we will run out of model queries
+            # Stop exploring if we will run out of model queries or time
             current_cost = self.model.cost - initial_cost
             if current_cost + self.population_size > self.model_queries_per_batch:
                 break
+            if len(sequences) > 0 and self.time_budget_spent():
+                break
 
-            # `ask_and_eval` generates a new population of sequences
-            solutions, fitnesses = es.ask_and_eval(objective_function)
-            # `tell` updates model parameters
-            es.tell(solutions, fitnesses)
-
-            # Store scores of generated sequences
-            for soln, f in zip(solutions, fitnesses):
-                sequences[self._soln_to_string(soln)] = f
+            # `ask` generates a new population of solutions, which we decode all at once
+            solutions = es.ask()
+            population = self._solns_to_strings(solutions)
+
+            # Look up members we have already scored and batch the rest
+            # into a single model call
+            fitnesses = np.empty(len(population))
+            unseen = {}
+            for i, seq in enumerate(population):
+                if seq in sequences:
+                    fitnesses[i] = sequences.get(seq)
+                elif seq in previous_generation:
+                    fitnesses[i] = previous_generation[seq]
+                elif seq in measured_sequence_dict:
+                    fitnesses[i] = measured_sequence_dict[seq]
+                else:
+                    unseen.setdefault(seq, []).append(i)
+
+            if len(unseen) > 0:
+                unseen_seqs = list(unseen)
+                unseen_fitnesses = self.model.get_fitness(unseen_seqs)
+                for seq, f in zip(unseen_seqs, unseen_fitnesses):
+                    fitnesses[unseen[seq]] = f
+                sequences.add(unseen_seqs, unseen_fitnesses)
+            previous_generation = dict(zip(population, fitnesses))
+
+            # `tell` updates model parameters (cma minimizes, so negate fitnesses)
+            es.tell(solutions, list(-fitnesses))
 
         # We propose the top `self.sequences_batch_size` new sequences we have generated
-        new_seqs = np.array(list(sequences.keys()))
-        # Negate `objective_function` scores
-        preds = np.array(list(sequences.values()))
-        sorted_order = np.argsort(preds)[: -self.sequences_batch_size : -1]
-
-        return new_seqs[sorted_order], preds[sorted_order]
+        return sequences.top()
@@ -12,6 +12,7 @@ from torch.nn import functional as F
 from torch.nn.utils import clip_grad_norm_
 
 import flexs
+from flexs.utils.candidate_pool import CandidatePool
 from flexs.utils.replay_buffers import PrioritizedReplayBuffer
 from flexs.utils.sequence_utils import (
     construct_mutant_from_sample,
@@ -283,17 +284,15 @@ class DQN(flexs.Explorer):
             self.initialize_data_structures()
 
         all_measured_seqs = set(measured_sequences_data["sequence"].values)
-        sequences = {}
+        sequences = CandidatePool(self.sequences_batch_size)
 
         prev_cost = self.model.cost
-        while self.model.cost - prev_cost < self.model_queries_per_batch:
+        while self.model.cost - prev_cost < self.model_queries_per_batch and not (
+            len(sequences) > 0 and self.time_budget_spent()
+        ):
             new_state_string, pred = self.pick_action(all_measured_seqs)
             all_measured_seqs.add(new_state_string)
-            sequences[new_state_string] = pred
+            sequences.add([new_state_string], [pred])
 
         # We propose the top `self.sequences_batch_size` new sequences we have generated
-        new_seqs = np.array(list(sequences.keys()))
-        preds = np.array(list(sequences.values()))
-        sorted_order = np.argsort(preds)[: -self.sequences_batch_size : -1]
-
-        return new_seqs[sorted_order], preds[sorted_order]
+        return sequences.top()
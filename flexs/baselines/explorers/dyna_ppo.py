@@ -1,4 +1,5 @@
 """DyNA-PPO explorer."""
+import concurrent.futures
 from functools import partial
 from typing import List, Optional, Tuple
 
@@ -26,7 +27,9 @@ from flexs.baselines.explorers.environments.dyna_ppo import (
 from flexs.baselines.explorers.environments.dyna_ppo import (
     DynaPPOEnvironmentMutative as DynaPPOEnvMut,
 )
+from flexs.baselines.explorers.torch_ppo import TorchPPOAgent
 from flexs.utils import sequence_utils as s_utils
+from flexs.utils.candidate_pool import CandidatePool
 
 
 class DynaPPOEnsemble(flexs.Model):
@@ -43,8 +46,22 @@ class DynaPPOEnsemble(flexs.Model):
         alphabet: str,
         r_squared_threshold: float = 0.5,
         models: Optional[List[flexs.Model]] = None,
+        max_workers: Optional[int] = None,
+        patience: Optional[int] = None,
     ):
-        """Create the ensemble from `models`."""
+        """
+        Create the ensemble from `models`.
+
+        Args:
+            max_workers: Number of threads used to fit members concurrently
+                (sklearn and tensorflow both release the GIL while fitting).
+                Defaults to the `ThreadPoolExecutor` default; use 1 to fit serially.
+            patience: If set, members whose $r^2$ has been below
+                `r_squared_threshold` for `patience` consecutive calls to `train`
+                are no longer refit. Their $r^2$ is still updated on each new
+                validation set.
+
+        """
         super().__init__(name="DynaPPOEnsemble")
 
         if models is None:
@@ -87,19 +104,42 @@ class DynaPPOEnsemble(flexs.Model):
         self.models = models
         self.r_squared_vals = np.ones(len(self.models))
         self.r_squared_threshold = r_squared_threshold
+        self.max_workers = max_workers
+        self.patience = patience
+        self.rounds_below_threshold = np.zeros(len(self.models), dtype=int)
 
     def train(self, sequences, labels):
         """Train the ensemble, calculating $r^2$ values on a holdout set."""
         if len(sequences) < 10:
             return
 
-        (train_X, test_X, train_y, test_y,) = sklearn.model_selection.train_test_split(
+        (
+            train_X,
+            test_X,
+            train_y,
+            test_y,
+        ) = sklearn.model_selection.train_test_split(
             np.array(sequences), np.array(labels), test_size=0.25
         )
 
-        # Train each model in the ensemble
-        for model in self.models:
-            model.train(train_X, train_y)
+        # Train each model in the ensemble, skipping those that have not passed
+        # the threshold for the last `patience` rounds
+        models_to_fit = [
+            model
+            for model, rounds_below in zip(self.models, self.rounds_below_threshold)
+            if self.patience is None or rounds_below < self.patience
+        ]
+        if self.max_workers == 1:
+            for model in models_to_fit:
+                model.train(train_X, train_y)
+        else:
+            with concurrent.futures.ThreadPoolExecutor(self.max_workers) as executor:
+                futures = [
+                    executor.submit(model.train, train_X, train_y)
+                    for model in models_to_fit
+                ]
+                for future in futures:
+                    future.result()
 
         # Calculate r^2 values for each model in the ensemble on test set
         self.r_squared_vals = []
@@ -111,9 +151,13 @@ class DynaPPOEnsemble(flexs.Model):
             if (y_preds[0] == y_preds).all() or (test_y[0] == test_y).all():
                 self.r_squared_vals.append(0)
             else:
-                self.r_squared_vals.append(
-                    scipy.stats.pearsonr(test_y, model.get_fitness(test_X))[0] ** 2
-                )
+                r_squared = scipy.stats.pearsonr(test_y, y_preds)[0] ** 2
+                self.r_squared_vals.append(r_squared)
+
+        below_threshold = np.array(self.r_squared_vals) < self.r_squared_threshold
+        self.rounds_below_threshold = np.where(
+            below_threshold, self.rounds_below_threshold + 1, 0
+        )
 
     def _fitness_function(self, sequences):
         passing_models = [
@@ -165,6 +209,8 @@ class DynaPPO(flexs.Explorer):
         num_experiment_rounds: int = 10,
         num_model_rounds: int = 1,
         env_batch_size: int = 4,
+        num_workers: int = 1,
+        backend: str = "tf_agents",
     ):
         """
         Args:
@@ -172,9 +218,18 @@ class DynaPPO(flexs.Explorer):
                 default set to 10, the same number of sequence proposal of rounds run.
             num_model_rounds: Number of model-based rounds to run.
             env_batch_size: Number of epsisodes to batch together and run in parallel.
+            num_workers: Number of processes to split the environment's ground truth
+                fitness queries across during experiment-based training rounds.
+                If greater than 1, `landscape` must be picklable, and the workers
+                run until `close` is called or the explorer is garbage collected.
+            backend: Either "tf_agents", or "torch" to use the lightweight
+                `TorchPPOAgent` instead of tf_agents' drivers and PPO agent. The
+                environment is a tf_agents `PyEnvironment` either way, so
+                tf_agents is still required.
 
         """
-        tf.config.run_functions_eagerly(False)
+        if backend not in ["tf_agents", "torch"]:
+            raise ValueError("`backend` must be one of 'tf_agents' or 'torch'")
 
         name = f"DynaPPO_Agent_{num_experiment_rounds}_{num_model_rounds}"
 
@@ -204,11 +259,26 @@ class DynaPPO(flexs.Explorer):
         self.num_experiment_rounds = num_experiment_rounds
         self.num_model_rounds = num_model_rounds
         self.env_batch_size = env_batch_size
+        self.backend = backend
 
-        env = DynaPPOEnv(
-            self.alphabet, len(starting_sequence), model, landscape, env_batch_size
+        self.env = DynaPPOEnv(
+            self.alphabet,
+            len(starting_sequence),
+            model,
+            landscape,
+            env_batch_size,
+            num_workers=num_workers,
         )
-        self.tf_env = tf_py_environment.TFPyEnvironment(env)
+
+        if backend == "torch":
+            self.agent = TorchPPOAgent(
+                observation_size=len(starting_sequence) * (len(alphabet) + 1),
+                num_actions=len(alphabet),
+                preprocess=lambda obs: obs.reshape(env_batch_size, -1),
+            )
+            return
+
+        self.tf_env = tf_py_environment.TFPyEnvironment(self.env)
 
         actor_net = actor_distribution_network.ActorDistributionNetwork(
             self.tf_env.observation_spec(),
@@ -231,6 +301,12 @@ class DynaPPO(flexs.Explorer):
         )
         self.agent.initialize()
 
+    def add_last_seqs(self, is_last, observation, new_seqs):
+        """Add the sequences of the batch's episodes that have just ended."""
+        for seq_state in np.asarray(observation)[np.asarray(is_last)]:
+            seq = s_utils.one_hot_to_string(seq_state[:, :-1], self.alphabet)
+            new_seqs.add([seq], [self.env.get_cached_fitness(seq)])
+
     def add_last_seq_in_trajectory(self, experience, new_seqs):
         """Add the last sequence in an episode's trajectory.
 
@@ -242,15 +318,30 @@ class DynaPPO(flexs.Explorer):
         to the next one in `last_batch`, so that when the environment resets, mutants
         are generated from that new sequence.
         """
-        for is_bound, obs in zip(experience.is_boundary(), experience.observation):
-            if is_bound:
-                seq = s_utils.one_hot_to_string(obs.numpy()[:, :-1], self.alphabet)
-                new_seqs[seq] = self.tf_env.get_cached_fitness(seq)
+        self.add_last_seqs(
+            experience.is_boundary().numpy(), experience.observation.numpy(), new_seqs
+        )
+
+    def collect_and_train(self, should_stop, new_seqs):
+        """
+        Collect episodes with the current policy until `should_stop()`, then train
+        the policy on them.
+
+        The sequences of finished episodes are added to `new_seqs`.
+        """
+        if self.backend == "torch":
+            rollout, _ = self.agent.collect(
+                self.env,
+                should_stop,
+                observers=[
+                    lambda time_step: self.add_last_seqs(
+                        time_step.is_last(), time_step.observation, new_seqs
+                    )
+                ],
+            )
+            self.agent.train(rollout)
+            return
 
-    def propose_sequences(
-        self, measured_sequences_data: pd.DataFrame
-    ) -> Tuple[np.ndarray, np.ndarray]:
-        """Propose top `sequences_batch_size` sequences for evaluation."""
         replay_buffer_capacity = 10001
         replay_buffer = tf_uniform_replay_buffer.TFUniformReplayBuffer(
             self.agent.collect_data_spec,
@@ -258,17 +349,31 @@ class DynaPPO(flexs.Explorer):
             max_length=replay_buffer_capacity,
         )
 
-        sequences = {}
         collect_driver = dynamic_episode_driver.DynamicEpisodeDriver(
             self.tf_env,
             self.agent.collect_policy,
             observers=[
                 replay_buffer.add_batch,
-                partial(self.add_last_seq_in_trajectory, new_seqs=sequences),
+                partial(self.add_last_seq_in_trajectory, new_seqs=new_seqs),
             ],
             num_episodes=1,
         )
 
+        while not should_stop():
+            collect_driver.run()
+
+        trajectories = replay_buffer.gather_all()
+        self.agent.train(experience=trajectories)
+        replay_buffer.clear()
+
+    def propose_sequences(
+        self, measured_sequences_data: pd.DataFrame
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Propose top `sequences_batch_size` sequences for evaluation."""
+        sequences = CandidatePool(
+            self.sequences_batch_size, exclude=measured_sequences_data["sequence"]
+        )
+
         # Experiment-based training round. Each sequence we generate here must be
         # evaluated by the ground truth landscape model. So each sequence we evaluate
         # reduces our sequence proposal budget by one.
@@ -276,47 +381,42 @@ class DynaPPO(flexs.Explorer):
         # budget at round one and linearly interpolate to a cost of 0 by the last round.
 
         experiment_based_training_budget = self.sequences_batch_size
-        self.tf_env.set_fitness_model_to_gt(True)
-        previous_landscape_cost = self.tf_env.landscape.cost
-        while (
-            self.tf_env.landscape.cost - previous_landscape_cost
-            < experiment_based_training_budget
-        ):
-            collect_driver.run()
+        self.env.set_fitness_model_to_gt(True)
+        previous_landscape_cost = self.env.landscape.cost
 
-        trajectories = replay_buffer.gather_all()
-        self.agent.train(experience=trajectories)
-        replay_buffer.clear()
+        def experiment_budget_spent():
+            return (
+                self.env.landscape.cost - previous_landscape_cost
+                >= experiment_based_training_budget
+            )
+
+        self.collect_and_train(experiment_budget_spent, sequences)
         sequences.clear()
 
         # Model-based training rounds
-        self.tf_env.set_fitness_model_to_gt(False)
+        self.env.set_fitness_model_to_gt(False)
         previous_model_cost = self.model.cost
         for _ in range(self.num_model_rounds):
             if self.model.cost - previous_model_cost >= self.model_queries_per_batch:
                 break
+            if len(sequences) > 0 and self.time_budget_spent():
+                break
 
             previous_round_model_cost = self.model.cost
-            while self.model.cost - previous_round_model_cost < int(
-                self.model_queries_per_batch / self.num_model_rounds
-            ):
-                collect_driver.run()
 
-            trajectories = replay_buffer.gather_all()
-            self.agent.train(experience=trajectories)
-            replay_buffer.clear()
+            def model_budget_spent():
+                return self.model.cost - previous_round_model_cost >= int(
+                    self.model_queries_per_batch / self.num_model_rounds
+                ) or (len(sequences) > 0 and self.time_budget_spent())
+
+            self.collect_and_train(model_budget_spent, sequences)
 
         # We propose the top `self.sequences_batch_size` new sequences we have generated
-        sequences = {
-            seq: fitness
-            for seq, fitness in sequences.items()
-            if seq not in set(measured_sequences_data["sequence"])
-        }
-        new_seqs = np.array(list(sequences.keys()))
-        preds = np.array(list(sequences.values()))
-        sorted_order = np.argsort(preds)[::-1][: self.sequences_batch_size]
+        return sequences.top()
 
-        return new_seqs[sorted_order], preds[sorted_order]
+    def close(self):
+        """Shut down the environment's ground truth worker processes, if any."""
+        self.env.close()
 
 
 class DynaPPOMutative(flexs.Explorer):
@@ -346,15 +446,28 @@ class DynaPPOMutative(flexs.Explorer):
         model: Optional[flexs.Model] = None,
         num_experiment_rounds: int = 10,
         num_model_rounds: int = 1,
+        env_batch_size: int = 4,
+        num_workers: int = 1,
+        backend: str = "tf_agents",
     ):
         """
         Args:
             num_experiment_rounds: Number of experiment-based rounds to run. This is by
                 default set to 10, the same number of sequence proposal of rounds run.
             num_model_rounds: Number of model-based rounds to run.
+            env_batch_size: Number of epsisodes to batch together and run in parallel.
+            num_workers: Number of processes to split the environment's ground truth
+                fitness queries across during experiment-based training rounds.
+                If greater than 1, `landscape` must be picklable, and the workers
+                run until `close` is called or the explorer is garbage collected.
+            backend: Either "tf_agents", or "torch" to use the lightweight
+                `TorchPPOAgent` instead of tf_agents' drivers and PPO agent. The
+                environment is a tf_agents `PyEnvironment` either way, so
+                tf_agents is still required.
 
         """
-        tf.config.run_functions_eagerly(False)
+        if backend not in ["tf_agents", "torch"]:
+            raise ValueError("`backend` must be one of 'tf_agents' or 'torch'")
 
         name = f"DynaPPO_Agent_{num_experiment_rounds}_{num_model_rounds}"
 
@@ -379,18 +492,35 @@ class DynaPPOMutative(flexs.Explorer):
         )
 
         self.alphabet = alphabet
+        # Episode-end sequences and fitnesses of the current training phase,
+        # which episodes restart from
+        self.episode_end_sequences = {}
         self.num_experiment_rounds = num_experiment_rounds
         self.num_model_rounds = num_model_rounds
+        self.env_batch_size = env_batch_size
+        self.backend = backend
 
-        env = DynaPPOEnvMut(
+        self.env = DynaPPOEnvMut(
             alphabet=self.alphabet,
             starting_seq=starting_sequence,
             model=model,
             landscape=landscape,
             max_num_steps=model_queries_per_batch,
+            batch_size=env_batch_size,
+            num_workers=num_workers,
         )
-        validate_py_environment(env, episodes=1)
-        self.tf_env = tf_py_environment.TFPyEnvironment(env)
+        validate_py_environment(self.env, episodes=1)
+
+        if backend == "torch":
+            num_actions = len(starting_sequence) * len(alphabet)
+            self.agent = TorchPPOAgent(
+                observation_size=num_actions,
+                num_actions=num_actions,
+                preprocess=lambda obs: obs["sequence"].reshape(env_batch_size, -1),
+            )
+            return
+
+        self.tf_env = tf_py_environment.TFPyEnvironment(self.env)
 
         encoder_layer = tf.keras.layers.Lambda(lambda obs: obs["sequence"])
         actor_net = actor_distribution_network.ActorDistributionNetwork(
@@ -416,6 +546,42 @@ class DynaPPOMutative(flexs.Explorer):
         )
         self.agent.initialize()
 
+    def add_last_seqs(self, is_last, observation, new_seqs):
+        """Add the sequences of the batch's episodes that have just ended.
+
+        Since the environment ends the episode when the score is non-increasing, it
+        adds the associated maximum-valued sequence to the batch.
+
+        It then changes the "current sequence" of the environment to one of the top
+        sequences, so that when episodes restart, mutants are generated from that
+        new sequence.
+        """
+        is_last = np.asarray(is_last)
+        if not is_last.any():
+            return
+
+        seq_states = np.asarray(observation["sequence"])[is_last]
+        fitnesses = np.asarray(observation["fitness"])[is_last]
+        episode_ends = {
+            s_utils.one_hot_to_string(seq_state, self.alphabet): fitness.squeeze()
+            for seq_state, fitness in zip(seq_states, fitnesses)
+        }
+        new_seqs.add(list(episode_ends), list(episode_ends.values()))
+
+        # Restarts are drawn from every episode end of the proposal, including
+        # measured sequences and those that didn't make it into `new_seqs`
+        self.episode_end_sequences.update(episode_ends)
+        top_fitness = max(self.episode_end_sequences.values())
+        top_sequences = [
+            seq
+            for seq, fitness in self.episode_end_sequences.items()
+            if fitness >= 0.9 * top_fitness
+        ]
+        if len(top_sequences) > 0:
+            self.env.seq = np.random.choice(top_sequences)
+        else:
+            self.env.seq = np.random.choice(list(self.episode_end_sequences))
+
     def add_last_seq_in_trajectory(self, experience, new_seqs):
         """Add the last sequence in an episode's trajectory.
 
@@ -427,46 +593,63 @@ class DynaPPOMutative(flexs.Explorer):
         to the next one in `last_batch`, so that when the environment resets, mutants
         are generated from that new sequence.
         """
-        if experience.is_boundary():
-            seq = s_utils.one_hot_to_string(
-                experience.observation["sequence"].numpy()[0], self.alphabet
-            )
-            new_seqs[seq] = experience.observation["fitness"].numpy().squeeze()
+        self.add_last_seqs(
+            experience.is_boundary().numpy(),
+            tf.nest.map_structure(lambda x: x.numpy(), experience.observation),
+            new_seqs,
+        )
 
-            top_fitness = max(new_seqs.values())
-            top_sequences = [
-                seq for seq, fitness in new_seqs.items() if fitness >= 0.9 * top_fitness
-            ]
-            if len(top_sequences) > 0:
-                self.tf_env.pyenv.envs[0].seq = np.random.choice(top_sequences)
-            else:
-                self.tf_env.pyenv.envs[0].seq = np.random.choice(
-                    [seq for seq, _ in new_seqs.items()]
-                )
+    def collect_and_train(self, should_stop, new_seqs):
+        """
+        Collect episodes with the current policy until `should_stop()`, then train
+        the policy on them.
+
+        The sequences of finished episodes are added to `new_seqs`.
+        """
+        if self.backend == "torch":
+            rollout, _ = self.agent.collect(
+                self.env,
+                should_stop,
+                observers=[
+                    lambda time_step: self.add_last_seqs(
+                        time_step.is_last(), time_step.observation, new_seqs
+                    )
+                ],
+            )
+            self.agent.train(rollout)
+            return
 
-    def propose_sequences(
-        self, measured_sequences_data: pd.DataFrame
-    ) -> Tuple[np.ndarray, np.ndarray]:
-        """Propose top `sequences_batch_size` sequences for evaluation."""
-        num_parallel_environments = 1
         replay_buffer_capacity = 10001
         replay_buffer = tf_uniform_replay_buffer.TFUniformReplayBuffer(
             self.agent.collect_data_spec,
-            batch_size=num_parallel_environments,
+            batch_size=self.env_batch_size,
             max_length=replay_buffer_capacity,
         )
 
-        sequences = {}
         collect_driver = dynamic_episode_driver.DynamicEpisodeDriver(
             self.tf_env,
             self.agent.collect_policy,
             observers=[
                 replay_buffer.add_batch,
-                partial(self.add_last_seq_in_trajectory, new_seqs=sequences),
+                partial(self.add_last_seq_in_trajectory, new_seqs=new_seqs),
             ],
             num_episodes=1,
         )
 
+        # Episodes in the batch end at different steps, so resume collection from
+        # the last time step rather than resetting the unfinished episodes
+        time_step = None
+        while not should_stop():
+            time_step, _ = collect_driver.run(time_step=time_step)
+
+        trajectories = replay_buffer.gather_all()
+        self.agent.train(experience=trajectories)
+        replay_buffer.clear()
+
+    def propose_sequences(
+        self, measured_sequences_data: pd.DataFrame
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Propose top `sequences_batch_size` sequences for evaluation."""
         # Experiment-based training round. Each sequence we generate here must be
         # evaluated by the ground truth landscape model. So each sequence we evaluate
         # reduces our sequence proposal budget by one.
@@ -479,46 +662,51 @@ class DynaPPOMutative(flexs.Explorer):
             * self.sequences_batch_size
             / 2
         )
-        self.tf_env.envs[0].set_fitness_model_to_gt(True)
-        previous_landscape_cost = self.tf_env.envs[0].landscape.cost
-        while (
-            self.tf_env.envs[0].landscape.cost - previous_landscape_cost
-            < experiment_based_training_budget
-        ):
-            collect_driver.run()
+        model_based_budget = (
+            self.sequences_batch_size - experiment_based_training_budget
+        )
+        sequences = CandidatePool(
+            max(model_based_budget, 1), exclude=measured_sequences_data["sequence"]
+        )
+        self.episode_end_sequences = {}
+        self.env.set_fitness_model_to_gt(True)
+        previous_landscape_cost = self.env.landscape.cost
+
+        def experiment_budget_spent():
+            return (
+                self.env.landscape.cost - previous_landscape_cost
+                >= experiment_based_training_budget
+            )
 
-        trajectories = replay_buffer.gather_all()
-        self.agent.train(experience=trajectories)
-        replay_buffer.clear()
+        self.collect_and_train(experiment_budget_spent, sequences)
         sequences.clear()
+        self.episode_end_sequences = {}
+
+        # With a single round, experiments use up the whole batch
+        if model_based_budget <= 0:
+            return np.array([]), np.array([])
 
         # Model-based training rounds
-        self.tf_env.envs[0].set_fitness_model_to_gt(False)
+        self.env.set_fitness_model_to_gt(False)
         previous_model_cost = self.model.cost
         for _ in range(self.num_model_rounds):
             if self.model.cost - previous_model_cost >= self.model_queries_per_batch:
                 break
+            if len(sequences) > 0 and self.time_budget_spent():
+                break
 
             previous_round_model_cost = self.model.cost
-            while self.model.cost - previous_round_model_cost < int(
-                self.model_queries_per_batch / self.num_model_rounds
-            ):
-                collect_driver.run()
 
-            trajectories = replay_buffer.gather_all()
-            self.agent.train(experience=trajectories)
-            replay_buffer.clear()
+            def model_budget_spent():
+                return self.model.cost - previous_round_model_cost >= int(
+                    self.model_queries_per_batch / self.num_model_rounds
+                ) or (len(sequences) > 0 and self.time_budget_spent())
+
+            self.collect_and_train(model_budget_spent, sequences)
 
         # We propose the top `self.sequences_batch_size` new sequences we have generated
-        sequences = {
-            seq: fitness
-            for seq, fitness in sequences.items()
-            if seq not in set(measured_sequences_data["sequence"])
-        }
-        new_seqs = np.array(list(sequences.keys()))
-        preds = np.array(list(sequences.values()))
-        sorted_order = np.argsort(preds)[
-            : -(self.sequences_batch_size - experiment_based_training_budget) : -1
-        ]
+        return sequences.top()
 
-        return new_seqs[sorted_order], preds[sorted_order]
+    def close(self):
+        """Shut down the environment's ground truth worker processes, if any."""
+        self.env.close()
@@ -0,0 +1,93 @@
+"""Base class of the batched sequence design environments."""
+from typing import Tuple
+
+import numpy as np
+from tf_agents.environments import py_environment
+from tf_agents.trajectories import time_step as ts
+
+
+class BatchedSequenceEnvironment(py_environment.PyEnvironment):  # pylint: disable=W0223
+    """
+    A TF-Agents environment running `batch_size` sequence design episodes at once.
+
+    Episodes are stepped together as arrays, so that fitness can be queried once
+    per step for the whole batch, and time steps are returned batched.
+
+    Subclasses call `_init_batch` in their constructor and implement
+    `_restart_episodes`, `_observation` and `_step`. Episodes that may end at
+    different steps are restarted by calling `_begin_step` at the start of
+    `_step`: an episode that ended on the previous step then starts over (ignoring
+    its action), so episodes of different lengths can share a batch.
+    """
+
+    def _init_batch(self, batch_size: int, action_spec, observation_spec):
+        """Set the batch size and the action and observation specs."""
+        self._batch_size = batch_size
+        self._done = np.zeros(batch_size, dtype=bool)
+        self._action_spec = action_spec
+        self._observation_spec = observation_spec
+        self._time_step_spec = ts.time_step_spec(observation_spec)
+
+    def _restart_episodes(self, episodes: np.ndarray):
+        """Restart the episodes selected by the boolean mask `episodes`."""
+        raise NotImplementedError
+
+    def _observation(self):
+        """Return the batched observation of the current state of each episode."""
+        raise NotImplementedError
+
+    def _time_step(self, step_types, rewards) -> ts.TimeStep:
+        """Return the batched time step, recording which episodes have ended."""
+        step_types = np.broadcast_to(step_types, (self._batch_size,))
+        self._done = step_types == ts.StepType.LAST
+        return ts.TimeStep(
+            step_type=step_types.astype(np.int32),
+            reward=np.asarray(rewards, dtype=np.float32),
+            discount=(~self._done).astype(np.float32),
+            observation=self._observation(),
+        )
+
+    def _reset(self):
+        self._restart_episodes(np.ones(self._batch_size, dtype=bool))
+        return self._time_step(ts.StepType.FIRST, np.zeros(self._batch_size))
+
+    def _begin_step(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Restart the episodes that ended on the previous step.
+
+        Returns:
+            Step types (`FIRST` for restarted episodes, `MID` otherwise), zero
+            rewards, and the boolean mask of restarted episodes.
+
+        """
+        step_types = np.full(self._batch_size, ts.StepType.MID)
+        rewards = np.zeros(self._batch_size, dtype=np.float32)
+
+        restarted = self._done.copy()
+        if restarted.any():
+            self._restart_episodes(restarted)
+            step_types[restarted] = ts.StepType.FIRST
+
+        return step_types, rewards, restarted
+
+    @property
+    def batched(self):
+        """Tf-agents function that says that this env returns batches of timesteps."""
+        return True
+
+    @property
+    def batch_size(self):
+        """Tf-agents property that return env batch size."""
+        return self._batch_size
+
+    def time_step_spec(self):
+        """Define time steps."""
+        return self._time_step_spec
+
+    def action_spec(self):
+        """Define agent actions."""
+        return self._action_spec
+
+    def observation_spec(self):
+        """Define environment observations."""
+        return self._observation_spec
@@ -1,16 +1,92 @@
 """DyNA-PPO environment module."""
-import editdistance
+import concurrent.futures
+import multiprocessing
+import weakref
+from typing import Sequence
+
 import numpy as np
-from tf_agents.environments import py_environment
 from tf_agents.specs import array_spec
 from tf_agents.trajectories import time_step as ts
-from tf_agents.utils import nest_utils
 
 import flexs
+from flexs.baselines.explorers.environments.batched import BatchedSequenceEnvironment
+from flexs.baselines.explorers.environments.ppo import PPOEnvironment
 from flexs.utils import sequence_utils as s_utils
+from flexs.utils.hamming_index import HammingDensityIndex
+
+_worker_landscape = None
+
+
+def _init_landscape_worker(landscape: flexs.Landscape):
+    global _worker_landscape
+    _worker_landscape = landscape
+
 
+def _landscape_worker_fitness(sequences: Sequence[str]) -> np.ndarray:
+    return _worker_landscape.get_fitness(sequences)
 
-class DynaPPOEnvironment(py_environment.PyEnvironment):  # pylint: disable=W0223
+
+class LandscapeProcessPool:
+    """
+    Score sequences on copies of a landscape held by a pool of worker processes.
+
+    Useful when ground truth queries are expensive (e.g. Rosetta or BERT-based
+    landscapes): each batch of sequences is split evenly across the workers.
+    Query costs are accounted for on the parent process' landscape, so
+    `landscape.cost` stays correct. With a single worker, sequences are scored
+    in the calling process.
+
+    Workers are started on the first query and shut down by `close` (or when
+    the pool is garbage collected); a closed pool restarts them if queried again.
+    """
+
+    def __init__(self, landscape: flexs.Landscape, num_workers: int):
+        """
+        Args:
+            landscape: Landscape to copy to each worker. It must be picklable.
+            num_workers: Number of worker processes.
+
+        """
+        self.landscape = landscape
+        self.num_workers = num_workers
+        self._executor = None
+        self._finalizer = None
+
+    def get_fitness(self, sequences: Sequence[str]) -> np.ndarray:
+        """Score `sequences`, splitting them across workers."""
+        if self.num_workers <= 1:
+            return self.landscape.get_fitness(sequences)
+
+        if self._executor is None:
+            # Forking a process that has already initialized tensorflow can
+            # deadlock, so start the workers fresh instead
+            self._executor = concurrent.futures.ProcessPoolExecutor(
+                self.num_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_landscape_worker,
+                initargs=(self.landscape,),
+            )
+            self._finalizer = weakref.finalize(self, self._executor.shutdown)
+
+        chunks = [
+            chunk
+            for chunk in np.array_split(np.asarray(sequences), self.num_workers)
+            if len(chunk) > 0
+        ]
+        fitnesses = np.concatenate(
+            list(self._executor.map(_landscape_worker_fitness, chunks))
+        )
+        self.landscape.cost += len(sequences)
+        return fitnesses
+
+    def close(self):
+        """Shut down the worker processes."""
+        if self._executor is not None:
+            self._finalizer()
+            self._executor = None
+
+
+class DynaPPOEnvironment(BatchedSequenceEnvironment):  # pylint: disable=W0223
     """DyNA-PPO environment based on TF-Agents."""
 
     def __init__(  # pylint: disable=W0231
@@ -20,6 +96,7 @@ class DynaPPOEnvironment(py_environment.PyEnvironment):  # pylint: disable=W0223
         model: flexs.Model,
         landscape: flexs.Landscape,
         batch_size: int,
+        num_workers: int = 1,
     ):
         """
         Initialize DyNA-PPO agent environment.
@@ -35,10 +112,11 @@ class DynaPPOEnvironment(py_environment.PyEnvironment):  # pylint: disable=W0223
                 each sequence.
             landscape: True fitness landscape.
             batch_size: Number of epsisodes to batch together and run in parallel.
+            num_workers: Number of processes to split ground truth fitness queries
+                across. If greater than 1, `landscape` must be picklable.
 
         """
         self.alphabet = alphabet
-        self._batch_size = batch_size
 
         self.seq_length = seq_length
         self.partial_seq_len = 0
@@ -50,73 +128,55 @@ class DynaPPOEnvironment(py_environment.PyEnvironment):  # pylint: disable=W0223
         # model/model/measurements
         self.model = model
         self.landscape = landscape
+        self.landscape_pool = LandscapeProcessPool(landscape, num_workers)
         self.fitness_model_is_gt = False
         self.previous_fitness = -float("inf")
 
         # sequence
         self.all_seqs = {}
+        self.density_index = HammingDensityIndex(seq_length, alphabet)
         self.lam = 0.1
 
         # tf_agents environment
-        self._action_spec = array_spec.BoundedArraySpec(
-            shape=(),
-            dtype=np.integer,
-            minimum=0,
-            maximum=len(self.alphabet) - 1,
-            name="action",
-        )
-        self._observation_spec = array_spec.BoundedArraySpec(
-            shape=(self.seq_length, len(self.alphabet) + 1),
-            dtype=np.float32,
-            minimum=0,
-            maximum=1,
-            name="observation",
+        self._init_batch(
+            batch_size,
+            action_spec=array_spec.BoundedArraySpec(
+                shape=(),
+                dtype=np.integer,
+                minimum=0,
+                maximum=len(self.alphabet) - 1,
+                name="action",
+            ),
+            observation_spec=array_spec.BoundedArraySpec(
+                shape=(self.seq_length, len(self.alphabet) + 1),
+                dtype=np.float32,
+                minimum=0,
+                maximum=1,
+                name="observation",
+            ),
         )
-        self._time_step_spec = ts.time_step_spec(self._observation_spec)
 
-    def _reset(self):
+    def _restart_episodes(self, episodes):
+        # Episodes all have the same length, so they always restart together
         self.partial_seq_len = 0
         self.states[:, :, :] = 0
         self.states[:, np.arange(self.seq_length), -1] = 1
-        return nest_utils.stack_nested_arrays(
-            [ts.restart(seq_state) for seq_state in self.states]
-        )
-
-    def batched(self):
-        """Tf-agents function that says that this env returns batches of timesteps."""
-        return True
-
-    @property
-    def batch_size(self):
-        """Tf-agents property that return env batch size."""
-        return self._batch_size
 
-    def time_step_spec(self):
-        """Define time steps."""
-        return self._time_step_spec
-
-    def action_spec(self):
-        """Define agent actions."""
-        return self._action_spec
-
-    def observation_spec(self):
-        """Define environment observations."""
-        return self._observation_spec
+    def _observation(self):
+        return self.states.copy()
 
     def sequence_density(self, seq):
         """Get average distance to `seq` out of all observed sequences."""
-        dens = 0
-        dist_radius = 2
-        for s in self.all_seqs:
-            dist = int(editdistance.eval(s, seq))
-            if dist != 0 and dist <= dist_radius:
-                dens += self.all_seqs[s] / dist
-        return dens
+        return self.density_index.density([seq])[0]
 
     def get_cached_fitness(self, seq):
         """Get cached sequence fitness computed in previous episodes."""
         return self.all_seqs[seq]
 
+    def close(self):
+        """Shut down the ground truth worker processes, if any."""
+        self.landscape_pool.close()
+
     def set_fitness_model_to_gt(self, fitness_model_is_gt):
         """
         Set the fitness model to the ground truth landscape or to the model.
@@ -135,9 +195,7 @@ class DynaPPOEnvironment(py_environment.PyEnvironment):  # pylint: disable=W0223
 
         # We have not generated the last residue in the sequence, so continue
         if self.partial_seq_len < self.seq_length - 1:
-            return nest_utils.stack_nested_arrays(
-                [ts.transition(seq_state, 0) for seq_state in self.states]
-            )
+            return self._time_step(ts.StepType.MID, np.zeros(self._batch_size))
 
         # If sequence is of full length, score the sequence and end the episode
         # We need to take off the column in the matrix (-1) representing the mask token
@@ -146,38 +204,38 @@ class DynaPPOEnvironment(py_environment.PyEnvironment):  # pylint: disable=W0223
             for seq_state in self.states
         ]
         if self.fitness_model_is_gt:
-            fitnesses = self.landscape.get_fitness(complete_sequences)
+            fitnesses = self.landscape_pool.get_fitness(complete_sequences)
         else:
             fitnesses = self.model.get_fitness(complete_sequences)
         self.all_seqs.update(zip(complete_sequences, fitnesses))
+        self.density_index.add(complete_sequences, fitnesses)
 
         # Reward = fitness - lambda * sequence density
-        rewards = np.array(
-            [
-                f - self.lam * self.sequence_density(seq)
-                for seq, f in zip(complete_sequences, fitnesses)
-            ]
-        )
-        return nest_utils.stack_nested_arrays(
-            [ts.termination(seq_state, r) for seq_state, r in zip(self.states, rewards)]
-        )
+        rewards = fitnesses - self.lam * self.density_index.density(complete_sequences)
+        return self._time_step(ts.StepType.LAST, rewards)
 
 
-class DynaPPOEnvironmentMutative(py_environment.PyEnvironment):  # pylint: disable=W0223
+class DynaPPOEnvironmentMutative(PPOEnvironment):  # pylint: disable=W0223
     """
     DyNA-PPO environment based on TF-Agents.
 
     Note that unlike the other DynaPPO environment, this one is mutative rather than
     constructive.
+
+    Episodes are run as in `PPOEnvironment`, but fitness is queried on either the
+    model or the ground truth landscape (see `set_fitness_model_to_gt`), and
+    rewards are penalized by the density of sequences already observed.
     """
 
-    def __init__(  # pylint: disable=W0231
+    def __init__(
         self,
         alphabet: str,
         starting_seq: str,
         model: flexs.Model,
         landscape: flexs.Landscape,
         max_num_steps: int,
+        batch_size: int = 1,
+        num_workers: int = 1,
     ):
         """
         Initialize DyNA-PPO agent environment.
@@ -191,88 +249,34 @@ class DynaPPOEnvironmentMutative(py_environment.PyEnvironment):  # pylint: disab
                 the sequence which is initially mutated.
             model: Landscape or model which evaluates
                 each sequence.
+            landscape: True fitness landscape.
             max_num_steps: Maximum number of steps before
                 episode is forced to terminate. Usually the
                 `model_queries_per_batch`.
+            batch_size: Number of episodes to batch together and run in parallel.
+            num_workers: Number of processes to split ground truth fitness queries
+                across. If greater than 1, `landscape` must be picklable.
 
         """
-        self.alphabet = alphabet
+        super().__init__(alphabet, starting_seq, model, max_num_steps, batch_size)
 
         # model/model/measurements
-        self.model = model
         self.landscape = landscape
+        self.landscape_pool = LandscapeProcessPool(landscape, num_workers)
         self.fitness_model_is_gt = False
-        self.previous_fitness = -float("inf")
 
-        self.seq = starting_seq
-        self._state = {
-            "sequence": s_utils.string_to_one_hot(self.seq, self.alphabet).astype(
-                np.float32
-            ),
-            "fitness": self.model.get_fitness([starting_seq]).astype(np.float32),
-        }
-        self.episode_seqs = set()  # the sequences seen in the current episode
         self.all_seqs = {}
-        self.measured_sequences = {}
+        self.density_index = HammingDensityIndex(len(starting_seq), alphabet)
 
         self.lam = 0.1
 
-        # tf_agents environment
-        self._action_spec = array_spec.BoundedArraySpec(
-            shape=(),
-            dtype=np.integer,
-            minimum=0,
-            maximum=len(self.seq) * len(self.alphabet) - 1,
-            name="action",
-        )
-        self._observation_spec = {
-            "sequence": array_spec.BoundedArraySpec(
-                shape=(len(self.seq), len(self.alphabet)),
-                dtype=np.float32,
-                minimum=0,
-                maximum=1,
-            ),
-            "fitness": array_spec.BoundedArraySpec(
-                shape=(1,), minimum=0, maximum=1, dtype=np.float32
-            ),
-        }
-
-        self.num_steps = 0
-        self.max_num_steps = max_num_steps
-
-    def _reset(self):
-        self.previous_fitness = -float("inf")
-        self._state = {
-            "sequence": s_utils.string_to_one_hot(self.seq, self.alphabet).astype(
-                np.float32
-            ),
-            "fitness": self.model.get_fitness([self.seq]).astype(np.float32),
-        }
-        self.episode_seqs = set()
-        self.num_steps = 0
-        return ts.restart(self._state)
-
-    def action_spec(self):
-        """Define agent actions."""
-        return self._action_spec
-
-    def observation_spec(self):
-        """Define environment observations."""
-        return self._observation_spec
-
-    def get_state_string(self):
-        """Get sequence representing current state."""
-        return s_utils.one_hot_to_string(self._state["sequence"], self.alphabet)
-
     def sequence_density(self, seq):
         """Get average distance to `seq` out of all observed sequences."""
-        dens = 0
-        dist_radius = 2
-        for s in self.all_seqs:
-            dist = int(editdistance.eval(s, seq))
-            if dist != 0 and dist <= dist_radius:
-                dens += self.all_seqs[s] / dist
-        return dens
+        return self.density_index.density([seq])[0]
+
+    def close(self):
+        """Shut down the ground truth worker processes, if any."""
+        self.landscape_pool.close()
 
     def set_fitness_model_to_gt(self, fitness_model_is_gt):
         """
@@ -283,54 +287,14 @@ class DynaPPOEnvironmentMutative(py_environment.PyEnvironment):  # pylint: disab
         """
         self.fitness_model_is_gt = fitness_model_is_gt
 
-    def _step(self, action):
-        """Progress the agent one step in the environment.
-
-        The agent moves until the reward is decreasing. The number of sequences that
-        can be evaluated at each episode is capped to `self.max_num_steps`.
-        """
-        # if we've exceeded the maximum number of steps, terminate
-        if self.num_steps >= self.max_num_steps:
-            return ts.termination(self._state, 0)
-
-        # `action` is an integer representing which residue to mutate to 1
-        # along the flattened one-hot representation of the sequence
-        pos = action // len(self.alphabet)
-        res = action % len(self.alphabet)
-        self.num_steps += 1
-
-        # if we are trying to modify the sequence with a no-op, then stop
-        if self._state["sequence"][pos, res] == 1:
-            return ts.termination(self._state, 0)
-
-        self._state["sequence"][pos] = 0
-        self._state["sequence"][pos, res] = 1
-        state_string = s_utils.one_hot_to_string(self._state["sequence"], self.alphabet)
-
+    def _score(self, sequences):
         if self.fitness_model_is_gt:
-            self._state["fitness"] = self.landscape.get_fitness([state_string]).astype(
-                np.float32
-            )
+            fitnesses = self.landscape_pool.get_fitness(sequences)
         else:
-            self._state["fitness"] = self.model.get_fitness([state_string]).astype(
-                np.float32
-            )
-        self.all_seqs[state_string] = self._state["fitness"].item()
-
-        reward = self._state["fitness"].item() - self.lam * self.sequence_density(
-            state_string
-        )
-
-        # if we have seen the sequence this episode,
-        # terminate episode and punish
-        # (to prevent going in loops)
-        if state_string in self.episode_seqs:
-            return ts.termination(self._state, -1)
-        self.episode_seqs.add(state_string)
-
-        # if the reward is not increasing, then terminate
-        if reward < self.previous_fitness:
-            return ts.termination(self._state, reward=reward)
+            fitnesses = self.model.get_fitness(sequences)
+        fitnesses = np.asarray(fitnesses, dtype=np.float32)
+        self.all_seqs.update(zip(sequences, fitnesses.tolist()))
+        self.density_index.add(sequences, fitnesses)
 
-        self.previous_fitness = reward
-        return ts.transition(self._state, reward=reward)
+        densities = self.density_index.density(sequences)
+        return fitnesses, fitnesses - self.lam * densities
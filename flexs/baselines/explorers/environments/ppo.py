@@ -1,16 +1,23 @@
 """PPO environment module."""
+from typing import Sequence, Tuple
+
 import numpy as np
-from tf_agents.environments import py_environment
-from tf_agents.environments.utils import validate_py_environment
 from tf_agents.specs import array_spec
 from tf_agents.trajectories import time_step as ts
 
 import flexs
-from flexs.utils.sequence_utils import one_hot_to_string, string_to_one_hot
+from flexs.baselines.explorers.environments.batched import BatchedSequenceEnvironment
+from flexs.utils.sequence_utils import indices_to_sequences, sequences_to_indices
+
 
+class PPOEnvironment(BatchedSequenceEnvironment):  # pylint: disable=W0223
+    """
+    PPO environment based on TF-Agents.
 
-class PPOEnvironment(py_environment.PyEnvironment):  # pylint: disable=W0223
-    """PPO environment based on TF-Agents."""
+    Runs `batch_size` mutative episodes in parallel, querying the model once per
+    step for all of them. Episodes start from `self.seq` and end when a mutation
+    decreases the reward.
+    """
 
     def __init__(
         self,
@@ -18,6 +25,7 @@ class PPOEnvironment(py_environment.PyEnvironment):  # pylint: disable=W0223
         starting_seq: str,
         model: flexs.Model,
         max_num_steps: int,
+        batch_size: int = 1,
     ):  # pylint: disable=W0231
         """
         Initialize PPO agent environment.
@@ -34,108 +42,122 @@ class PPOEnvironment(py_environment.PyEnvironment):  # pylint: disable=W0223
             max_num_steps: Maximum number of steps before
                 episode is forced to terminate. Usually the
                 `model_queries_per_batch`.
+            batch_size: Number of episodes to batch together and run in parallel.
 
         """
         self.alphabet = alphabet
+        self._one_hots = np.eye(len(alphabet), dtype=np.float32)
 
         # model/model/measurements
         self.model = model
-        self.previous_fitness = -float("inf")
 
         # sequence
         self.seq = starting_seq
-        self._state = {
-            "sequence": string_to_one_hot(self.seq, self.alphabet).astype(np.float32),
-            "fitness": self.model.get_fitness([starting_seq]).astype(np.float32),
-        }
-        self.episode_seqs = set()  # the sequences seen in the current episode
         self.measured_sequences = {}
 
+        # per-episode state
+        self._codes = np.zeros((batch_size, len(starting_seq)), dtype=int)
+        self._fitnesses = np.zeros(batch_size, dtype=np.float32)
+        self.previous_fitness = np.full(batch_size, -np.inf, dtype=np.float32)
+        self.num_steps = np.zeros(batch_size, dtype=int)
+        # the sequences seen in the current episode
+        self.episode_seqs = [set() for _ in range(batch_size)]
+
         # tf_agents environment
-        self._action_spec = array_spec.BoundedArraySpec(
-            shape=(),
-            dtype=np.integer,
-            minimum=0,
-            maximum=len(self.seq) * len(self.alphabet) - 1,
-            name="action",
-        )
-        self._observation_spec = {
-            "sequence": array_spec.BoundedArraySpec(
-                shape=(len(self.seq), len(self.alphabet)),
-                dtype=np.float32,
+        self._init_batch(
+            batch_size,
+            action_spec=array_spec.BoundedArraySpec(
+                shape=(),
+                dtype=np.integer,
                 minimum=0,
-                maximum=1,
-            ),
-            "fitness": array_spec.BoundedArraySpec(
-                shape=(1,), minimum=1, maximum=1, dtype=np.float32
+                maximum=len(self.seq) * len(self.alphabet) - 1,
+                name="action",
             ),
-        }
-        self._time_step_spec = ts.time_step_spec(self._observation_spec)
+            observation_spec={
+                "sequence": array_spec.BoundedArraySpec(
+                    shape=(len(self.seq), len(self.alphabet)),
+                    dtype=np.float32,
+                    minimum=0,
+                    maximum=1,
+                ),
+                "fitness": array_spec.BoundedArraySpec(
+                    shape=(1,), minimum=0, maximum=1, dtype=np.float32
+                ),
+            },
+        )
 
-        self.num_steps = 0
         self.max_num_steps = max_num_steps
 
-        validate_py_environment(self, episodes=1)
-
-    def _reset(self):
-        self.previous_fitness = -float("inf")
-        self._state = {
-            "sequence": string_to_one_hot(self.seq, self.alphabet).astype(np.float32),
-            "fitness": self.model.get_fitness([self.seq]).astype(np.float32),
+    def _restart_episodes(self, episodes):
+        """Restart the episodes selected by the boolean mask `episodes`."""
+        self._codes[episodes] = sequences_to_indices([self.seq], self.alphabet)
+        self._fitnesses[episodes] = self.model.get_fitness([self.seq])
+        self.previous_fitness[episodes] = -np.inf
+        self.num_steps[episodes] = 0
+        for i in np.flatnonzero(episodes):
+            self.episode_seqs[i] = set()
+
+    def _observation(self):
+        return {
+            "sequence": self._one_hots[self._codes],
+            "fitness": self._fitnesses[:, None].copy(),
         }
-        self.episode_seqs = set()
-        self.num_steps = 0
-        return ts.restart(self._state)
-
-    def action_spec(self):
-        """Define agent actions."""
-        return self._action_spec
-
-    def observation_spec(self):
-        """Define environment observations."""
-        return self._observation_spec
 
     def get_state_string(self):
-        """Get sequence representing current state."""
-        return one_hot_to_string(self._state["sequence"], self.alphabet)
+        """Get sequences representing the current state of each episode."""
+        return indices_to_sequences(self._codes, self.alphabet)
 
-    def _step(self, action):
+    def _step(self, actions):
         """Progress the agent one step in the environment.
 
         The agent moves until the reward is decreasing. The number of sequences that
         can be evaluated at each episode is capped to `self.max_num_steps`.
         """
+        actions = np.asarray(actions).reshape(self._batch_size)
+        step_types, rewards, restarted = self._begin_step()
+
         # if we've exceeded the maximum number of steps, terminate
-        if self.num_steps >= self.max_num_steps:
-            return ts.termination(self._state, 0)
+        out_of_steps = ~restarted & (self.num_steps >= self.max_num_steps)
+        step_types[out_of_steps] = ts.StepType.LAST
+        active = ~restarted & ~out_of_steps
 
         # `action` is an integer representing which residue to mutate to 1
         # along the flattened one-hot representation of the sequence
-        pos = action // len(self.alphabet)
-        res = action % len(self.alphabet)
-        self.num_steps += 1
+        pos = actions // len(self.alphabet)
+        res = actions % len(self.alphabet)
+        self.num_steps[active] += 1
 
         # if we are trying to modify the sequence with a no-op, then stop
-        if self._state["sequence"][pos, res] == 1:
-            return ts.termination(self._state, 0)
-
-        self._state["sequence"][pos] = 0
-        self._state["sequence"][pos, res] = 1
-        state_string = one_hot_to_string(self._state["sequence"], self.alphabet)
-        self._state["fitness"] = self.model.get_fitness([state_string]).astype(
-            np.float32
-        )
-
-        # if we have seen the sequence this episode,
-        # terminate episode and punish
-        # (to prevent going in loops)
-        if state_string in self.episode_seqs:
-            return ts.termination(self._state, -1)
-        self.episode_seqs.add(state_string)
-
-        # if the reward is not increasing, then terminate
-        if self._state["fitness"] < self.previous_fitness:
-            return ts.termination(self._state, reward=self._state["fitness"].item())
-
-        self.previous_fitness = self._state["fitness"]
-        return ts.transition(self._state, reward=self._state["fitness"].item())
+        no_op = active & (self._codes[np.arange(self._batch_size), pos] == res)
+        step_types[no_op] = ts.StepType.LAST
+        active &= ~no_op
+
+        mutated = np.flatnonzero(active)
+        if len(mutated) > 0:
+            self._codes[mutated, pos[mutated]] = res[mutated]
+            state_strings = indices_to_sequences(self._codes[mutated], self.alphabet)
+            self._fitnesses[mutated], mutated_rewards = self._score(state_strings)
+
+            for i, state_string, reward in zip(mutated, state_strings, mutated_rewards):
+                # if we have seen the sequence this episode,
+                # terminate episode and punish
+                # (to prevent going in loops)
+                if state_string in self.episode_seqs[i]:
+                    step_types[i] = ts.StepType.LAST
+                    rewards[i] = -1
+                    continue
+                self.episode_seqs[i].add(state_string)
+
+                # if the reward is not increasing, then terminate
+                rewards[i] = reward
+                if reward < self.previous_fitness[i]:
+                    step_types[i] = ts.StepType.LAST
+                else:
+                    self.previous_fitness[i] = reward
+
+        return self._time_step(step_types, rewards)
+
+    def _score(self, sequences: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """Return the fitnesses of the mutated `sequences` and their rewards."""
+        fitnesses = self.model.get_fitness(sequences)
+        return fitnesses, np.asarray(fitnesses, dtype=np.float32)
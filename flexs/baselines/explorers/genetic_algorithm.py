@@ -3,10 +3,10 @@ from typing import Optional, Tuple
 
 import numpy as np
 import pandas as pd
-import torch
 
 import flexs
 from flexs.utils import sequence_utils as s_utils
+from flexs.utils.candidate_pool import CandidatePool
 
 
 class GeneticAlgorithm(flexs.Explorer):
@@ -23,6 +23,13 @@ class GeneticAlgorithm(flexs.Explorer):
            genetic algorithm based off of the Wright-Fisher model of evolution,
            where members of the population become parents with a probability
            exponential to their fitness (softmax the scores then sample).
+
+    Children are created by (optionally) recombining two parents with one-point
+    crossover and then mutating each residue with probability 1/L.
+
+    The population is stored as an integer matrix of residue indices and every
+    generation is mutated, recombined, selected and deduplicated with vectorised
+    numpy operations, so large populations (10^4 - 10^5) are practical.
     """
 
     def __init__(
@@ -40,8 +47,24 @@ class GeneticAlgorithm(flexs.Explorer):
         parent_selection_proportion: Optional[float] = None,
         beta: Optional[float] = None,
         seed: Optional[int] = None,
+        recombination_rate: float = 0,
     ):
-        """Create genetic algorithm."""
+        """
+        Create genetic algorithm.
+
+        Args:
+            population_size: Number of sequences in the population.
+            parent_selection_strategy: One of "top-proportion" or "wright-fisher".
+            children_proportion: Number of children created per generation as a
+                proportion of `population_size`.
+            parent_selection_proportion: Proportion of the population eligible to
+                be parents (if "top-proportion").
+            beta: Temperature of the softmax over scores (if "wright-fisher").
+            seed: Integer seed for random number generator.
+            recombination_rate: Probability that a child is created by one-point
+                crossover of its parent with another parent before mutation.
+
+        """
         name = (
             f"GeneticAlgorithm_pop_size={population_size}_"
             f"parents={parent_selection_strategy}"
@@ -79,6 +102,7 @@ class GeneticAlgorithm(flexs.Explorer):
         self.beta = beta
 
         self.children_proportion = children_proportion
+        self.recombination_rate = recombination_rate
         self.parent_selection_proportion = parent_selection_proportion
 
         self.rng = np.random.default_rng(seed)
@@ -90,64 +114,87 @@ class GeneticAlgorithm(flexs.Explorer):
             return self.rng.choice(np.argsort(scores)[-k:], num_parents)
 
         # Then self.parent_selection_strategy == "wright-fisher":
-        fitnesses = np.exp(scores / self.beta)
-        probs = torch.Tensor(fitnesses / np.sum(fitnesses))
-        return torch.multinomial(probs, num_parents, replacement=True).numpy()
+        # softmax of the scores, shifted by the max score for numerical stability
+        logits = scores / self.beta
+        fitnesses = np.exp(logits - np.max(logits))
+        probs = fitnesses / np.sum(fitnesses)
+        return self.rng.choice(len(scores), num_parents, p=probs)
+
+    def _recombine(self, parents):
+        """One-point crossover of each parent with a random partner (vectorised)."""
+        num_parents, seq_len = parents.shape
+        if self.recombination_rate == 0 or seq_len < 2:
+            return parents
+
+        partners = parents[self.rng.permutation(num_parents)]
+        recombine = self.rng.random(num_parents) < self.recombination_rate
+        crossover_points = self.rng.integers(1, seq_len, size=num_parents)
+
+        from_partner = np.arange(seq_len) >= crossover_points[:, None]
+        from_partner &= recombine[:, None]
+        return np.where(from_partner, partners, parents)
+
+    def _mutate(self, parents):
+        """Mutate each residue with probability 1/L (vectorised)."""
+        mutate = self.rng.random(parents.shape) < 1 / parents.shape[1]
+        residues = self.rng.integers(0, len(self.alphabet), size=parents.shape)
+        return np.where(mutate, residues, parents)
 
     def propose_sequences(
         self, measured_sequences: pd.DataFrame
     ) -> Tuple[np.ndarray, np.ndarray]:
         """Propose top `sequences_batch_size` sequences for evaluation."""
-        # Set the torch seed by generating a random integer from the pre-seeded self.rng
-        torch.manual_seed(self.rng.integers(-(2**31), 2**31))
-
-        measured_sequence_set = set(measured_sequences["sequence"])
+        # The population is kept as an integer matrix of residue indices, and
+        # sequences are deduplicated by their 64-bit row hashes
+        measured_codes = s_utils.sequences_to_indices(
+            measured_sequences["sequence"], self.alphabet
+        )
+        measured_scores = measured_sequences["true_score"].to_numpy()
+        seen_hashes = set(s_utils.hash_indices(measured_codes).tolist())
 
         # Create initial population by choosing parents from `measured_sequences`
-        initial_pop_inds = self._choose_parents(
-            measured_sequences["true_score"].to_numpy(),
-            self.population_size,
-        )
-        pop = measured_sequences["sequence"].to_numpy()[initial_pop_inds]
-        scores = measured_sequences["true_score"].to_numpy()[initial_pop_inds]
+        initial_pop_inds = self._choose_parents(measured_scores, self.population_size)
+        pop = measured_codes[initial_pop_inds]
+        scores = measured_scores[initial_pop_inds]
 
-        sequences = {}
+        new_sequences = CandidatePool(self.sequences_batch_size)
         initial_cost = self.model.cost
         while (
             self.model.cost - initial_cost + self.population_size
             < self.model_queries_per_batch
+            and not (len(new_sequences) > 0 and self.time_budget_spent())
         ):
             # Create "children" by recombining parents selected from population
-            # according to self.parent_selection_strategy and
-            # self.recombination_strategy
+            # according to self.parent_selection_strategy and then mutating them
             num_children = int(self.children_proportion * self.population_size)
             parents = pop[self._choose_parents(scores, num_children)]
+            children = self._mutate(self._recombine(parents))
+
+            # Keep the first copy of each child that has never been seen before
+            child_hashes = s_utils.hash_indices(children)
+            _, first_inds = np.unique(child_hashes, return_index=True)
+            first_inds = np.sort(first_inds)
+            is_new = np.array(
+                [h not in seen_hashes for h in child_hashes[first_inds].tolist()],
+                dtype=bool,
+            )
+            keep = first_inds[is_new]
 
-            # Single-point mutation of children (for now)
-            children = []
-            for seq in parents:
-                child = s_utils.generate_random_mutant(seq, 1 / len(seq), self.alphabet)
-
-                if child not in measured_sequence_set and child not in sequences:
-                    children.append(child)
-
-            if len(children) == 0:
+            if len(keep) == 0:
                 continue
 
-            children = np.array(children)
-            child_scores = self.model.get_fitness(children)
+            children = children[keep]
+            seen_hashes.update(child_hashes[keep].tolist())
+            child_seqs = s_utils.indices_to_sequences(children, self.alphabet)
+            child_scores = self.model.get_fitness(child_seqs)
 
             # Now kick out the worst samples and replace them with the new children
             argsorted_scores = np.argsort(scores)
             pop[argsorted_scores[: len(children)]] = children
             scores[argsorted_scores[: len(children)]] = child_scores
 
-            sequences.update(zip(children, child_scores))
+            new_sequences.add(child_seqs, child_scores)
 
         # We propose the top `self.sequences_batch_size`
         # new sequences we have generated
-        new_seqs = np.array(list(sequences.keys()))
-        preds = np.array(list(sequences.values()))
-        sorted_order = np.argsort(preds)[: -self.sequences_batch_size : -1]
-
-        return new_seqs[sorted_order], preds[sorted_order]
+        return new_sequences.top()
@@ -1,5 +1,4 @@
 """PPO explorer."""
-
 from functools import partial
 from typing import Optional, Tuple
 
@@ -9,12 +8,15 @@ import tensorflow as tf
 from tf_agents.agents.ppo import ppo_agent
 from tf_agents.drivers import dynamic_episode_driver
 from tf_agents.environments import tf_py_environment
+from tf_agents.environments.utils import validate_py_environment
 from tf_agents.metrics import tf_metrics
 from tf_agents.networks import actor_distribution_network, value_network
 from tf_agents.replay_buffers import tf_uniform_replay_buffer
 
 import flexs
 from flexs.baselines.explorers.environments.ppo import PPOEnvironment as PPOEnv
+from flexs.baselines.explorers.torch_ppo import TorchPPOAgent
+from flexs.utils.candidate_pool import CandidatePool
 from flexs.utils.sequence_utils import one_hot_to_string
 
 
@@ -39,8 +41,23 @@ class PPO(flexs.Explorer):
         starting_sequence: str,
         alphabet: str,
         log_file: Optional[str] = None,
+        env_batch_size: int = 4,
+        backend: str = "tf_agents",
     ):
-        """Create PPO explorer."""
+        """
+        Create PPO explorer.
+
+        Args:
+            env_batch_size: Number of epsisodes to batch together and run in parallel.
+            backend: Either "tf_agents", or "torch" to use the lightweight
+                `TorchPPOAgent` instead of tf_agents' drivers and PPO agent. The
+                environment is a tf_agents `PyEnvironment` either way, so
+                tf_agents is still required.
+
+        """
+        if backend not in ["tf_agents", "torch"]:
+            raise ValueError("`backend` must be one of 'tf_agents' or 'torch'")
+
         super().__init__(
             model,
             "PPO_Agent",
@@ -52,15 +69,32 @@ class PPO(flexs.Explorer):
         )
 
         self.alphabet = alphabet
-
-        # Initialize tf_environment
-        env = PPOEnv(
+        # Episode-end sequences and fitnesses of the current proposal, which
+        # episodes restart from
+        self.episode_end_sequences = {}
+        self.env_batch_size = env_batch_size
+        self.backend = backend
+
+        # Initialize environment
+        self.env = PPOEnv(
             alphabet=self.alphabet,
             starting_seq=starting_sequence,
             model=self.model,
             max_num_steps=self.model_queries_per_batch,
+            batch_size=env_batch_size,
         )
-        self.tf_env = tf_py_environment.TFPyEnvironment(env)
+        validate_py_environment(self.env, episodes=1)
+
+        if backend == "torch":
+            num_actions = len(starting_sequence) * len(alphabet)
+            self.agent = TorchPPOAgent(
+                observation_size=num_actions,
+                num_actions=num_actions,
+                preprocess=lambda obs: obs["sequence"].reshape(env_batch_size, -1),
+            )
+            return
+
+        self.tf_env = tf_py_environment.TFPyEnvironment(self.env)
 
         encoder_layer = tf.keras.layers.Lambda(lambda obs: obs["sequence"])
         actor_net = actor_distribution_network.ActorDistributionNetwork(
@@ -87,6 +121,42 @@ class PPO(flexs.Explorer):
         )
         self.agent.initialize()
 
+    def add_last_seqs(self, is_last, observation, new_seqs):
+        """Add the sequences of the batch's episodes that have just ended.
+
+        Since the environment ends the episode when the score is non-increasing, it
+        adds the associated maximum-valued sequence to the batch.
+
+        It then changes the "current sequence" of the environment to one of the top
+        sequences, so that when episodes restart, mutants are generated from that
+        new sequence.
+        """
+        is_last = np.asarray(is_last)
+        if not is_last.any():
+            return
+
+        seq_states = np.asarray(observation["sequence"])[is_last]
+        fitnesses = np.asarray(observation["fitness"])[is_last]
+        episode_ends = {
+            one_hot_to_string(seq_state, self.alphabet): fitness.squeeze()
+            for seq_state, fitness in zip(seq_states, fitnesses)
+        }
+        new_seqs.add(list(episode_ends), list(episode_ends.values()))
+
+        # Restarts are drawn from every episode end of the proposal, including
+        # measured sequences and those that didn't make it into `new_seqs`
+        self.episode_end_sequences.update(episode_ends)
+        top_fitness = max(self.episode_end_sequences.values())
+        top_sequences = [
+            seq
+            for seq, fitness in self.episode_end_sequences.items()
+            if fitness >= 0.9 * top_fitness
+        ]
+        if len(top_sequences) > 0:
+            self.env.seq = np.random.choice(top_sequences)
+        else:
+            self.env.seq = np.random.choice(list(self.episode_end_sequences))
+
     def add_last_seq_in_trajectory(self, experience, new_seqs):
         """Add the last sequence in an episode's trajectory.
 
@@ -98,64 +168,78 @@ class PPO(flexs.Explorer):
         to the next one in `last_batch`, so that when the environment resets, mutants
         are generated from that new sequence.
         """
-        if experience.is_boundary():
-            seq = one_hot_to_string(
-                experience.observation["sequence"].numpy()[0], self.alphabet
+        self.add_last_seqs(
+            experience.is_boundary().numpy(),
+            tf.nest.map_structure(lambda x: x.numpy(), experience.observation),
+            new_seqs,
+        )
+
+    def collect_and_train(self, should_stop, new_seqs):
+        """
+        Collect episodes with the current policy until `should_stop()`, then train
+        the policy on them.
+
+        The sequences of finished episodes are added to `new_seqs`.
+        """
+        if self.backend == "torch":
+            rollout, _ = self.agent.collect(
+                self.env,
+                should_stop,
+                observers=[
+                    lambda time_step: self.add_last_seqs(
+                        time_step.is_last(), time_step.observation, new_seqs
+                    )
+                ],
             )
-            new_seqs[seq] = experience.observation["fitness"].numpy().squeeze()
-
-            top_fitness = max(new_seqs.values())
-            top_sequences = [
-                seq for seq, fitness in new_seqs.items() if fitness >= 0.9 * top_fitness
-            ]
-            if len(top_sequences) > 0:
-                self.tf_env.pyenv.envs[0].seq = np.random.choice(top_sequences)
-            else:
-                self.tf_env.pyenv.envs[0].seq = np.random.choice(
-                    [seq for seq, _ in new_seqs.items()]
-                )
+            self.agent.train(rollout)
+            return
 
-    def propose_sequences(
-        self, measured_sequences_data: pd.DataFrame
-    ) -> Tuple[np.ndarray, np.ndarray]:
-        """Propose top `sequences_batch_size` sequences for evaluation."""
-        num_parallel_environments = 1
         replay_buffer_capacity = 10001
         replay_buffer = tf_uniform_replay_buffer.TFUniformReplayBuffer(
             self.agent.collect_data_spec,
-            batch_size=num_parallel_environments,
+            batch_size=self.env_batch_size,
             max_length=replay_buffer_capacity,
         )
 
-        sequences = {}
         collect_driver = dynamic_episode_driver.DynamicEpisodeDriver(
             self.tf_env,
             self.agent.collect_policy,
             observers=[
                 replay_buffer.add_batch,
-                partial(self.add_last_seq_in_trajectory, new_seqs=sequences),
+                partial(self.add_last_seq_in_trajectory, new_seqs=new_seqs),
                 tf_metrics.NumberOfEpisodes(),
                 tf_metrics.EnvironmentSteps(),
             ],
             num_episodes=1,
         )
 
-        previous_model_cost = self.model.cost
-        while self.model.cost - previous_model_cost < self.model_queries_per_batch:
-            collect_driver.run()
+        # Episodes in the batch end at different steps, so resume collection from
+        # the last time step rather than resetting the unfinished episodes
+        time_step = None
+        while not should_stop():
+            time_step, _ = collect_driver.run(time_step=time_step)
 
         trajectories = replay_buffer.gather_all()
         self.agent.train(experience=trajectories)
         replay_buffer.clear()
 
-        # We propose the top `self.sequences_batch_size` new sequences we have generated
-        sequences = {
-            seq: fitness
-            for seq, fitness in sequences.items()
-            if seq not in set(measured_sequences_data["sequence"])
-        }
-        new_seqs = np.array(list(sequences.keys()))
-        preds = np.array(list(sequences.values()))
-        sorted_order = np.argsort(preds)[: -self.sequences_batch_size : -1]
+    def propose_sequences(
+        self, measured_sequences_data: pd.DataFrame
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Propose top `sequences_batch_size` sequences for evaluation."""
+        sequences = CandidatePool(
+            self.sequences_batch_size, exclude=measured_sequences_data["sequence"]
+        )
+        self.episode_end_sequences = {}
+        previous_model_cost = self.model.cost
 
-        return new_seqs[sorted_order], preds[sorted_order]
+        def budget_spent():
+            return (
+                self.model.cost - previous_model_cost >= self.model_queries_per_batch
+                or (len(sequences) > 0 and self.time_budget_spent())
+            )
+
+        self.collect_and_train(budget_spent, sequences)
+
+        # We propose the top `self.sequences_batch_size` new sequences we have generated
+        return sequences.top()
@@ -0,0 +1,261 @@
+"""Lightweight PPO implementation in torch, used as an alternative PPO backend."""
+from typing import Callable, Iterable, NamedTuple, Optional, Tuple
+
+import numpy as np
+import torch
+from tf_agents.environments import py_environment
+from tf_agents.trajectories import time_step as ts
+from torch import nn, optim
+
+
+class Rollout(NamedTuple):
+    """
+    Transitions collected from a batched environment.
+
+    All arrays have leading dimensions `(num_steps, batch_size)`, except for
+    `last_values` which holds the value estimates of the observations following
+    the last step.
+    """
+
+    observations: np.ndarray
+    actions: np.ndarray
+    log_probs: np.ndarray
+    values: np.ndarray
+    rewards: np.ndarray
+    discounts: np.ndarray
+    valid: np.ndarray
+    last_values: np.ndarray
+
+
+def compute_gae(
+    rewards: np.ndarray,
+    values: np.ndarray,
+    discounts: np.ndarray,
+    last_values: np.ndarray,
+    gamma: float,
+    gae_lambda: float,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Compute generalized advantage estimates, vectorised over the batch dimension.
+
+    Args:
+        rewards: Rewards received after each step, shape `(num_steps, batch_size)`.
+        values: Value estimates of each step's observation.
+        discounts: Discounts received after each step (0 at episode ends).
+        last_values: Value estimates of the observations following the last step.
+        gamma: Discount factor.
+        gae_lambda: GAE mixing parameter.
+
+    Returns:
+        Advantages and returns (advantages + values), both of shape
+        `(num_steps, batch_size)`.
+
+    """
+    next_values = np.concatenate([values[1:], last_values[None]], axis=0)
+    deltas = rewards + gamma * discounts * next_values - values
+
+    advantages = np.zeros_like(deltas)
+    advantage = np.zeros_like(last_values)
+    for t in reversed(range(len(deltas))):
+        advantage = deltas[t] + gamma * gae_lambda * discounts[t] * advantage
+        advantages[t] = advantage
+
+    return advantages, advantages + values
+
+
+def _mlp(input_size, hidden_size, output_size):
+    return nn.Sequential(
+        nn.Linear(input_size, hidden_size),
+        nn.ReLU(),
+        nn.Linear(hidden_size, output_size),
+    )
+
+
+class TorchPPOAgent:
+    """
+    PPO agent with separate actor and value MLPs and a clipped surrogate objective.
+
+    Drives batched tf_agents `PyEnvironment`s directly with numpy arrays, so
+    collection involves no tensorflow graphs, drivers or replay buffers (tf_agents
+    is still imported for the environment and time step types).
+    """
+
+    def __init__(
+        self,
+        observation_size: int,
+        num_actions: int,
+        preprocess: Callable[[object], np.ndarray],
+        hidden_size: int = 128,
+        learning_rate: float = 1e-5,
+        num_epochs: int = 10,
+        minibatch_size: int = 512,
+        gamma: float = 0.99,
+        gae_lambda: float = 0.95,
+        clip_ratio: float = 0.2,
+        value_coef: float = 0.5,
+        entropy_coef: float = 0.0,
+        device: str = "cpu",
+    ):
+        """
+        Args:
+            observation_size: Size of preprocessed (flattened) observations.
+            num_actions: Number of discrete actions.
+            preprocess: Function mapping a batch of environment observations to a
+                `(batch_size, observation_size)` array.
+            hidden_size: Width of the hidden layer of both networks.
+            learning_rate: Adam learning rate.
+            num_epochs: Number of passes over each rollout during training.
+            minibatch_size: Number of transitions per gradient step.
+            gamma: Discount factor.
+            gae_lambda: GAE mixing parameter.
+            clip_ratio: PPO clipping range of the importance ratio.
+            value_coef: Weight of the value loss.
+            entropy_coef: Weight of the entropy bonus.
+            device: Torch device to run the networks on.
+
+        """
+        self.preprocess = preprocess
+        self.num_epochs = num_epochs
+        self.minibatch_size = minibatch_size
+        self.gamma = gamma
+        self.gae_lambda = gae_lambda
+        self.clip_ratio = clip_ratio
+        self.value_coef = value_coef
+        self.entropy_coef = entropy_coef
+        self.device = device
+
+        self.actor_net = _mlp(observation_size, hidden_size, num_actions).to(device)
+        self.value_net = _mlp(observation_size, hidden_size, 1).to(device)
+        self.optimizer = optim.Adam(
+            list(self.actor_net.parameters()) + list(self.value_net.parameters()),
+            lr=learning_rate,
+        )
+
+    def _as_tensor(self, array, dtype=torch.float32):
+        return torch.as_tensor(np.asarray(array), dtype=dtype, device=self.device)
+
+    @torch.no_grad()
+    def act(self, observations: np.ndarray) -> Tuple[np.ndarray, ...]:
+        """Sample actions for a batch of preprocessed observations.
+
+        Returns:
+            Actions, their log probabilities and the value estimates of the
+            observations.
+
+        """
+        obs = self._as_tensor(observations)
+        dist = torch.distributions.Categorical(logits=self.actor_net(obs))
+        actions = dist.sample()
+        return (
+            actions.cpu().numpy(),
+            dist.log_prob(actions).cpu().numpy(),
+            self.value_net(obs).squeeze(-1).cpu().numpy(),
+        )
+
+    def collect(
+        self,
+        env: py_environment.PyEnvironment,
+        should_stop: Callable[[], bool],
+        time_step: Optional[ts.TimeStep] = None,
+        observers: Iterable[Callable[[ts.TimeStep], None]] = (),
+    ) -> Tuple[Rollout, ts.TimeStep]:
+        """
+        Step a batched environment with the current policy until `should_stop()`.
+
+        Environments that restart finished episodes by themselves are stepped
+        through episode ends; the others are reset once all their episodes have
+        ended. Transitions out of a terminal observation are masked out of
+        training.
+
+        Args:
+            env: Batched environment.
+            should_stop: Checked after every step.
+            time_step: Time step to resume from. The environment is reset if None.
+            observers: Called with every time step returned by `env.step`.
+
+        Returns:
+            The collected rollout and the time step to resume from.
+
+        """
+        if time_step is None:
+            time_step = env.reset()
+
+        steps = []
+        while True:
+            observations = self.preprocess(time_step.observation)
+            actions, log_probs, values = self.act(observations)
+            next_time_step = env.step(actions)
+            for observer in observers:
+                observer(next_time_step)
+
+            steps.append(
+                (
+                    observations,
+                    actions,
+                    log_probs,
+                    values,
+                    np.asarray(next_time_step.reward, dtype=np.float32),
+                    np.asarray(next_time_step.discount, dtype=np.float32),
+                    ~np.asarray(time_step.is_last()),
+                )
+            )
+
+            time_step = next_time_step
+            if np.all(time_step.is_last()):
+                time_step = env.reset()
+            if should_stop():
+                break
+
+        _, _, last_values = self.act(self.preprocess(time_step.observation))
+        return Rollout(*map(np.stack, zip(*steps)), last_values=last_values), time_step
+
+    def train(self, rollout: Rollout):
+        """Run clipped PPO updates on minibatches of a collected rollout."""
+        advantages, returns = compute_gae(
+            rollout.rewards,
+            rollout.values,
+            rollout.discounts,
+            rollout.last_values,
+            self.gamma,
+            self.gae_lambda,
+        )
+
+        valid = rollout.valid
+        if not valid.any():
+            return
+
+        obs = self._as_tensor(rollout.observations[valid])
+        actions = self._as_tensor(rollout.actions[valid], dtype=torch.long)
+        old_log_probs = self._as_tensor(rollout.log_probs[valid])
+        advantages = self._as_tensor(advantages[valid])
+        returns = self._as_tensor(returns[valid])
+        if len(advantages) > 1:
+            advantages = (advantages - advantages.mean()) / (advantages.std() + 1e-8)
+
+        num_transitions = len(obs)
+        for _ in range(self.num_epochs):
+            order = torch.randperm(num_transitions, device=self.device)
+            for start in range(0, num_transitions, self.minibatch_size):
+                batch = order[start : start + self.minibatch_size]
+
+                logits = self.actor_net(obs[batch])
+                dist = torch.distributions.Categorical(logits=logits)
+                ratio = torch.exp(dist.log_prob(actions[batch]) - old_log_probs[batch])
+                clipped_ratio = torch.clamp(
+                    ratio, 1 - self.clip_ratio, 1 + self.clip_ratio
+                )
+                policy_loss = -torch.min(
+                    ratio * advantages[batch], clipped_ratio * advantages[batch]
+                ).mean()
+
+                values = self.value_net(obs[batch]).squeeze(-1)
+                value_loss = ((values - returns[batch]) ** 2).mean()
+
+                loss = (
+                    policy_loss
+                    + self.value_coef * value_loss
+                    - self.entropy_coef * dist.entropy().mean()
+                )
+                self.optimizer.zero_grad()
+                loss.backward()
+                self.optimizer.step()
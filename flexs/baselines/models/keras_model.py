@@ -66,6 +66,56 @@ class KerasModel(flexs.Model):
             verbose=verbose,
         )
 
+    def get_state(self):
+        """Return the keras model's input shape and weights."""
+        return {
+            "input_shape": self.model.input_shape,
+            "weights": self.model.get_weights(),
+        }
+
+    def set_state(self, state):
+        """Build the keras model if needed and restore its weights."""
+        if not self.model.built:
+            self.model.build(state["input_shape"])
+        self.model.set_weights(state["weights"])
+
+    def _fitness_function_mutants(self, parent, mutations):
+        # Only networks that flatten the one-hot input into a dense layer support
+        # updating the first layer's pre-activations with a few kernel rows
+        layers = self.model.layers
+        if not (
+            self.model.built
+            and len(layers) >= 2
+            and isinstance(layers[0], tf.keras.layers.Flatten)
+            and isinstance(layers[1], tf.keras.layers.Dense)
+            and layers[1].use_bias
+        ):
+            return super()._fitness_function_mutants(parent, mutations)
+
+        dense = layers[1]
+        kernel, bias = dense.get_weights()
+        alphabet_size = len(self.alphabet)
+
+        parent_indices = s_utils.sequences_to_indices([parent], self.alphabet)[0]
+        parent_rows = np.arange(len(parent)) * alphabet_size + parent_indices
+        parent_preactivation = kernel[parent_rows].sum(axis=0) + bias
+
+        mutant_ids, positions, residues = s_utils.mutations_to_indices(
+            mutations, self.alphabet
+        )
+        deltas = (
+            kernel[positions * alphabet_size + residues]
+            - kernel[parent_rows[positions]]
+        )
+        preactivations = np.tile(parent_preactivation, (len(mutations), 1))
+        np.add.at(preactivations, mutant_ids, deltas)
+
+        outputs = dense.activation(tf.convert_to_tensor(preactivations))
+        for layer in layers[2:]:
+            outputs = layer(outputs, training=False)
+
+        return np.nan_to_num(outputs.numpy().squeeze(axis=1))
+
     def _fitness_function(self, sequences):
         one_hots = tf.convert_to_tensor(
             np.array(
@@ -1,5 +1,6 @@
 """Define scikit-learn model wrappers as well a few convenient pre-wrapped models."""
 import abc
+import copy
 
 import numpy as np
 import sklearn.ensemble
@@ -8,6 +9,27 @@ import sklearn.linear_model
 import flexs
 from flexs.utils import sequence_utils as s_utils
 
+# Regressors whose `predict` is exactly `X @ coef_ + intercept_`. Generalized
+# linear models such as `PoissonRegressor` apply a link function on top, so they
+# are left out.
+_LINEAR_REGRESSORS = (
+    sklearn.linear_model.ARDRegression,
+    sklearn.linear_model.BayesianRidge,
+    sklearn.linear_model.ElasticNet,
+    sklearn.linear_model.ElasticNetCV,
+    sklearn.linear_model.HuberRegressor,
+    sklearn.linear_model.Lars,
+    sklearn.linear_model.LarsCV,
+    sklearn.linear_model.LassoCV,
+    sklearn.linear_model.LinearRegression,
+    sklearn.linear_model.OrthogonalMatchingPursuit,
+    sklearn.linear_model.QuantileRegressor,
+    sklearn.linear_model.Ridge,
+    sklearn.linear_model.RidgeCV,
+    sklearn.linear_model.SGDRegressor,
+    sklearn.linear_model.TheilSenRegressor,
+)
+
 
 class SklearnModel(flexs.Model, abc.ABC):
     """Base sklearn model wrapper."""
@@ -35,6 +57,14 @@ class SklearnModel(flexs.Model, abc.ABC):
         )
         self.model.fit(flattened, labels)
 
+    def get_state(self):
+        """Return a copy of the fitted sklearn model."""
+        return copy.deepcopy(self.model)
+
+    def set_state(self, state):
+        """Replace the sklearn model with a fitted copy."""
+        self.model = copy.deepcopy(state)
+
 
 class SklearnRegressor(SklearnModel, abc.ABC):
     """Class for sklearn regressors (uses `model.predict`)."""
@@ -49,6 +79,58 @@ class SklearnRegressor(SklearnModel, abc.ABC):
 
         return self.model.predict(flattened)
 
+    def _linear_coefficients(self, seq_len):
+        """
+        Return the `(seq_len, len(alphabet))` coefficients and intercept of fitted
+        sklearn linear regressors (see `_LINEAR_REGRESSORS`), or None for other
+        models.
+
+        Their predictions are sums of one coefficient per (position, residue), so
+        mutants only update a few terms.
+        """
+        coef = np.ravel(getattr(self.model, "coef_", []))
+        if not (
+            isinstance(self.model, _LINEAR_REGRESSORS)
+            and len(coef) == seq_len * len(self.alphabet)
+        ):
+            return None
+
+        return coef.reshape(seq_len, -1), np.ravel(self.model.intercept_)[0]
+
+    def _fitness_function_mutants(self, parent, mutations):
+        linear_coefficients = self._linear_coefficients(len(parent))
+        if linear_coefficients is None:
+            return super()._fitness_function_mutants(parent, mutations)
+        coef, intercept = linear_coefficients
+
+        parent_indices = s_utils.sequences_to_indices([parent], self.alphabet)[0]
+        parent_terms = coef[np.arange(len(parent)), parent_indices]
+
+        mutant_ids, positions, residues = s_utils.mutations_to_indices(
+            mutations, self.alphabet
+        )
+        deltas = coef[positions, residues] - parent_terms[positions]
+
+        return (
+            parent_terms.sum()
+            + intercept
+            + np.bincount(mutant_ids, weights=deltas, minlength=len(mutations))
+        )
+
+    def _mutational_scan(self, sequence, alphabet):
+        linear_coefficients = self._linear_coefficients(len(sequence))
+        if linear_coefficients is None or not set(alphabet) <= set(self.alphabet):
+            return super()._mutational_scan(sequence, alphabet)
+        coef, intercept = linear_coefficients
+
+        parent_indices = s_utils.sequences_to_indices([sequence], self.alphabet)[0]
+        parent_terms = coef[np.arange(len(sequence)), parent_indices]
+        columns = [self.alphabet.index(residue) for residue in alphabet]
+
+        return (
+            parent_terms.sum() + intercept + coef[:, columns] - parent_terms[:, None]
+        )
+
 
 class SklearnClassifier(SklearnModel, abc.ABC):
     """Class for sklearn classifiers (uses `model.predict_proba(...)[:, 1]`)."""
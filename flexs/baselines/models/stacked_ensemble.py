@@ -0,0 +1,283 @@
+"""Define the StackedEnsemble model, an ensemble of identical networks in one graph."""
+from typing import Callable, Optional
+
+import numpy as np
+import tensorflow as tf
+
+import flexs
+from flexs.types import SEQUENCES_TYPE
+from flexs.utils import sequence_utils as s_utils
+
+
+class StackedDense(tf.keras.layers.Layer):
+    """
+    `num_members` independent dense layers applied in one batched matmul.
+
+    Inputs and outputs have a leading ensemble dimension:
+    `(num_members, batch_size, features)`.
+    """
+
+    def __init__(self, num_members: int, units: int, activation=None, **kwargs):
+        """Create the layer."""
+        super().__init__(**kwargs)
+        self.num_members = num_members
+        self.units = units
+        self.activation = tf.keras.activations.get(activation)
+
+    def build(self, input_shape):
+        """Create a kernel and bias for every member."""
+        self.kernel = self.add_weight(
+            name="kernel",
+            shape=(self.num_members, input_shape[-1], self.units),
+            initializer="glorot_uniform",
+        )
+        self.bias = self.add_weight(
+            name="bias", shape=(self.num_members, 1, self.units), initializer="zeros"
+        )
+
+    def call(self, inputs):
+        """Apply each member's kernel to its slice of `inputs`."""
+        return self.activation(
+            tf.einsum("nbi,nio->nbo", inputs, self.kernel) + self.bias
+        )
+
+
+class StackedConv1D(tf.keras.layers.Layer):
+    """
+    `num_members` independent 1D convolutions (stride 1) computed together.
+
+    Inputs and outputs have shape `(num_members, batch_size, length, channels)`.
+    Sliding windows are extracted once and contracted against every member's
+    kernel in a single einsum.
+    """
+
+    def __init__(
+        self,
+        num_members: int,
+        filters: int,
+        kernel_size: int,
+        padding: str = "valid",
+        activation=None,
+        **kwargs,
+    ):
+        """Create the layer."""
+        super().__init__(**kwargs)
+        if padding not in ["valid", "same"]:
+            raise ValueError("`padding` must be one of 'valid' or 'same'")
+
+        self.num_members = num_members
+        self.filters = filters
+        self.kernel_size = kernel_size
+        self.padding = padding
+        self.activation = tf.keras.activations.get(activation)
+
+    def build(self, input_shape):
+        """Create a kernel and bias for every member."""
+        self.kernel = self.add_weight(
+            name="kernel",
+            shape=(self.num_members, self.kernel_size, input_shape[-1], self.filters),
+            initializer="glorot_uniform",
+        )
+        self.bias = self.add_weight(
+            name="bias",
+            shape=(self.num_members, 1, 1, self.filters),
+            initializer="zeros",
+        )
+
+    def call(self, inputs):
+        """Convolve each member's kernel with its slice of `inputs`."""
+        if self.padding == "same":
+            left = (self.kernel_size - 1) // 2
+            right = self.kernel_size - 1 - left
+            inputs = tf.pad(inputs, [[0, 0], [0, 0], [left, right], [0, 0]])
+
+        windows = tf.signal.frame(inputs, self.kernel_size, 1, axis=2)
+        outputs = tf.einsum("nbtkc,nkcf->nbtf", windows, self.kernel)
+        return self.activation(outputs + self.bias)
+
+
+def _stacked_mlp(num_members, hidden_size, seq_len, alphabet_size):
+    return [
+        tf.keras.layers.Lambda(
+            lambda x: tf.reshape(x, [num_members, -1, seq_len * alphabet_size])
+        ),
+        StackedDense(num_members, hidden_size, activation="relu"),
+        StackedDense(num_members, hidden_size, activation="relu"),
+        StackedDense(num_members, hidden_size, activation="relu"),
+        StackedDense(num_members, 1),
+    ]
+
+
+def _stacked_cnn(num_members, hidden_size, num_filters, kernel_size, alphabet_size):
+    return [
+        StackedConv1D(
+            num_members, num_filters, kernel_size, padding="valid", activation="relu"
+        ),
+        StackedConv1D(
+            num_members, num_filters, kernel_size, padding="same", activation="relu"
+        ),
+        StackedConv1D(
+            num_members,
+            num_filters,
+            alphabet_size - 1,
+            padding="same",
+            activation="relu",
+        ),
+        tf.keras.layers.Lambda(lambda x: tf.reduce_max(x, axis=2)),
+        StackedDense(num_members, hidden_size, activation="relu"),
+        StackedDense(num_members, hidden_size, activation="relu"),
+        tf.keras.layers.Dropout(0.25),
+        StackedDense(num_members, 1),
+    ]
+
+
+class StackedEnsemble(flexs.Model):
+    """
+    An ensemble of `num_members` identical MLPs or CNNs held as one network.
+
+    Every weight has a leading ensemble dimension, so a query one-hot encodes the
+    sequences once and runs a single forward pass returning a
+    `(num_seqs, num_members)` prediction matrix, which is then passed to
+    `combine_with` (as in `flexs.Ensemble`). The architectures mirror
+    `baselines.models.MLP` and `baselines.models.CNN`.
+
+    Each member is trained on its own bootstrap resample of the training set,
+    implemented as per-member sample weights on the shared batches.
+    """
+
+    def __init__(
+        self,
+        seq_len: int,
+        alphabet: str,
+        num_members: int = 3,
+        architecture: str = "cnn",
+        hidden_size: int = 100,
+        num_filters: int = 32,
+        kernel_size: int = 5,
+        combine_with: Callable[[np.ndarray], np.ndarray] = lambda x: np.mean(x, axis=1),
+        bootstrap: bool = True,
+        learning_rate: float = 1e-3,
+        batch_size: int = 256,
+        epochs: int = 20,
+        name: Optional[str] = None,
+    ):
+        """
+        Create the stacked ensemble.
+
+        Args:
+            seq_len: Length of sequences.
+            alphabet: Alphabet string.
+            num_members: Number of networks in the ensemble.
+            architecture: Either "mlp" or "cnn".
+            hidden_size: Width of the dense hidden layers.
+            num_filters: Number of filters of each conv layer (CNN only).
+            kernel_size: Kernel size of the first two conv layers (CNN only).
+            combine_with: A function that takes in a matrix of scores
+                (num_seqs, num_members) and combines them, e.g. into an array
+                (num_seqs,). Pass `lambda x: x` to get the full matrix.
+            bootstrap: Whether to train each member on a bootstrap resample of the
+                training set rather than on the whole set.
+            learning_rate: Adam learning rate.
+            batch_size: Batch size for training and prediction.
+            epochs: Number of epochs to train for.
+            name: Human readable description of model (used for logging).
+
+        """
+        if architecture not in ["mlp", "cnn"]:
+            raise ValueError("`architecture` must be one of 'mlp' or 'cnn'")
+        if num_members < 1:
+            raise ValueError("`num_members` must be at least 1")
+
+        if name is None:
+            name = f"Stacked{architecture.upper()}_x{num_members}"
+        super().__init__(name)
+
+        self.alphabet = alphabet
+        self.num_members = num_members
+        self.combine_with = combine_with
+        self.bootstrap = bootstrap
+        self.batch_size = batch_size
+        self.epochs = epochs
+
+        if architecture == "mlp":
+            self.layers = _stacked_mlp(
+                num_members, hidden_size, seq_len, len(alphabet)
+            )
+        else:
+            self.layers = _stacked_cnn(
+                num_members, hidden_size, num_filters, kernel_size, len(alphabet)
+            )
+
+        self.network = tf.keras.Sequential(self.layers)
+        self.network.build((num_members, None, seq_len, len(alphabet)))
+        self.optimizer = tf.keras.optimizers.Adam(learning_rate=learning_rate)
+
+    def _one_hots(self, sequences):
+        indices = s_utils.sequences_to_indices(sequences, self.alphabet)
+        return np.eye(len(self.alphabet), dtype=np.float32)[indices]
+
+    def _forward(self, one_hots, training):
+        # Every member sees the same batch: (num_members, batch_size, seq_len, A)
+        stacked = tf.repeat(one_hots[None], self.num_members, axis=0)
+        return tf.transpose(self.network(stacked, training=training)[..., 0])
+
+    @tf.function
+    def _train_step(self, one_hots, labels, sample_weights):
+        with tf.GradientTape() as tape:
+            preds = self._forward(one_hots, training=True)
+            squared_errors = (preds - labels[:, None]) ** 2
+            loss = tf.reduce_sum(
+                tf.reduce_sum(sample_weights * squared_errors, axis=0)
+                / tf.maximum(tf.reduce_sum(sample_weights, axis=0), 1.0)
+            )
+
+        variables = self.network.trainable_variables
+        self.optimizer.apply_gradients(zip(tape.gradient(loss, variables), variables))
+
+    def train(self, sequences: SEQUENCES_TYPE, labels: np.ndarray):
+        """Train every member for `epochs` epochs on its bootstrap resample."""
+        one_hots = self._one_hots(sequences)
+        labels = np.asarray(labels, dtype=np.float32)
+        num_seqs = len(one_hots)
+
+        # Bootstrap resampling as per-member counts of each training example
+        if self.bootstrap:
+            sample_weights = np.random.multinomial(
+                num_seqs, np.ones(num_seqs) / num_seqs, size=self.num_members
+            ).T.astype(np.float32)
+        else:
+            sample_weights = np.ones((num_seqs, self.num_members), dtype=np.float32)
+
+        for _ in range(self.epochs):
+            order = np.random.permutation(num_seqs)
+            for start in range(0, num_seqs, self.batch_size):
+                batch = order[start : start + self.batch_size]
+                self._train_step(
+                    tf.convert_to_tensor(one_hots[batch]),
+                    tf.convert_to_tensor(labels[batch]),
+                    tf.convert_to_tensor(sample_weights[batch]),
+                )
+
+    def get_state(self):
+        """Return the weights of the stacked network."""
+        return self.network.get_weights()
+
+    def set_state(self, state):
+        """Restore the weights of the stacked network."""
+        self.network.set_weights(state)
+
+    def _fitness_function(self, sequences):
+        one_hots = self._one_hots(sequences)
+        scores = np.zeros((0, self.num_members), dtype=np.float32)
+        scores = np.concatenate(
+            [scores]
+            + [
+                self._forward(
+                    tf.convert_to_tensor(one_hots[start : start + self.batch_size]),
+                    training=False,
+                ).numpy()
+                for start in range(0, len(one_hots), self.batch_size)
+            ]
+        )
+
+        return self.combine_with(np.nan_to_num(scores))
@@ -1,5 +1,5 @@
 """Defines the Ensemble class."""
-from typing import Callable, List
+from typing import Any, Callable, List
 
 import numpy as np
 
@@ -51,6 +51,32 @@ class Ensemble(flexs.Model):
         for model in self.models:
             model.train(sequences, labels)
 
+    def get_state(self) -> List[Any]:
+        """Return the states of each model in `self.models`."""
+        return [model.get_state() for model in self.models]
+
+    def set_state(self, state: List[Any]):
+        """Restore the states of each model in `self.models`."""
+        for model, model_state in zip(self.models, state):
+            model.set_state(model_state)
+
+    def _fitness_function_mutants(self, parent, mutations):
+        scores = np.stack(
+            [model.get_fitness_mutants(parent, mutations) for model in self.models],
+            axis=1,
+        )
+
+        return self.combine_with(scores)
+
+    def _mutational_scan(self, sequence, alphabet):
+        scans = np.stack(
+            [model.mutational_scan(sequence, alphabet) for model in self.models],
+            axis=-1,
+        )
+        combined = self.combine_with(scans.reshape(-1, len(self.models)))
+
+        return combined.reshape(scans.shape[:2] + combined.shape[1:])
+
     def _fitness_function(self, sequences):
         scores = np.stack(
             [model.get_fitness(sequences) for model in self.models], axis=1
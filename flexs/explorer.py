@@ -5,7 +5,7 @@ import os
 import time
 import warnings
 from datetime import datetime
-from typing import Dict, Optional, Tuple
+from typing import Dict, Iterator, Optional, Tuple
 
 import numpy as np
 import pandas as pd
@@ -18,10 +18,23 @@ class Explorer(abc.ABC):
     """
     Abstract base explorer class.
 
-    Run explorer through the `run` method. Implement subclasses
-    by overriding `propose_sequences` (do not override `run`).
+    Run explorer through the `run` method (or `run_iter` to consume rounds as they
+    complete). Implement subclasses by overriding `propose_sequences` (do not
+    override `run` or `run_iter`).
+
+    Besides the model query budget, runs can be given time budgets with
+    `set_time_budgets`. Proposal loops should stop once `time_budget_spent()`
+    returns True, and propose the best candidates found so far.
     """
 
+    round_time_budget: Optional[float] = None
+    total_time_budget: Optional[float] = None
+    time_budget_clock: str = "wall"
+
+    _run_clock_start: Optional[float] = None
+    _round_clock_start: Optional[float] = None
+    _binding_constraint: str = "model_queries"
+
     def __init__(
         self,
         model: flexs.Model,
@@ -68,6 +81,66 @@ class Explorer(abc.ABC):
                 "`model_queries_per_batch` should be >= `sequences_batch_size`"
             )
 
+    def set_time_budgets(
+        self,
+        round_time_budget: Optional[float] = None,
+        total_time_budget: Optional[float] = None,
+        clock: str = "wall",
+    ):
+        """
+        Limit the time spent per round and per run.
+
+        The round budget covers model training and sequence proposal; proposal
+        loops stop early once it is spent. Once the total budget is spent, the
+        current round's proposal stops early and no further round is started.
+
+        Args:
+            round_time_budget: Seconds allowed per round, or None for no limit.
+            total_time_budget: Seconds allowed per run, or None for no limit.
+            clock: "wall" to budget wall-clock time or "cpu" to budget the CPU
+                time of this process.
+
+        """
+        if clock not in ["wall", "cpu"]:
+            raise ValueError("`clock` must be one of 'wall' or 'cpu'")
+        for budget in [round_time_budget, total_time_budget]:
+            if budget is not None and budget <= 0:
+                raise ValueError("Time budgets must be positive")
+
+        self.round_time_budget = round_time_budget
+        self.total_time_budget = total_time_budget
+        self.time_budget_clock = clock
+
+    def _clock(self) -> float:
+        if self.time_budget_clock == "cpu":
+            return time.process_time()
+        return time.perf_counter()
+
+    def time_budget_spent(self) -> bool:
+        """
+        Return whether the current round's or the run's time budget is spent.
+
+        Always False outside of `run`/`run_iter` or when no budget is set.
+        """
+        if self._round_clock_start is None:
+            return False
+
+        now = self._clock()
+        if (
+            self.round_time_budget is not None
+            and now - self._round_clock_start >= self.round_time_budget
+        ):
+            self._binding_constraint = "round_time"
+            return True
+        if (
+            self.total_time_budget is not None
+            and now - self._run_clock_start >= self.total_time_budget
+        ):
+            self._binding_constraint = "total_time"
+            return True
+
+        return False
+
     @abc.abstractmethod
     def propose_sequences(
         self, measured_sequences_data: pd.DataFrame
@@ -89,14 +162,7 @@ class Explorer(abc.ABC):
         """
         pass
 
-    def _log(
-        self,
-        sequences_data: pd.DataFrame,
-        metadata: Dict,
-        current_round: int,
-        verbose: bool,
-        round_start_time: float,
-    ) -> None:
+    def _log(self, sequences_data: pd.DataFrame, metadata: Dict) -> None:
         if self.log_file is not None:
             with open(self.log_file, "w") as f:
                 # First write metadata
@@ -106,24 +172,40 @@ class Explorer(abc.ABC):
                 # Then write pandas dataframe
                 sequences_data.to_csv(f, index=False)
 
-        if verbose:
-            print(
-                f"round: {current_round}, top: {sequences_data['true_score'].max()}, "
-                f"time: {time.time() - round_start_time:02f}s"
-            )
-
-    def run(
-        self, landscape: flexs.Landscape, verbose: bool = True
-    ) -> Tuple[pd.DataFrame, Dict]:
+    def run_iter(
+        self,
+        landscape: flexs.Landscape,
+        target_fitness: Optional[float] = None,
+        deadline: Optional[float] = None,
+    ) -> Iterator[Dict]:
         """
-        Run the exporer.
+        Run the explorer, yielding a record as each round completes.
+
+        Round 0 measures the starting sequence. The log file (if any) is still
+        rewritten every round, but consumers only receive each round's new rows.
 
         Args:
             landscape: Ground truth fitness landscape.
-            verbose: Whether to print output or not.
+            target_fitness: If set, stop after the first round in which a measured
+                sequence reaches this fitness.
+            deadline: If set, a `time.time()` timestamp after which no new round is
+                started.
+
+        If time budgets are set (see `set_time_budgets`), the metadata also
+        records the "time_budget" clock and limits, the time spent per round and
+        in total, and each round's binding constraint: "round_time",
+        "total_time" or "model_queries".
+
+        Yields:
+            A dictionary with the "round" number, its new rows as a
+            "sequences_data" dataframe, its wall-clock "round_time", the cumulative
+            "model_cost" and "measurement_cost", the best "top_true_score"
+            measured so far and the run "metadata" (to which a "stop_reason" is
+            added if the run ends early).
 
         """
         self.model.cost = 0
+        self.model.reset_prediction_cache_stats()
 
         # Metadata about run that will be used for logging purposes
         metadata = {
@@ -136,7 +218,46 @@ class Explorer(abc.ABC):
             "model_queries_per_batch": self.model_queries_per_batch,
         }
 
+        budgeted = (
+            self.round_time_budget is not None or self.total_time_budget is not None
+        )
+        if budgeted:
+            metadata["time_budget"] = {
+                "clock": self.time_budget_clock,
+                "round_time_budget": self.round_time_budget,
+                "total_time_budget": self.total_time_budget,
+                "round_times": [],
+                "binding_constraints": [],
+                "time_spent": 0.0,
+            }
+        self._run_clock_start = self._clock()
+
+        def record(r, new_data, round_start_time):
+            top_true_score = sequences_data["true_score"].max()
+            if target_fitness is not None and top_true_score >= target_fitness:
+                metadata["stop_reason"] = "target_fitness"
+            elif deadline is not None and time.time() >= deadline and r < self.rounds:
+                metadata["stop_reason"] = "deadline"
+            elif (
+                self.total_time_budget is not None
+                and self._clock() - self._run_clock_start >= self.total_time_budget
+                and r < self.rounds
+            ):
+                metadata["stop_reason"] = "total_time_budget"
+
+            self._log(sequences_data, metadata)
+            return {
+                "round": r,
+                "sequences_data": new_data,
+                "round_time": time.time() - round_start_time,
+                "model_cost": self.model.cost,
+                "measurement_cost": len(sequences_data),
+                "top_true_score": top_true_score,
+                "metadata": metadata,
+            }
+
         # Initial sequences and their scores
+        round_start_time = time.time()
         sequences_data = pd.DataFrame(
             {
                 "sequence": self.starting_sequence,
@@ -147,19 +268,27 @@ class Explorer(abc.ABC):
                 "measurement_cost": 1,
             }
         )
-        self._log(sequences_data, metadata, 0, verbose, time.time())
+        yield record(0, sequences_data, round_start_time)
 
         # For each round, train model on available data, propose sequences,
         # measure them on the true landscape, add to available data, and repeat.
-        range_iterator = range if verbose else tqdm.trange
-        for r in range_iterator(1, self.rounds + 1):
+        for r in range(1, self.rounds + 1):
+            if "stop_reason" in metadata:
+                return
+
             round_start_time = time.time()
+            self._round_clock_start = self._clock()
+            self._binding_constraint = "model_queries"
             self.model.train(
                 sequences_data["sequence"].to_numpy(),
                 sequences_data["true_score"].to_numpy(),
             )
 
-            seqs, preds = self.propose_sequences(sequences_data)
+            try:
+                seqs, preds = self.propose_sequences(sequences_data)
+            finally:
+                round_clock_time = self._clock() - self._round_clock_start
+                self._round_clock_start = None
             true_score = landscape.get_fitness(seqs)
 
             if len(seqs) > self.sequences_batch_size:
@@ -167,18 +296,59 @@ class Explorer(abc.ABC):
                     "Must propose <= `self.sequences_batch_size` sequences per round"
                 )
 
-            sequences_data = sequences_data.append(
-                pd.DataFrame(
-                    {
-                        "sequence": seqs,
-                        "model_score": preds,
-                        "true_score": true_score,
-                        "round": r,
-                        "model_cost": self.model.cost,
-                        "measurement_cost": len(sequences_data) + len(seqs),
-                    }
-                )
+            new_data = pd.DataFrame(
+                {
+                    "sequence": seqs,
+                    "model_score": preds,
+                    "true_score": true_score,
+                    "round": r,
+                    "model_cost": self.model.cost,
+                    "measurement_cost": len(sequences_data) + len(seqs),
+                }
             )
-            self._log(sequences_data, metadata, r, verbose, round_start_time)
+            sequences_data = sequences_data.append(new_data)
+            if self.model.cache_predictions:
+                metadata["prediction_cache"] = self.model.prediction_cache_stats()
+            if budgeted:
+                time_budget = metadata["time_budget"]
+                time_budget["round_times"].append(round_clock_time)
+                time_budget["binding_constraints"].append(self._binding_constraint)
+                time_budget["time_spent"] = self._clock() - self._run_clock_start
+
+            yield record(r, new_data, round_start_time)
+
+    def run(
+        self,
+        landscape: flexs.Landscape,
+        verbose: bool = True,
+        target_fitness: Optional[float] = None,
+        deadline: Optional[float] = None,
+    ) -> Tuple[pd.DataFrame, Dict]:
+        """
+        Run the exporer.
+
+        Args:
+            landscape: Ground truth fitness landscape.
+            verbose: Whether to print output or not.
+            target_fitness: If set, stop once a measured sequence reaches this
+                fitness (see `run_iter`).
+            deadline: If set, a `time.time()` timestamp after which no new round is
+                started (see `run_iter`).
+
+        """
+        rounds_data = []
+        progress_bar = tqdm.tqdm(total=self.rounds, disable=verbose)
+        for record in self.run_iter(landscape, target_fitness, deadline):
+            rounds_data.append(record["sequences_data"])
+            metadata = record["metadata"]
+
+            if verbose:
+                print(
+                    f"round: {record['round']}, top: {record['top_true_score']}, "
+                    f"time: {record['round_time']:02f}s"
+                )
+            elif record["round"] > 0:
+                progress_bar.update()
+        progress_bar.close()
 
-        return sequences_data, metadata
+        return pd.concat(rounds_data), metadata
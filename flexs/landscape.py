@@ -4,6 +4,7 @@ import abc
 import numpy as np
 
 from flexs.types import SEQUENCES_TYPE
+from flexs.utils import sequence_utils as s_utils
 
 
 class Landscape(abc.ABC):
@@ -43,3 +44,50 @@ class Landscape(abc.ABC):
         """
         self.cost += len(sequences)
         return self._fitness_function(sequences)
+
+    def mutational_scan(self, sequence: str, alphabet: str) -> np.ndarray:
+        """
+        Score every single mutant of `sequence`.
+
+        Landscapes with structure that makes single mutants cheap (e.g. additive
+        landscapes) override the private `_mutational_scan` method. By default, all
+        mutants are scored with one call to `_fitness_function`. This method
+        increments `self.cost` by the number of distinct sequences scored,
+        `len(sequence) * (len(alphabet) - 1) + 1`.
+
+        Args:
+            sequence: Parent sequence.
+            alphabet: Alphabet string.
+
+        Returns:
+            A `(len(sequence), len(alphabet))` matrix whose entry `[i, j]` is the
+            fitness of `sequence` with residue `i` replaced by `alphabet[j]`.
+            Entries for `sequence`'s own residues hold the fitness of `sequence`.
+
+        """
+        self.cost += len(sequence) * (len(alphabet) - 1) + 1
+        return self._mutational_scan(sequence, alphabet)
+
+    def _mutational_scan(self, sequence: str, alphabet: str) -> np.ndarray:
+        positions, residues = s_utils.single_mutant_indices(sequence, alphabet)
+        mutants = np.repeat(
+            s_utils.sequences_to_indices([sequence], alphabet), len(positions), axis=0
+        )
+        mutants[np.arange(len(positions)), positions] = residues
+
+        fitnesses = self._fitness_function(
+            [sequence] + list(s_utils.indices_to_sequences(mutants, alphabet))
+        )
+        return self._scan_matrix(sequence, alphabet, fitnesses)
+
+    @staticmethod
+    def _scan_matrix(sequence, alphabet, fitnesses):
+        """Arrange the fitnesses of `sequence` and its single mutants in a matrix."""
+        fitnesses = np.asarray(fitnesses)
+        positions, residues = s_utils.single_mutant_indices(sequence, alphabet)
+
+        scan = np.repeat(fitnesses[:1], len(sequence) * len(alphabet), axis=0)
+        scan = scan.reshape((len(sequence), len(alphabet)) + fitnesses.shape[1:])
+        scan[positions, residues] = fitnesses[1:]
+
+        return scan
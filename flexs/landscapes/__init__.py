@@ -1,7 +1,10 @@
 """FLEXS landscapes module."""
-from flexs.landscapes import rna  # noqa: F401
+from flexs.landscapes import nk, potts, rna  # noqa: F401
 from flexs.landscapes.additive_aav_packaging import AdditiveAAVPackaging  # noqa: F401
 from flexs.landscapes.bert_gfp import BertGFPBrightness  # noqa: F401
+from flexs.landscapes.nk import NKLandscape  # noqa: F401
+from flexs.landscapes.potts import PottsLandscape  # noqa: F401
 from flexs.landscapes.rna import RNABinding  # noqa: F401
 from flexs.landscapes.rosetta import RosettaFolding  # noqa: F401
+from flexs.landscapes.tabulated import TabulatedLandscape  # noqa: F401
 from flexs.landscapes.tf_binding import TFBinding  # noqa: F401
@@ -5,6 +5,7 @@ import os
 import numpy as np
 
 import flexs
+from flexs.utils import sequence_utils as s_utils
 
 AAV2_WT = """MAADGYLPDWLEDTLSEGIRQWWKLKPGPPPPKPAERHKDDSRGLVLPGYKYLGPFNGLD\
 KGEPVNEADAAALEHDKAYDRQLDSGDNPYLKYNHADAEFQERLKEDTSFGGNLGRAVFQ\
@@ -77,6 +78,7 @@ class AdditiveAAVPackaging(flexs.Landscape):
             }
 
         self.top_seq, self.max_possible = self.compute_max_possible()
+        self._contributions = {}
 
     def compute_max_possible(self):
         """Compute max possible fitness of any sequence (used for normalization)."""
@@ -106,6 +108,43 @@ class AdditiveAAVPackaging(flexs.Landscape):
 
         return total_fitness + self.mfm * self.max_possible
 
+    def _residue_contributions(self, seq_len, alphabet):
+        """Return the `(seq_len, len(alphabet))` raw fitness of each substitution."""
+        key = (seq_len, alphabet)
+        if key not in self._contributions:
+            self._contributions[key] = np.array(
+                [
+                    [
+                        (
+                            self.data[self.start + i][aa][self.phenotype]
+                            if aa in self.data[self.start + i]
+                            else 0
+                        )
+                        for aa in alphabet
+                    ]
+                    for i in range(seq_len)
+                ]
+            )
+
+        return self._contributions[key]
+
+    def _mutational_scan(self, sequence, alphabet):
+        # Each single mutant swaps one residue's contribution to the additive sum
+        contributions = self._residue_contributions(len(sequence), alphabet)
+        parent_indices = s_utils.sequences_to_indices([sequence], alphabet)[0]
+        positions = np.arange(len(sequence))
+        parent_terms = contributions[positions, parent_indices]
+
+        raw_fitnesses = (
+            self._get_raw_fitness(sequence) - parent_terms[:, None] + contributions
+        )
+        scan = raw_fitnesses / (self.max_possible * (self.mfm + 1))
+        scan += np.random.normal(scale=self.noise, size=scan.shape)
+
+        # Every entry for the parent's own residues is the same (parent) sequence
+        scan[positions, parent_indices] = scan[0, parent_indices[0]]
+        return np.maximum(0, scan)
+
     def _fitness_function(self, sequences):
         fitnesses = []
         for seq in sequences:
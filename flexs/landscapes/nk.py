@@ -0,0 +1,142 @@
+"""Defines the NK landscape and problem registry."""
+from typing import Dict
+
+import numpy as np
+
+import flexs
+from flexs.types import SEQUENCES_TYPE
+from flexs.utils import sequence_utils as s_utils
+
+
+class NKLandscape(flexs.Landscape):
+    """
+    Kauffman's NK landscape, generalized to arbitrary alphabets.
+
+    Each of the `seq_len` sites contributes a value that depends on its own residue
+    and on the residues of `k` other sites, looked up in a random table. Fitness is
+    the mean contribution, so it lies in [0, 1]. `k` tunes ruggedness: `k = 0` is
+    an additive landscape and `k = seq_len - 1` is maximally rugged.
+
+    Parameters are generated from `seed`, and sequences are scored in a vectorised
+    pass over their integer encodings, so large batches of long sequences are cheap
+    to score (useful for load-testing explorers and models).
+
+    Attributes:
+        neighbors (np.ndarray): `(seq_len, k + 1)` array of the sites each site's
+            contribution depends on (the site itself first).
+        contributions (np.ndarray): `(seq_len, len(alphabet) ** (k + 1))` table of
+            each site's contribution for every configuration of its neighborhood.
+
+    """
+
+    def __init__(
+        self,
+        seq_len: int,
+        k: int,
+        alphabet: str = s_utils.DNAA,
+        neighborhood: str = "adjacent",
+        seed: int = 0,
+    ):
+        """
+        Create an NK landscape.
+
+        Args:
+            seq_len: Length of sequences (N).
+            k: Number of other sites each site's contribution depends on (K).
+            alphabet: Alphabet string.
+            neighborhood: "adjacent" to use the next `k` sites (wrapping around) or
+                "random" to sample `k` other sites per site.
+            seed: Seed for neighborhood and contribution table generation.
+
+        """
+        if not 0 <= k < seq_len:
+            raise ValueError("`k` must be between 0 and `seq_len` - 1")
+        if neighborhood not in ["adjacent", "random"]:
+            raise ValueError("`neighborhood` must be one of 'adjacent' or 'random'")
+        if seq_len * len(alphabet) ** (k + 1) > 2**28:
+            raise ValueError("Contribution table too large, decrease `k` or `seq_len`")
+
+        super().__init__(f"NK_N{seq_len}_K{k}_A{len(alphabet)}_seed{seed}")
+
+        self.seq_len = seq_len
+        self.k = k
+        self.alphabet = alphabet
+        self.seed = seed
+
+        rng = np.random.default_rng(seed)
+        sites = np.arange(seq_len)
+        if neighborhood == "adjacent":
+            self.neighbors = (sites[:, None] + np.arange(k + 1)) % seq_len
+        else:
+            self.neighbors = np.array(
+                [
+                    [i] + list(rng.choice(np.delete(sites, i), size=k, replace=False))
+                    for i in sites
+                ]
+            ).reshape(seq_len, k + 1)
+
+        self.contributions = rng.random(
+            (seq_len, len(alphabet) ** (k + 1)), dtype=np.float32
+        )
+        self._place_values = len(alphabet) ** np.arange(k + 1)
+
+    def _fitness_function(self, sequences: SEQUENCES_TYPE) -> np.ndarray:
+        indices = s_utils.sequences_to_indices(sequences, self.alphabet)
+        if len(indices) == 0:
+            return np.zeros(0)
+
+        # Row of each site's table given the residues of its neighborhood
+        configurations = np.einsum(
+            "nlk,k->nl", indices[:, self.neighbors], self._place_values
+        )
+        site_values = self.contributions[np.arange(self.seq_len), configurations]
+
+        return site_values.mean(axis=1, dtype=np.float64)
+
+
+def registry() -> Dict[str, Dict]:
+    """
+    Return a dictionary of problems of the form:
+
+    ```python
+    {
+        "problem name": {
+            "params": ...,
+            "starts": ...,
+        },
+        ...
+    }
+    ```
+
+    where `flexs.landscapes.NKLandscape(**problem["params"])` instantiates the
+    NK landscape for the given set of parameters.
+
+    Problems cover DNA and protein alphabets with lengths up to 1000.
+
+    Returns:
+        Problems in the registry.
+
+    """
+    problems = {}
+    for alphabet_name, alphabet, ks in [
+        ("dna", s_utils.DNAA, [1, 4, 6]),
+        ("protein", s_utils.AAS, [1, 2]),
+    ]:
+        for seq_len in [10, 100, 1000]:
+            for k in ks:
+                rng = np.random.default_rng(seq_len + k)
+                starts = s_utils.indices_to_sequences(
+                    rng.integers(len(alphabet), size=(5, seq_len)), alphabet
+                )
+
+                problems[f"{alphabet_name}_N{seq_len}_K{k}"] = {
+                    "params": {
+                        "seq_len": seq_len,
+                        "k": k,
+                        "alphabet": alphabet,
+                        "seed": 0,
+                    },
+                    "starts": list(starts),
+                }
+
+    return problems
@@ -0,0 +1,169 @@
+"""Defines the Potts (pairwise epistasis) landscape and problem registry."""
+from typing import Dict
+
+import numpy as np
+
+import flexs
+from flexs.types import SEQUENCES_TYPE
+from flexs.utils import sequence_utils as s_utils
+
+
+class PottsLandscape(flexs.Landscape):
+    """
+    A Potts model landscape: per-site fields plus dense pairwise couplings.
+
+    The fitness of a sequence x is
+    `(sum_i h[i, x_i] + sum_{i < j} J[i, j, x_i, x_j]) / sqrt(seq_len)`,
+    with fields h and couplings J drawn from gaussians generated from `seed`.
+    `coupling_scale` tunes ruggedness: 0 gives an additive landscape, and larger
+    values make pairwise epistasis dominate the fields.
+
+    Couplings are stored as a dense `(seq_len, seq_len, A, A)` tensor, and batches
+    are scored with a single einsum over one-hot encodings, so large batches of
+    long sequences are cheap to score (useful for load-testing explorers and
+    models). The coupling tensor takes `4 * (seq_len * A) ** 2` bytes.
+
+    Attributes:
+        fields (np.ndarray): `(seq_len, A)` per-site fields.
+        couplings (np.ndarray): `(seq_len, seq_len, A, A)` symmetric couplings
+            (`couplings[i, j, a, b] == couplings[j, i, b, a]`) with zero diagonal.
+
+    """
+
+    def __init__(
+        self,
+        seq_len: int,
+        alphabet: str = s_utils.DNAA,
+        field_scale: float = 1.0,
+        coupling_scale: float = 1.0,
+        seed: int = 0,
+        batch_size: int = 1024,
+    ):
+        """
+        Create a Potts landscape.
+
+        Args:
+            seq_len: Length of sequences.
+            alphabet: Alphabet string.
+            field_scale: Standard deviation of the fields.
+            coupling_scale: Standard deviation of the couplings, times
+                `sqrt(seq_len)` (so that the total pairwise contribution has a
+                similar spread to the fields' whatever the length).
+            seed: Seed for field and coupling generation.
+            batch_size: Number of sequences scored per einsum, bounding the size
+                of the intermediate arrays.
+
+        """
+        if (seq_len * len(alphabet)) ** 2 > 2**28:
+            raise ValueError("Coupling tensor too large, decrease `seq_len`")
+
+        super().__init__(
+            f"Potts_L{seq_len}_A{len(alphabet)}_c{coupling_scale}_seed{seed}"
+        )
+
+        self.seq_len = seq_len
+        self.alphabet = alphabet
+        self.seed = seed
+        self.batch_size = batch_size
+
+        rng = np.random.default_rng(seed)
+        alphabet_size = len(alphabet)
+        self.fields = rng.normal(
+            scale=field_scale, size=(seq_len, alphabet_size)
+        ).astype(np.float32)
+
+        couplings = rng.normal(
+            scale=coupling_scale / np.sqrt(seq_len),
+            size=(seq_len, seq_len, alphabet_size, alphabet_size),
+        ).astype(np.float32)
+        couplings = (couplings + couplings.transpose(1, 0, 3, 2)) / np.sqrt(2)
+        couplings[np.arange(seq_len), np.arange(seq_len)] = 0
+        self.couplings = couplings
+
+    def _fitness_function(self, sequences: SEQUENCES_TYPE) -> np.ndarray:
+        indices = s_utils.sequences_to_indices(sequences, self.alphabet)
+        one_hot = np.eye(len(self.alphabet), dtype=np.float32)
+
+        energies = []
+        for start in range(0, len(indices), self.batch_size):
+            batch = indices[start : start + self.batch_size]
+            one_hots = one_hot[batch]
+
+            field_energies = self.fields[np.arange(self.seq_len), batch].sum(axis=1)
+            # Each pair is counted twice by the symmetric couplings
+            coupling_energies = 0.5 * np.einsum(
+                "nia,ijab,njb->n", one_hots, self.couplings, one_hots, optimize=True
+            )
+            energies.append(field_energies + coupling_energies)
+
+        if len(energies) == 0:
+            return np.zeros(0)
+
+        return np.concatenate(energies).astype(np.float64) / np.sqrt(self.seq_len)
+
+    def _mutational_scan(self, sequence: str, alphabet: str) -> np.ndarray:
+        if alphabet != self.alphabet:
+            return super()._mutational_scan(sequence, alphabet)
+
+        # A substitution at site i only changes site i's local field:
+        # h[i, a] + sum_j J[i, j, a, x_j]
+        parent = s_utils.sequences_to_indices([sequence], self.alphabet)[0]
+        sites = np.arange(self.seq_len)
+        parent_one_hot = np.eye(len(self.alphabet), dtype=np.float32)[parent]
+        local_fields = self.fields + np.einsum(
+            "ijab,jb->ia", self.couplings, parent_one_hot
+        )
+
+        parent_fitness = self._fitness_function([sequence])[0]
+        deltas = local_fields - local_fields[sites, parent][:, None]
+
+        return parent_fitness + deltas / np.sqrt(self.seq_len)
+
+
+def registry() -> Dict[str, Dict]:
+    """
+    Return a dictionary of problems of the form:
+
+    ```python
+    {
+        "problem name": {
+            "params": ...,
+            "starts": ...,
+        },
+        ...
+    }
+    ```
+
+    where `flexs.landscapes.PottsLandscape(**problem["params"])` instantiates the
+    Potts landscape for the given set of parameters.
+
+    Problems cover DNA sequences with lengths up to 1000 and proteins with lengths
+    up to 100 (dense protein couplings for longer sequences take gigabytes).
+
+    Returns:
+        Problems in the registry.
+
+    """
+    problems = {}
+    for alphabet_name, alphabet, seq_lens in [
+        ("dna", s_utils.DNAA, [10, 100, 1000]),
+        ("protein", s_utils.AAS, [10, 100]),
+    ]:
+        for seq_len in seq_lens:
+            for coupling_scale in [0.5, 1.0, 2.0]:
+                rng = np.random.default_rng(seq_len)
+                starts = s_utils.indices_to_sequences(
+                    rng.integers(len(alphabet), size=(5, seq_len)), alphabet
+                )
+
+                problems[f"{alphabet_name}_L{seq_len}_c{coupling_scale}"] = {
+                    "params": {
+                        "seq_len": seq_len,
+                        "alphabet": alphabet,
+                        "coupling_scale": coupling_scale,
+                        "seed": 0,
+                    },
+                    "starts": list(starts),
+                }
+
+    return problems
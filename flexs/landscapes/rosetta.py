@@ -170,12 +170,34 @@ class RosettaFolding(flexs.Landscape):
 
         return self.score_function(self.pose)
 
-    def _fitness_function(self, sequences: SEQUENCES_TYPE) -> np.ndarray:
+    def _energies_to_fitnesses(self, energies):
         """Negate and normalize folding energy to get maximization objective"""
-        energies = torch.tensor([self.get_folding_energy(seq) for seq in sequences])
+        energies = torch.tensor(energies)
         scaled_energies = (-energies - self.sigmoid_center) / self.sigmoid_norm_value
         return torch.sigmoid(scaled_energies).numpy()
 
+    def _fitness_function(self, sequences: SEQUENCES_TYPE) -> np.ndarray:
+        return self._energies_to_fitnesses(
+            [self.get_folding_energy(seq) for seq in sequences]
+        )
+
+    def _mutational_scan(self, sequence: str, alphabet: str) -> np.ndarray:
+        # Score each single mutant with one residue swap, reverting it before moving
+        # on to the next position, rather than diffing whole sequences against
+        # the pose
+        parent_energy = self.get_folding_energy(sequence)
+
+        energies = np.full((len(sequence), len(alphabet)), parent_energy)
+        for i, parent_aa in enumerate(sequence):
+            for j, aa in enumerate(alphabet):
+                if aa == parent_aa:
+                    continue
+                self._mutate_pose(aa, i)
+                energies[i, j] = self.score_function(self.pose)
+            self._mutate_pose(parent_aa, i)
+
+        return self._energies_to_fitnesses(energies)
+
 
 def registry() -> Dict[str, Dict]:
     """
@@ -0,0 +1,279 @@
+"""Defines the TabulatedLandscape class, a precomputed table of another landscape."""
+import concurrent.futures
+import json
+import multiprocessing
+import os
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+
+import flexs
+from flexs.types import SEQUENCES_TYPE
+from flexs.utils import sequence_utils as s_utils
+
+# Landscape and space held by each build worker, set once by `_init_build_worker`
+_worker_landscape = None
+_worker_space = None
+
+
+def _init_build_worker(landscape, seq_len, alphabet):
+    global _worker_landscape, _worker_space
+    _worker_landscape = landscape
+    _worker_space = (seq_len, alphabet)
+
+
+def _score_chunk(start, stop):
+    seq_len, alphabet = _worker_space
+    return _score_range(_worker_landscape, seq_len, alphabet, start, stop)
+
+
+def _score_range(landscape, seq_len, alphabet, start, stop):
+    """Score sequences `start` to `stop` (by base-|A| index) of the space."""
+    place_values = len(alphabet) ** np.arange(seq_len - 1, -1, -1, dtype=np.int64)
+    indices = np.arange(start, stop, dtype=np.int64)
+    codes = (indices[:, None] // place_values) % len(alphabet)
+
+    return landscape.get_fitness(s_utils.indices_to_sequences(codes, alphabet))
+
+
+class TabulatedLandscape(flexs.Landscape):
+    """
+    The fitness of every sequence of a landscape, precomputed into a table.
+
+    The table is a memory-mapped `.npy` file indexed by each sequence's base-|A|
+    index (the first position being the most significant digit), so lookups are
+    a single array gather whatever the cost of the original landscape.
+
+    The table is filled in chunks, optionally in parallel worker processes. Chunks
+    are marked complete in a sidecar file as they are written, so an interrupted
+    build resumes where it stopped when the same table path is opened again.
+    Once complete, the global max, its sequence, and fitness quantiles are
+    computed and stored in a sidecar `.json` metadata file.
+
+    Attributes:
+        table (np.memmap): Fitness of every sequence, by base-|A| index.
+        metadata (dict): Landscape description and (once built) fitness statistics.
+
+    """
+
+    def __init__(
+        self,
+        landscape: flexs.Landscape,
+        seq_len: int,
+        alphabet: str,
+        table_path: str,
+        num_workers: int = 1,
+        chunk_size: int = 2**16,
+        quantiles: Sequence[float] = (0.5, 0.9, 0.99, 0.999),
+        build: bool = True,
+    ):
+        """
+        Create (or reopen) a table of `landscape` over all sequences.
+
+        Args:
+            landscape: Landscape to tabulate. Must be picklable if `num_workers` > 1.
+            seq_len: Length of sequences.
+            alphabet: Alphabet string.
+            table_path: Path of the `.npy` table. Sidecar files share its prefix.
+            num_workers: Number of processes to score chunks with.
+            chunk_size: Number of sequences scored per landscape call.
+            quantiles: Fitness quantiles to record in the metadata.
+            build: Whether to fill in missing chunks now (see `build`).
+
+        """
+        space_size = len(alphabet) ** seq_len
+        if space_size > 2**33:
+            raise ValueError("Sequence space too large to tabulate")
+        if num_workers < 1:
+            raise ValueError("`num_workers` must be at least 1")
+
+        super().__init__(f"Tabulated({landscape.name})")
+
+        self.landscape = landscape
+        self.seq_len = seq_len
+        self.alphabet = alphabet
+        self.table_path = table_path
+        self.num_workers = num_workers
+        self.chunk_size = chunk_size
+        self.quantiles = list(quantiles)
+        self._place_values = len(alphabet) ** np.arange(
+            seq_len - 1, -1, -1, dtype=np.int64
+        )
+
+        space = {
+            "landscape_name": landscape.name,
+            "seq_len": seq_len,
+            "alphabet": alphabet,
+            "chunk_size": chunk_size,
+        }
+        self.metadata = self._read_metadata()
+        if self.metadata is None:
+            self.metadata = space
+            self._write_metadata()
+        elif any(self.metadata.get(key) != value for key, value in space.items()):
+            raise ValueError(
+                f"{table_path} tabulates a different landscape or space: "
+                f"{ {key: self.metadata.get(key) for key in space} }"
+            )
+
+        # A missing table invalidates any completion flags and statistics left
+        # over from a previous build
+        if not os.path.exists(table_path):
+            if os.path.exists(f"{table_path}.done.npy"):
+                os.remove(f"{table_path}.done.npy")
+            for key in ["max", "argmax_sequence", "min", "mean", "quantiles"]:
+                self.metadata.pop(key, None)
+            self._write_metadata()
+
+        self.table = self._open_memmap(table_path, np.float32, space_size)
+        self._done = self._open_memmap(
+            f"{table_path}.done.npy", np.bool_, -(-space_size // chunk_size)
+        )
+        self._sorted_table = None
+        self._sorted_table_samples = None
+
+        if build:
+            self.build()
+
+    @staticmethod
+    def _open_memmap(path, dtype, size):
+        if os.path.exists(path):
+            array = np.lib.format.open_memmap(path, mode="r+")
+            if array.shape != (size,):
+                raise ValueError(f"{path} does not have shape ({size},)")
+            return array
+
+        return np.lib.format.open_memmap(path, mode="w+", dtype=dtype, shape=(size,))
+
+    def _read_metadata(self) -> Optional[Dict]:
+        try:
+            with open(f"{self.table_path}.json") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def _write_metadata(self):
+        tmp_path = f"{self.table_path}.json.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.metadata, f)
+        os.replace(tmp_path, f"{self.table_path}.json")
+
+    @property
+    def is_built(self) -> bool:
+        """Whether every chunk of the table has been filled."""
+        return bool(self._done.all())
+
+    def build(self):
+        """Fill in every chunk not yet marked complete, then compute statistics."""
+        pending = np.flatnonzero(~self._done)
+        ranges = [
+            (
+                chunk * self.chunk_size,
+                min((chunk + 1) * self.chunk_size, len(self.table)),
+            )
+            for chunk in pending
+        ]
+
+        if self.num_workers == 1:
+            results = (
+                _score_range(self.landscape, self.seq_len, self.alphabet, *r)
+                for r in ranges
+            )
+            self._write_chunks(pending, ranges, results)
+        elif len(ranges) > 0:
+            with concurrent.futures.ProcessPoolExecutor(
+                self.num_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_build_worker,
+                initargs=(self.landscape, self.seq_len, self.alphabet),
+            ) as executor:
+                results = executor.map(_score_chunk, *zip(*ranges))
+                self._write_chunks(pending, ranges, results)
+
+            # Workers query their own copies of the landscape
+            self.landscape.cost += sum(stop - start for start, stop in ranges)
+
+        if "max" not in self.metadata:
+            self._compute_statistics()
+
+    def _write_chunks(self, chunks, ranges, results):
+        for chunk, (start, stop), fitnesses in zip(chunks, ranges, results):
+            self.table[start:stop] = fitnesses
+            self.table.flush()
+
+            # Only mark the chunk as complete once its values are on disk
+            self._done[chunk] = True
+            self._done.flush()
+
+    def _compute_statistics(self):
+        argmax = int(np.argmax(self.table))
+        self.metadata.update(
+            {
+                "max": float(self.table[argmax]),
+                "argmax_sequence": self.index_to_sequence(argmax),
+                "min": float(np.min(self.table)),
+                "mean": float(np.mean(self.table, dtype=np.float64)),
+                "quantiles": {
+                    str(q): float(value)
+                    for q, value in zip(
+                        self.quantiles, np.quantile(self.table, self.quantiles)
+                    )
+                },
+            }
+        )
+        self._write_metadata()
+
+    def sequences_to_index(self, sequences: SEQUENCES_TYPE) -> np.ndarray:
+        """Return the base-|A| index of each sequence in the table."""
+        return s_utils.sequences_to_indices(sequences, self.alphabet) @ (
+            self._place_values
+        )
+
+    def index_to_sequence(self, index: int) -> str:
+        """Return the sequence at base-|A| `index` of the table."""
+        codes = (index // self._place_values) % len(self.alphabet)
+        return "".join(self.alphabet[code] for code in codes)
+
+    def get_fitness_by_index(self, indices: np.ndarray) -> np.ndarray:
+        """Score sequences given by their base-|A| indices, incrementing `cost`."""
+        if not self.is_built:
+            raise RuntimeError("The table is incomplete, call `build` first")
+
+        indices = np.asarray(indices, dtype=np.int64)
+        self.cost += len(indices)
+        return self.table[indices].astype(np.float64)
+
+    def _fitness_function(self, sequences: SEQUENCES_TYPE) -> np.ndarray:
+        if not self.is_built:
+            raise RuntimeError("The table is incomplete, call `build` first")
+        if len(sequences) == 0:
+            return np.zeros(0)
+
+        return self.table[self.sequences_to_index(sequences)].astype(np.float64)
+
+    def regret(self, fitnesses: np.ndarray) -> float:
+        """Return the gap between the global max and the best of `fitnesses`."""
+        return self.metadata["max"] - float(np.max(fitnesses))
+
+    def percentile(self, fitnesses: np.ndarray, max_samples: int = 2**24) -> np.ndarray:
+        """
+        Return the fraction of the space scoring below each of `fitnesses`.
+
+        The table (or, if it has more than `max_samples` entries, a fixed random
+        subsample of it) is sorted in memory once and kept for later calls, which
+        takes `4 * min(len(table), max_samples)` bytes. Percentiles are exact
+        when the whole table fits.
+        """
+        # Sorting once is cheaper than a pass over the table per query
+        if self._sorted_table is None or self._sorted_table_samples != max_samples:
+            if len(self.table) <= max_samples:
+                samples = np.array(self.table)
+            else:
+                rng = np.random.default_rng(0)
+                samples = self.table[
+                    np.sort(rng.integers(len(self.table), size=max_samples))
+                ]
+            self._sorted_table = np.sort(samples)
+            self._sorted_table_samples = max_samples
+
+        return np.searchsorted(self._sorted_table, fitnesses) / len(self._sorted_table)
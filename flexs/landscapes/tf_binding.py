@@ -43,6 +43,18 @@ class TFBinding(flexs.Landscape):
     def _fitness_function(self, sequences: SEQUENCES_TYPE) -> np.ndarray:
         return np.array([self.sequences[seq] for seq in sequences])
 
+    def _mutational_scan(self, sequence: str, alphabet: str) -> np.ndarray:
+        # Every 8-mer is tabulated, so the scan is a matrix of direct lookups
+        return np.array(
+            [
+                [
+                    self.sequences[sequence[:i] + aa + sequence[i + 1 :]]
+                    for aa in alphabet
+                ]
+                for i in range(len(sequence))
+            ]
+        )
+
 
 def registry() -> Dict[str, Dict]:
     """
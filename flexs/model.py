@@ -1,11 +1,25 @@
 """Defines base Model class."""
 import abc
-from typing import Any, List
+import functools
+from typing import Any, Dict, List, Sequence, Tuple
 
 import numpy as np
 
 import flexs
 from flexs.types import SEQUENCES_TYPE
+from flexs.utils import sequence_utils as s_utils
+
+
+def _invalidates_prediction_cache(method):
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            self.clear_prediction_cache()
+
+    wrapper._invalidates_prediction_cache = True
+    return wrapper
 
 
 class Model(flexs.Landscape, abc.ABC):
@@ -13,8 +27,104 @@ class Model(flexs.Landscape, abc.ABC):
     Base model class. Inherits from `flexs.Landscape` and adds an additional
     `train` method.
 
+    Between two calls to `train`, a model is a pure function of its input, so it can
+    optionally cache its predictions (see `enable_prediction_cache`). The cache is
+    cleared whenever `train` or `set_state` returns, including in subclasses that
+    override them.
+
+    Attributes:
+        cache_predictions (bool): Whether predictions are cached.
+        count_hits_as_cost (bool): Whether cache hits increment `cost`.
+        prediction_cache_version (int): Number of times the cache was invalidated.
+        prediction_cache_hits (int): Number of sequences scored from the cache.
+        prediction_cache_misses (int): Number of sequences scored by the model.
+
     """
 
+    cache_predictions = False
+    count_hits_as_cost = True
+    prediction_cache_version = 0
+    prediction_cache_hits = 0
+    prediction_cache_misses = 0
+
+    def __init_subclass__(cls, **kwargs):
+        """Make overrides of `train` and `set_state` invalidate the cache."""
+        super().__init_subclass__(**kwargs)
+        for method_name in ["train", "set_state"]:
+            method = cls.__dict__.get(method_name)
+            if method is not None and not getattr(
+                method, "_invalidates_prediction_cache", False
+            ):
+                setattr(cls, method_name, _invalidates_prediction_cache(method))
+
+    def enable_prediction_cache(self, count_hits_as_cost: bool = True):
+        """
+        Cache predictions until the next call to `train`.
+
+        Args:
+            count_hits_as_cost: Whether sequences scored from the cache still
+                increment `cost`. Keeping this on preserves explorers' model query
+                budgets (which are measured in `cost`); turning it off makes
+                repeated queries free.
+
+        """
+        self.cache_predictions = True
+        self.count_hits_as_cost = count_hits_as_cost
+        self.clear_prediction_cache()
+        self.reset_prediction_cache_stats()
+
+    def disable_prediction_cache(self):
+        """Stop caching predictions and drop the cache."""
+        self.cache_predictions = False
+        self.clear_prediction_cache()
+
+    def clear_prediction_cache(self):
+        """Drop all cached predictions, starting a new cache version."""
+        self._prediction_cache = {}
+        self.prediction_cache_version += 1
+
+    def reset_prediction_cache_stats(self):
+        """Reset the prediction cache hit and miss counts."""
+        self.prediction_cache_hits = 0
+        self.prediction_cache_misses = 0
+
+    def prediction_cache_stats(self) -> Dict[str, float]:
+        """Return prediction cache hits, misses, hit rate and version."""
+        lookups = self.prediction_cache_hits + self.prediction_cache_misses
+        return {
+            "hits": self.prediction_cache_hits,
+            "misses": self.prediction_cache_misses,
+            "hit_rate": self.prediction_cache_hits / lookups if lookups > 0 else 0.0,
+            "version": self.prediction_cache_version,
+        }
+
+    def get_fitness(self, sequences: SEQUENCES_TYPE) -> np.ndarray:
+        """
+        Score a list/numpy array of sequences, using cached predictions if enabled.
+
+        Only sequences missing from the cache are passed to `_fitness_function`.
+
+        Args:
+            sequences: A list/numpy array of sequence strings to be scored.
+
+        Returns:
+            Scores for each sequence.
+
+        """
+        if not self.cache_predictions:
+            return super().get_fitness(sequences)
+
+        cache = self._prediction_cache
+        missing = list(dict.fromkeys(seq for seq in sequences if seq not in cache))
+        if len(missing) > 0:
+            cache.update(zip(missing, self._fitness_function(missing)))
+
+        self.prediction_cache_misses += len(missing)
+        self.prediction_cache_hits += len(sequences) - len(missing)
+        self.cost += len(sequences) if self.count_hits_as_cost else len(missing)
+
+        return np.array([cache[seq] for seq in sequences])
+
     @abc.abstractmethod
     def train(self, sequences: SEQUENCES_TYPE, labels: List[Any]):
         """
@@ -26,6 +136,80 @@ class Model(flexs.Landscape, abc.ABC):
         """
         pass
 
+    def get_fitness_mutants(
+        self, parent: str, mutations: Sequence[Sequence[Tuple[int, str]]]
+    ) -> np.ndarray:
+        """
+        Score mutants of `parent`, given as lists of substitutions.
+
+        Models whose prediction is cheap to update for a few substitutions (e.g.
+        linear models, or networks whose first layer is dense) override
+        `_fitness_function_mutants` to avoid rescoring the full sequences. Other
+        models fall back to scoring the mutant sequences. Like `get_fitness`, this
+        increments `self.cost` by the number of mutants.
+
+        Args:
+            parent: Parent sequence.
+            mutations: For each mutant, a list of `(position, residue)`
+                substitutions (at distinct positions).
+
+        Returns:
+            Scores for each mutant.
+
+        """
+        if self.cache_predictions:
+            return self.get_fitness(s_utils.apply_mutations(parent, mutations))
+
+        self.cost += len(mutations)
+        return self._fitness_function_mutants(parent, mutations)
+
+    def _fitness_function_mutants(
+        self, parent: str, mutations: Sequence[Sequence[Tuple[int, str]]]
+    ) -> np.ndarray:
+        return self._fitness_function(s_utils.apply_mutations(parent, mutations))
+
+    def mutational_scan(self, sequence: str, alphabet: str) -> np.ndarray:
+        """
+        Score every single mutant of `sequence` (see `flexs.Landscape`).
+
+        By default, models score the mutants with `_fitness_function_mutants`, so
+        models with incremental mutant scoring also scan quickly.
+        """
+        if self.cache_predictions:
+            positions, residues = s_utils.single_mutant_indices(sequence, alphabet)
+            mutants = s_utils.apply_mutations(
+                sequence,
+                [[(pos, alphabet[res])] for pos, res in zip(positions, residues)],
+            )
+            return self._scan_matrix(
+                sequence, alphabet, self.get_fitness([sequence] + mutants)
+            )
+
+        return super().mutational_scan(sequence, alphabet)
+
+    def _mutational_scan(self, sequence: str, alphabet: str) -> np.ndarray:
+        positions, residues = s_utils.single_mutant_indices(sequence, alphabet)
+        mutations = [[]] + [
+            [(pos, alphabet[res])] for pos, res in zip(positions, residues)
+        ]
+        return self._scan_matrix(
+            sequence, alphabet, self._fitness_function_mutants(sequence, mutations)
+        )
+
+    def get_state(self) -> Any:
+        """
+        Return a picklable snapshot of the model's fitted parameters.
+
+        Together with `set_state`, this lets `flexs.ModelCache` store and restore
+        trained models instead of retraining them.
+
+        """
+        raise NotImplementedError(f"{type(self).__name__} does not support get_state")
+
+    def set_state(self, state: Any):
+        """Restore fitted parameters returned by `get_state`."""
+        raise NotImplementedError(f"{type(self).__name__} does not support set_state")
+
 
 class LandscapeAsModel(Model):
     """
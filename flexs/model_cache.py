@@ -0,0 +1,211 @@
+"""Defines the ModelCache and CachedModel classes."""
+import hashlib
+import os
+import pickle
+import tempfile
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+import flexs
+from flexs.types import SEQUENCES_TYPE
+
+
+class ModelCache:
+    """
+    On-disk cache of fitted model states, keyed by training-data fingerprints.
+
+    Each entry is a pickled `flexs.Model.get_state()` stored in its own file under
+    `cache_dir`, so several processes (e.g. parallel runs of a sweep) can share a
+    cache. Entries are evicted least-recently-used first, using file modification
+    times, once the cache grows past `max_size_bytes`.
+
+    Attributes:
+        hits (int): Number of successful lookups by this object.
+        misses (int): Number of failed lookups by this object.
+
+    """
+
+    def __init__(self, cache_dir: str, max_size_bytes: Optional[int] = None):
+        """
+        Create (or reopen) a model cache.
+
+        Args:
+            cache_dir: Directory to store cached states in (created if missing).
+            max_size_bytes: Maximum total size of cached states. If None, entries
+                are never evicted.
+
+        """
+        if max_size_bytes is not None and max_size_bytes <= 0:
+            raise ValueError("`max_size_bytes` must be positive")
+
+        os.makedirs(cache_dir, exist_ok=True)
+        self.cache_dir = cache_dir
+        self.max_size_bytes = max_size_bytes
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.pkl")
+
+    def _entries(self):
+        entries = []
+        for filename in os.listdir(self.cache_dir):
+            if not filename.endswith(".pkl"):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.cache_dir, filename))
+            except FileNotFoundError:  # Evicted by another process
+                continue
+            entries.append((stat.st_mtime, stat.st_size, filename))
+
+        return entries
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the state stored under `key`, or None on a miss."""
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                state = pickle.load(f)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+
+        # Mark the entry as recently used
+        os.utime(path)
+        self.hits += 1
+        return state
+
+    def put(self, key: str, state: Any):
+        """Store `state` under `key`, then evict old entries if over size."""
+        # Write to a temporary file first so readers never see partial entries
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, self._path(key))
+
+        self.evict()
+
+    def evict(self):
+        """Remove least-recently-used entries until under `max_size_bytes`."""
+        if self.max_size_bytes is None:
+            return
+
+        entries = sorted(self._entries())
+        total_size = sum(size for _, size, _ in entries)
+        for _, size, filename in entries:
+            if total_size <= self.max_size_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.cache_dir, filename))
+            except FileNotFoundError:
+                pass
+            total_size -= size
+
+    def size_bytes(self) -> int:
+        """Return the total size of cached states."""
+        return sum(size for _, size, _ in self._entries())
+
+    def __len__(self):
+        return len(self._entries())
+
+    def stats(self) -> Dict[str, float]:
+        """Return hits, misses, hit rate, number of entries and size in bytes."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups > 0 else 0.0,
+            "entries": len(self),
+            "size_bytes": self.size_bytes(),
+        }
+
+
+def _default_hyperparameters(model: flexs.Model) -> Dict[str, Any]:
+    # Public attributes holding plain values (e.g. name, alphabet, epochs,
+    # batch_size), which is how the baseline models record their configuration
+    return {
+        attr: value
+        for attr, value in sorted(vars(model).items())
+        if not attr.startswith("_")
+        and attr != "cost"
+        and isinstance(value, (bool, int, float, str, tuple))
+    }
+
+
+class CachedModel(flexs.Model):
+    """
+    Wraps a `flexs.Model` so that `train` is a cache lookup whenever the same model
+    configuration has already been fitted to the same data.
+
+    The cache key hashes the model class, its hyperparameters, the training
+    sequences and labels and `seed`. On a miss, the wrapped model is trained and
+    its `get_state()` is stored; on a hit, it is restored with `set_state()`.
+    """
+
+    def __init__(
+        self,
+        model: flexs.Model,
+        cache: ModelCache,
+        hyperparameters: Optional[Dict[str, Any]] = None,
+        seed: Optional[int] = None,
+    ):
+        """
+        Wrap `model`.
+
+        Args:
+            model: Model to wrap. Must implement `get_state` and `set_state`.
+            cache: Cache to look fitted states up in.
+            hyperparameters: Configuration distinguishing `model` from other
+                instances of its class. Defaults to the model's public attributes
+                that hold plain values (name, alphabet, epochs, ...); pass this
+                explicitly for models whose name does not capture their
+                architecture.
+            seed: Included in the key so that runs which should not share fitted
+                models (e.g. different random restarts) can be kept apart.
+
+        """
+        super().__init__(model.name)
+
+        self.model = model
+        self.cache = cache
+        if hyperparameters is None:
+            hyperparameters = _default_hyperparameters(model)
+        self.hyperparameters = hyperparameters
+        self.seed = seed
+
+    def cache_key(self, sequences: SEQUENCES_TYPE, labels: np.ndarray) -> str:
+        """Return the cache key of fitting `self.model` to `sequences`, `labels`."""
+        model_class = type(self.model)
+        h = hashlib.sha256()
+        h.update(f"{model_class.__module__}.{model_class.__qualname__}".encode())
+        h.update(repr(sorted(self.hyperparameters.items())).encode())
+        h.update(repr(self.seed).encode())
+        h.update("\n".join(sequences).encode())
+        h.update(np.ascontiguousarray(labels, dtype=np.float64).tobytes())
+
+        return h.hexdigest()
+
+    def train(self, sequences: SEQUENCES_TYPE, labels: np.ndarray):
+        """Restore a cached fit of the wrapped model, or train it and cache it."""
+        sequences = list(sequences)
+        key = self.cache_key(sequences, labels)
+
+        state = self.cache.get(key)
+        if state is not None:
+            self.model.set_state(state)
+            return
+
+        self.model.train(sequences, labels)
+        self.cache.put(key, self.model.get_state())
+
+    def get_state(self) -> Any:
+        """Return the wrapped model's state."""
+        return self.model.get_state()
+
+    def set_state(self, state: Any):
+        """Restore the wrapped model's state."""
+        self.model.set_state(state)
+
+    def _fitness_function(self, sequences: SEQUENCES_TYPE) -> np.ndarray:
+        return self.model._fitness_function(sequences)
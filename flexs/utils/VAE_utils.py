@@ -1,5 +1,5 @@
 """Utility functions for A VAE generative model."""
-import random
+from typing import List, Optional
 
 import numpy as np
 import scipy.special
@@ -66,31 +66,63 @@ class VAEModel(keras.Model):
         reconstruction = self.decoder(z)
         return reconstruction
 
-    def generate(self):
-        """Generate a new sequence by sampling the latent space and then decoding."""
-        z = np.random.randn(1, self.latent_dim)
+    def generate(self, n_samples: int = 1):
+        """
+        Generate `n_samples` new sequences by sampling the latent space and then
+        decoding all of the latent points in a single forward pass.
+        """
+        z = np.random.randn(n_samples, self.latent_dim)
         return self.decoder(z)
 
-    def train_step(self, data):
-        """Define a custom train step taking in `data` and returning the loss."""
-        with tf.GradientTape() as tape:
-            z_mean, z_log_var, z = self.encoder(data)
-            reconstruction = self.decoder(z)
-            reconstruction_loss = self.original_dim * tf.reduce_mean(
-                keras.losses.binary_crossentropy(data, reconstruction)
-            )
-            kl_loss = -0.5 * tf.reduce_mean(
-                1 + z_log_var - tf.square(z_mean) - tf.exp(z_log_var)
-            )
-            total_loss = reconstruction_loss + kl_loss
-        grads = tape.gradient(total_loss, self.trainable_weights)
-        self.optimizer.apply_gradients(zip(grads, self.trainable_weights))
+    def _compute_losses(self, data, training):
+        """
+        Return the (sample-weighted) total, reconstruction and KL losses on `data`.
+
+        Only uses tensorflow ops, so it can be traced into a `tf.function`.
+        """
+        x, _, sample_weight = keras.utils.unpack_x_y_sample_weight(data)
+
+        z_mean, z_log_var, z = self.encoder(x, training=training)
+        reconstruction = self.decoder(z, training=training)
+
+        # Per-sample losses
+        reconstruction_loss = self.original_dim * keras.losses.binary_crossentropy(
+            x, reconstruction
+        )
+        kl_loss = -0.5 * tf.reduce_mean(
+            1 + z_log_var - tf.square(z_mean) - tf.exp(z_log_var), axis=1
+        )
+
+        if sample_weight is None:
+            sample_weight = tf.ones_like(reconstruction_loss)
+        sample_weight = tf.cast(tf.reshape(sample_weight, [-1]), x.dtype)
+        total_weight = tf.reduce_sum(sample_weight)
+
+        reconstruction_loss = tf.math.divide_no_nan(
+            tf.reduce_sum(sample_weight * reconstruction_loss), total_weight
+        )
+        kl_loss = tf.math.divide_no_nan(
+            tf.reduce_sum(sample_weight * kl_loss), total_weight
+        )
+
         return {
-            "loss": total_loss,
+            "loss": reconstruction_loss + kl_loss,
             "reconstruction_loss": reconstruction_loss,
             "kl_loss": kl_loss,
         }
 
+    def train_step(self, data):
+        """Define a custom train step taking in `data` and returning the loss."""
+        with tf.GradientTape() as tape:
+            losses = self._compute_losses(data, training=True)
+        grads = tape.gradient(losses["loss"], self.trainable_weights)
+        self.optimizer.apply_gradients(zip(grads, self.trainable_weights))
+        return losses
+
+    def test_step(self, data):
+        """Define a custom test step taking in `data` and returning the loss."""
+        return self._compute_losses(data, training=False)
+
 
 class VAE:
     """VAE class wrapping `VAEModel`, exposing an interface friendly to CbAS/DbAS."""
@@ -109,8 +141,6 @@ class VAE:
         verbose: bool = True,
     ):
         """Create the VAE."""
-        tf.config.run_functions_eagerly(True)
-
         self.batch_size = batch_size
         self.latent_dim = latent_dim
         self.intermediate_dim = intermediate_dim
@@ -127,22 +157,43 @@ class VAE:
         self.vae = VAEModel(
             len(self.alphabet) * self.seq_length, intermediate_dim, latent_dim
         )
-        self.vae.compile(optimizer=keras.optimizers.Adam(lr=0.0001, clipvalue=0.5))
+        # Sample weights are applied in `VAEModel`'s train and test steps
+        self.vae.compile(
+            optimizer=keras.optimizers.Adam(learning_rate=0.0001, clipvalue=0.5),
+            weighted_metrics=[],
+        )
 
-    def train_model(self, samples, weights):
-        """Train VAE on `samples` according to their `weights`."""
-        x_train = np.array(
+    def one_hot_encode(self, samples: SEQUENCES_TYPE) -> np.ndarray:
+        """Return the flattened float32 one-hot encodings the VAE is trained on."""
+        x = np.array(
             [s_utils.string_to_one_hot(sample, self.alphabet) for sample in samples],
             dtype="float32",
         )
-        x_train = x_train.reshape((len(x_train), self.seq_length * len(self.alphabet)))
+        return x.reshape((len(x), self.seq_length * len(self.alphabet)))
+
+    def train_model(self, samples, weights):
+        """Train VAE on `samples` according to their `weights`."""
+        self.fit(self.one_hot_encode(samples), weights)
+
+    def fit(self, x_train: np.ndarray, weights: np.ndarray):
+        """
+        Train VAE on flattened one-hot samples `x_train` according to their
+        `weights`.
+
+        Samples with zero weight do not contribute to the loss, so they are
+        dropped before they reach keras.
+        """
+        weights = np.asarray(weights, dtype="float32")
+        nonzero = weights != 0
+        if not nonzero.any():
+            return
 
         early_stop = keras.callbacks.EarlyStopping(monitor="loss", patience=3)
 
         self.vae.fit(
-            x_train,
+            x_train[nonzero],
             verbose=self.verbose,
-            sample_weight=np.array(weights),
+            sample_weight=weights[nonzero],
             shuffle=True,
             epochs=self.epochs,
             batch_size=self.batch_size,
@@ -154,42 +205,68 @@ class VAE:
         """
         Generate `n_samples` new samples such that none of them
         are in `existing_samples`.
-        """
-        x_reconstructed_matrix = np.reshape(
-            self.vae.generate(), (len(self.alphabet), self.seq_length)
-        )
 
-        if (
-            np.isnan(x_reconstructed_matrix).any()
-            or np.isinf(x_reconstructed_matrix).any()
-        ):
-            raise ValueError("NaN and/or inf in the reconstruction matrix")
+        Each batch of candidates is drawn by sampling `n_samples` latent points,
+        decoding them in one forward pass, and then sampling every position of every
+        decoded PWM at once.
+        """
+        if not isinstance(existing_samples, set):
+            existing_samples = set(existing_samples)
+        proposals = []
+        proposal_set = set()
 
-        # sample from the reconstructed pwm with Boltzmann weights
+        # sample from the reconstructed pwms with Boltzmann weights
         # reject repeated sequences and ones that are in existing_samples
-        proposals = []
         temperature = 0.001
-        weights = pwm_to_boltzmann_weights(x_reconstructed_matrix, temperature)
-        repetitions = 0
-
         while len(proposals) < n_samples:
-            new_seq = []
-            for pos in range(self.seq_length):
-                new_seq.extend(random.choices(self.alphabet, weights[:, pos]))
-            new_seq = "".join(new_seq)
-            if (new_seq not in proposals) and (new_seq not in existing_samples):
-                proposals.append(new_seq)
-            else:
-                repetitions += 1
+            x_reconstructed = np.reshape(
+                self.vae.generate(n_samples),
+                (n_samples, self.seq_length, len(self.alphabet)),
+            )
+
+            if np.isnan(x_reconstructed).any() or np.isinf(x_reconstructed).any():
+                raise ValueError("NaN and/or inf in the reconstruction matrix")
+
+            weights = pwm_to_boltzmann_weights(x_reconstructed, temperature, axis=2)
+            samples = s_utils.indices_to_sequences(
+                sample_from_categorical(weights), self.alphabet
+            )
+
+            repetitions = 0
+            for new_seq in samples:
+                if len(proposals) == n_samples:
+                    break
+
+                if new_seq not in proposal_set and new_seq not in existing_samples:
+                    proposals.append(new_seq)
+                    proposal_set.add(new_seq)
+                else:
+                    repetitions += 1
+
+            # raise the temperature to get more diverse samples
+            if repetitions > 0:
                 temperature = 1.3 * temperature
-                weights = pwm_to_boltzmann_weights(x_reconstructed_matrix, temperature)
 
         return proposals
 
     def calculate_log_probability(
-        self, sequences: SEQUENCES_TYPE, vae: VAEModel = None
+        self,
+        sequences: SEQUENCES_TYPE,
+        vae: VAEModel = None,
+        weights: Optional[List[np.ndarray]] = None,
     ):
-        """Calculate log probability of reconstructing a sequence."""
+        """
+        Calculate log probability of reconstructing a sequence.
+
+        Args:
+            sequences: Sequences to calculate log probabilities of.
+            vae: VAE to use instead of `self.vae`.
+            weights: A snapshot of weights (from `vae.get_weights()`) to compute the
+                probabilities with instead of the current weights. They are loaded
+                only for this call, so a frozen copy of the generator can be kept
+                without building a second model.
+
+        """
         if not vae:
             vae = self.vae
 
@@ -199,7 +276,16 @@ class VAE:
         )
         flattened_one_hots = one_hots.reshape(len(sequences), -1)
 
-        flattened_decoded = vae.predict(flattened_one_hots)
+        if weights is None:
+            flattened_decoded = vae.predict(flattened_one_hots, verbose=0)
+        else:
+            current_weights = vae.get_weights()
+            vae.set_weights(weights)
+            try:
+                flattened_decoded = vae.predict(flattened_one_hots, verbose=0)
+            finally:
+                vae.set_weights(current_weights)
+
         decoded = flattened_decoded.reshape(
             (len(sequences), self.seq_length, len(self.alphabet))
         )
@@ -217,16 +303,24 @@ class VAE:
         return np.nan_to_num(log_probs)
 
 
-def pwm_to_boltzmann_weights(prob_weight_matrix, temp):
-    """Convert pwm to boltzmann weights for categorical distribution sampling."""
-    weights = np.array(prob_weight_matrix)
-    cols_logsumexp = []
+def pwm_to_boltzmann_weights(prob_weight_matrix, temp, axis=0):
+    """
+    Convert pwm to boltzmann weights for categorical distribution sampling.
+
+    The weights are a softmax of `prob_weight_matrix / temp` along `axis`
+    (the alphabet axis), computed with a logsumexp for numerical stability.
+    """
+    logits = np.asarray(prob_weight_matrix) / temp
+    return np.exp(logits - scipy.special.logsumexp(logits, axis=axis, keepdims=True))
 
-    for i in range(weights.shape[1]):
-        cols_logsumexp.append(scipy.special.logsumexp(weights.T[i] / temp))
 
-    for i in range(weights.shape[0]):
-        for j in range(weights.shape[1]):
-            weights[i, j] = np.exp(weights[i, j] / temp - cols_logsumexp[j])
+def sample_from_categorical(weights):
+    """
+    Sample an index from each categorical distribution in `weights` at once.
 
-    return weights
+    Uses inverse-CDF sampling along the last axis of `weights`, so the returned
+    array has the shape of `weights` without its last axis.
+    """
+    cdf = np.cumsum(weights, axis=-1)
+    u = np.random.random(weights.shape[:-1] + (1,)) * cdf[..., -1:]
+    return np.minimum((u > cdf).sum(axis=-1), weights.shape[-1] - 1)
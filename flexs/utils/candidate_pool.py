@@ -0,0 +1,185 @@
+"""Bounded pool of the top-scoring candidate sequences generated by an explorer."""
+import heapq
+import itertools
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+
+class CandidatePool:
+    """
+    The `capacity` best-scoring distinct sequences out of all those added.
+
+    Candidates are kept in a min-heap keyed on score, so adding a candidate costs
+    O(log capacity), a candidate scoring no better than the worst member of a full
+    pool is rejected in O(1), and memory stays constant however many candidates
+    an explorer generates. Membership tests are dictionary lookups.
+
+    Sequences in `exclude` (typically those already measured) are never admitted.
+    If `min_distance` is set, the pool also keeps its members at least
+    `min_distance` mutations apart: a candidate too close to a member only
+    replaces it (and any other close members) if it scores higher than all of
+    them.
+
+    Pools filled by parallel workers can be combined with `merge`. Candidates
+    may be strings or any other hashable sequence type providing a
+    `hamming_distance` method, such as `utils.delta_sequences.DeltaSequence`.
+    """
+
+    def __init__(
+        self,
+        capacity: int,
+        exclude: Optional[Iterable[str]] = None,
+        min_distance: Optional[int] = None,
+    ):
+        """
+        Create an empty pool.
+
+        Args:
+            capacity: Maximum number of candidates kept.
+            exclude: Sequences that are never admitted. A `set` is used as is
+                (so the caller may keep adding to it), anything else is copied
+                into one.
+            min_distance: If set, minimum Hamming distance between members.
+
+        """
+        if capacity < 1:
+            raise ValueError("`capacity` must be at least 1")
+        if min_distance is not None and min_distance < 1:
+            raise ValueError("`min_distance` must be at least 1")
+
+        self.capacity = capacity
+        self.min_distance = min_distance
+        if exclude is None:
+            exclude = set()
+        elif not isinstance(exclude, set):
+            exclude = set(exclude)
+        self.exclude = exclude
+
+        # Heap entries are (score, -insertion number, sequence), so that among
+        # equal scores the most recent candidate is evicted first. Entries of
+        # members displaced by the diversity constraint go stale and are skipped.
+        self._heap: List[Tuple[float, int, str]] = []
+        self._members: Dict[str, Tuple[float, int]] = {}
+        self._counter = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self._members)
+
+    def __contains__(self, sequence: str) -> bool:
+        return sequence in self._members
+
+    def get(self, sequence: str, default: Optional[float] = None) -> Optional[float]:
+        """Return the score of `sequence` if it is a member, otherwise `default`."""
+        entry = self._members.get(sequence)
+        return default if entry is None else entry[0]
+
+    @property
+    def min_score(self) -> float:
+        """Score a candidate must beat to enter a full pool (-inf if not full)."""
+        if len(self._members) < self.capacity:
+            return -np.inf
+
+        self._drop_stale()
+        return self._heap[0][0]
+
+    @property
+    def max_score(self) -> float:
+        """Best score in the pool (-inf if empty)."""
+        return max((score for score, _ in self._members.values()), default=-np.inf)
+
+    def _drop_stale(self):
+        while self._heap and self._is_stale(self._heap[0]):
+            heapq.heappop(self._heap)
+
+    def _is_stale(self, entry: Tuple[float, int, str]) -> bool:
+        score, neg_id, seq = entry
+        return self._members.get(seq) != (score, -neg_id)
+
+    def add(self, sequences: Iterable[str], scores: Iterable[float]):
+        """Offer candidates with their scores to the pool."""
+        sequences = list(sequences)
+        scores = np.asarray(scores, dtype=np.float64).ravel()
+
+        # Cheap vectorised rejection of everything that cannot enter a full pool
+        candidates = np.flatnonzero(scores > self.min_score)
+        for i in candidates.tolist():
+            score = float(scores[i])
+            if score > self.min_score:
+                self._add_one(sequences[i], score)
+
+    def _add_one(self, seq: str, score: float):
+        if seq in self._members or seq in self.exclude:
+            return
+
+        if self.min_distance is not None:
+            close = self._close_members(seq)
+            if any(self._members[member][0] >= score for member in close):
+                return
+            for member in close:
+                del self._members[member]
+
+        entry_id = next(self._counter)
+        self._members[seq] = (score, entry_id)
+        heapq.heappush(self._heap, (score, -entry_id, seq))
+
+        if len(self._members) > self.capacity:
+            self._drop_stale()
+            _, _, evicted = heapq.heappop(self._heap)
+            del self._members[evicted]
+
+        # Rebuild the heap if stale entries make up most of it
+        if len(self._heap) > 2 * self.capacity:
+            self._heap = [entry for entry in self._heap if not self._is_stale(entry)]
+            heapq.heapify(self._heap)
+
+    def _close_members(self, seq: str) -> List[str]:
+        if len(self._members) == 0:
+            return []
+
+        members = list(self._members)
+        if not isinstance(seq, str):
+            # e.g. `DeltaSequence`s, which compute distances from their edits
+            return [
+                member
+                for member in members
+                if seq.hamming_distance(member) < self.min_distance
+            ]
+
+        codes = np.frombuffer("".join(members).encode(), dtype=np.uint8).reshape(
+            len(members), -1
+        )
+        distances = np.count_nonzero(
+            codes != np.frombuffer(seq.encode(), dtype=np.uint8), axis=1
+        )
+        return [members[i] for i in np.flatnonzero(distances < self.min_distance)]
+
+    def merge(self, other: "CandidatePool"):
+        """Offer every member of `other` to this pool."""
+        sequences, scores = other.top()
+        self.add(sequences, scores)
+
+    def items(self) -> List[Tuple[str, float]]:
+        """Return the `(sequence, score)` members, best first."""
+        return sorted(
+            ((seq, score) for seq, (score, _) in self._members.items()),
+            key=lambda item: item[1],
+            reverse=True,
+        )
+
+    def top(self, n: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Return the best `n` (default: all) sequences and their scores."""
+        items = self.items()[:n]
+        if all(isinstance(seq, str) for seq, _ in items):
+            sequences = np.array([seq for seq, _ in items])
+        else:
+            # Keep other sequence types whole rather than as arrays of residues
+            sequences = np.empty(len(items), dtype=object)
+            sequences[:] = [seq for seq, _ in items]
+
+        return sequences, np.array([score for _, score in items])
+
+    def clear(self):
+        """Remove every member (the excluded set is kept)."""
+        self._heap = []
+        self._members = {}
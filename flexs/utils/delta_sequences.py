@@ -0,0 +1,252 @@
+"""Compact storage of sequences as edits of a shared reference sequence."""
+import functools
+import itertools
+from typing import Iterable, List, Sequence, Tuple
+
+import numpy as np
+
+from flexs.utils import sequence_utils as s_utils
+
+# Edits are packed into one uint32 per substitution: position << 8 | residue index
+_RESIDUE_BITS = 8
+_RESIDUE_MASK = (1 << _RESIDUE_BITS) - 1
+
+_reference_ids = itertools.count()
+
+
+@functools.lru_cache(maxsize=None)
+def _zobrist_table(seq_len: int, alphabet_size: int) -> np.ndarray:
+    """Return fixed random 64-bit keys for every (position, residue) pair."""
+    rng = np.random.default_rng(0)
+    return rng.integers(0, 2**64, size=(seq_len, alphabet_size), dtype=np.uint64)
+
+
+class Reference:
+    """
+    A full-length sequence that `DeltaSequence` objects store their edits against.
+
+    Attributes:
+        id (int): Identifier, unique within the process.
+        sequence (str): The reference sequence.
+        alphabet (str): Alphabet string (at most 256 characters).
+        codes (np.ndarray): Integer encoding of `sequence`.
+
+    """
+
+    def __init__(self, sequence: str, alphabet: str):
+        """
+        Create a reference.
+
+        Args:
+            sequence: The reference sequence.
+            alphabet: Alphabet string (assigns each character an index).
+
+        """
+        if len(alphabet) > _RESIDUE_MASK + 1:
+            raise ValueError("`alphabet` must have at most 256 characters")
+
+        self.id = next(_reference_ids)
+        self.sequence = sequence
+        self.alphabet = alphabet
+        self.codes = s_utils.sequences_to_indices([sequence], alphabet)[0]
+
+        self._zobrist = _zobrist_table(len(sequence), len(alphabet))
+        self._hash = int(
+            np.bitwise_xor.reduce(self._zobrist[np.arange(len(sequence)), self.codes])
+        )
+
+    def __len__(self) -> int:
+        return len(self.sequence)
+
+    def __repr__(self) -> str:
+        return f"Reference(id={self.id}, seq_len={len(self)})"
+
+    def _edits_hash(self, positions: np.ndarray, residues: np.ndarray) -> int:
+        # XOR out each edited position's reference key and XOR in the new one,
+        # so sequences hash the same whatever reference they are stored against
+        keys = (
+            self._zobrist[positions, residues]
+            ^ self._zobrist[positions, self.codes[positions]]
+        )
+        return self._hash ^ int(np.bitwise_xor.reduce(keys, initial=np.uint64(0)))
+
+    def _delta(self, positions: np.ndarray, residues: np.ndarray) -> "DeltaSequence":
+        # Positions must be sorted, unique and differ from the reference
+        edits = (positions.astype(np.uint32) << _RESIDUE_BITS) | residues.astype(
+            np.uint32
+        )
+        return DeltaSequence(
+            self, edits.tobytes(), self._edits_hash(positions, residues)
+        )
+
+    def encode(self, sequences: Iterable[str]) -> List["DeltaSequence"]:
+        """Return each of `sequences` as a `DeltaSequence` against this reference."""
+        codes = s_utils.sequences_to_indices(sequences, self.alphabet)
+        if len(codes) == 0:
+            return []
+        if codes.shape[1] != len(self):
+            raise ValueError("Sequences must have the same length as the reference")
+
+        seq_ids, positions = np.nonzero(codes != self.codes)
+        residues = codes[seq_ids, positions]
+        bounds = np.searchsorted(seq_ids, np.arange(len(codes) + 1))
+
+        return [
+            self._delta(positions[start:stop], residues[start:stop])
+            for start, stop in zip(bounds[:-1], bounds[1:])
+        ]
+
+
+class DeltaSequence:
+    """
+    A sequence stored as a reference plus its sorted (position, residue) edits.
+
+    Storage grows with the number of edits rather than the sequence length, which
+    makes it much cheaper than a `str` for the near-parent candidates explorers
+    generate on long sequences. Hashes are computed incrementally from the edits
+    (Zobrist hashing), and equal sequences compare and hash equal even when stored
+    against different references, so delta sequences can be used as `set` members
+    and `dict` keys. They do not compare equal to `str` (use `str()` to
+    materialise the full sequence).
+
+    Create delta sequences with `Reference.encode` or `DeltaSequence.mutate`.
+    """
+
+    __slots__ = ("reference", "_edits", "_hash")
+
+    def __init__(self, reference: Reference, edits: bytes, hash_value: int):
+        """Create a delta sequence from packed edits (see `Reference.encode`)."""
+        self.reference = reference
+        self._edits = edits
+        self._hash = hash_value
+
+    @classmethod
+    def from_sequence(cls, sequence: str, reference: Reference) -> "DeltaSequence":
+        """Return `sequence` as a delta sequence against `reference`."""
+        return reference.encode([sequence])[0]
+
+    @property
+    def _packed(self) -> np.ndarray:
+        return np.frombuffer(self._edits, dtype=np.uint32)
+
+    @property
+    def positions(self) -> np.ndarray:
+        """Sorted positions at which the sequence differs from its reference."""
+        return (self._packed >> _RESIDUE_BITS).astype(np.int64)
+
+    @property
+    def residue_indices(self) -> np.ndarray:
+        """Alphabet index of the residue at each of `positions`."""
+        return (self._packed & _RESIDUE_MASK).astype(np.int64)
+
+    @property
+    def edits(self) -> List[Tuple[int, str]]:
+        """The `(position, residue)` edits from the reference."""
+        alphabet = self.reference.alphabet
+        return [
+            (position, alphabet[residue])
+            for position, residue in zip(
+                self.positions.tolist(), self.residue_indices.tolist()
+            )
+        ]
+
+    @property
+    def num_edits(self) -> int:
+        """Hamming distance to the reference."""
+        return len(self._edits) // 4
+
+    def codes(self) -> np.ndarray:
+        """Return the integer encoding of the full sequence."""
+        codes = self.reference.codes.copy()
+        codes[self.positions] = self.residue_indices
+        return codes
+
+    def mutate(self, mutations: Sequence[Tuple[int, str]]) -> "DeltaSequence":
+        """
+        Return the mutant with `(position, residue)` substitutions applied.
+
+        The mutant shares this sequence's reference, so a chain of mutations
+        never materialises a full-length sequence.
+        """
+        edits = dict(zip(self.positions.tolist(), self.residue_indices.tolist()))
+        reference = self.reference
+        for position, residue in mutations:
+            if not 0 <= position < len(reference):
+                raise ValueError(f"Position {position} is out of range")
+            edits[position] = reference.alphabet.index(residue)
+
+        positions = np.array(sorted(edits), dtype=np.int64)
+        residues = np.array([edits[p] for p in positions.tolist()], dtype=np.int64)
+        differs = residues != reference.codes[positions]
+
+        return reference._delta(positions[differs], residues[differs])
+
+    def hamming_distance(self, other: "DeltaSequence") -> int:
+        """Return the Hamming distance to `other`."""
+        if other.reference is not self.reference:
+            return int(np.count_nonzero(self.codes() != other.codes()))
+
+        # Only positions edited in either sequence can differ
+        self_edits = dict(zip(self.positions.tolist(), self.residue_indices.tolist()))
+        other_edits = dict(
+            zip(other.positions.tolist(), other.residue_indices.tolist())
+        )
+        return sum(
+            self_edits.get(p) != other_edits.get(p)
+            for p in self_edits.keys() | other_edits.keys()
+        )
+
+    def __str__(self) -> str:
+        if self.num_edits == 0:
+            return self.reference.sequence
+        return s_utils.indices_to_sequences(
+            self.codes()[None], self.reference.alphabet
+        )[0]
+
+    def __repr__(self) -> str:
+        return f"DeltaSequence(reference={self.reference.id}, edits={self.edits})"
+
+    def __len__(self) -> int:
+        return len(self.reference)
+
+    def __getitem__(self, position: int) -> str:
+        packed = self._packed
+        i = np.searchsorted(packed >> _RESIDUE_BITS, position)
+        if i < len(packed) and packed[i] >> _RESIDUE_BITS == position:
+            return self.reference.alphabet[packed[i] & _RESIDUE_MASK]
+        return self.reference.sequence[position]
+
+    def __hash__(self) -> int:
+        return self._hash
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, DeltaSequence):
+            return NotImplemented
+        if self._hash != other._hash:
+            return False
+        if other.reference is self.reference:
+            return self._edits == other._edits
+
+        return (
+            self.reference.alphabet == other.reference.alphabet
+            and len(self) == len(other)
+            and bool(np.array_equal(self.codes(), other.codes()))
+        )
+
+
+def materialize(sequences: Sequence[DeltaSequence]) -> np.ndarray:
+    """
+    Return the full sequence strings of delta sequences, in one vectorised pass.
+
+    All sequences must share a length and an alphabet.
+    """
+    if len(sequences) == 0:
+        return np.zeros(0, dtype=str)
+
+    alphabet = sequences[0].reference.alphabet
+    codes = np.stack([seq.reference.codes for seq in sequences])
+    for i, seq in enumerate(sequences):
+        if seq.num_edits > 0:
+            codes[i, seq.positions] = seq.residue_indices
+
+    return s_utils.indices_to_sequences(codes, alphabet)
@@ -0,0 +1,150 @@
+"""Neighbour index for fast Hamming-ball density queries over fixed-length sequences."""
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+from flexs.utils import sequence_utils as s_utils
+
+
+class HammingDensityIndex:
+    """
+    Incrementally updatable index of scored sequences supporting batched
+    Hamming-ball density queries.
+
+    Sequences are stored as rows of an integer matrix. By the pigeonhole
+    principle, two sequences within Hamming distance `radius` of each other
+    agree exactly on at least one of `radius + 1` disjoint segments, so every
+    sequence is bucketed under the hashes of its segments. A query only verifies
+    the sequences sharing a segment bucket with it, with a vectorised comparison.
+
+    Attributes:
+        seq_len (int): Length of indexed sequences.
+        alphabet (str): Alphabet of indexed sequences.
+        radius (int): Maximum Hamming distance of neighbours counted in densities.
+
+    """
+
+    def __init__(
+        self, seq_len: int, alphabet: str, radius: int = 2, initial_capacity: int = 1024
+    ):
+        """
+        Create an empty index.
+
+        Args:
+            seq_len: Length of indexed sequences.
+            alphabet: Alphabet of indexed sequences.
+            radius: Maximum Hamming distance of neighbours counted in densities.
+            initial_capacity: Number of sequences to allocate storage for. The
+                storage is doubled whenever it fills up.
+
+        """
+        self.seq_len = seq_len
+        self.alphabet = alphabet
+        self.radius = radius
+
+        self._segments = np.array_split(np.arange(seq_len), radius + 1)
+        self._buckets: List[Dict[int, List[int]]] = [{} for _ in self._segments]
+        self._ids: Dict[str, int] = {}
+
+        self._codes = np.zeros((initial_capacity, seq_len), dtype=np.int64)
+        self._values = np.zeros(initial_capacity, dtype=np.float64)
+        self._size = 0
+
+    def _segment_hashes(self, codes: np.ndarray) -> List[np.ndarray]:
+        return [s_utils.hash_indices(codes[:, segment]) for segment in self._segments]
+
+    def _grow(self, min_capacity: int):
+        capacity = len(self._codes)
+        while capacity < min_capacity:
+            capacity *= 2
+
+        codes = np.zeros((capacity, self.seq_len), dtype=self._codes.dtype)
+        codes[: self._size] = self._codes[: self._size]
+        values = np.zeros(capacity, dtype=self._values.dtype)
+        values[: self._size] = self._values[: self._size]
+        self._codes, self._values = codes, values
+
+    def add(self, sequences: Sequence[str], values: Sequence[float]):
+        """
+        Add sequences with their values, overwriting the values of sequences
+        that are already indexed.
+        """
+        values = np.asarray(values, dtype=np.float64).ravel()
+
+        new = {}
+        for seq, value in zip(sequences, values):
+            if seq in self._ids:
+                self._values[self._ids[seq]] = value
+            else:
+                new[seq] = value
+
+        if len(new) == 0:
+            return
+        new_seqs, new_values = list(new), list(new.values())
+
+        start = self._size
+        stop = start + len(new_seqs)
+        if stop > len(self._codes):
+            self._grow(stop)
+
+        self._codes[start:stop] = s_utils.sequences_to_indices(new_seqs, self.alphabet)
+        self._values[start:stop] = new_values
+        self._size = stop
+
+        for seq, i in zip(new_seqs, range(start, stop)):
+            self._ids[seq] = i
+
+        for buckets, hashes in zip(
+            self._buckets, self._segment_hashes(self._codes[start:stop])
+        ):
+            for i, h in zip(range(start, stop), hashes.tolist()):
+                buckets.setdefault(h, []).append(i)
+
+    def density(self, sequences: Sequence[str]) -> np.ndarray:
+        """
+        Compute the density of each query sequence.
+
+        The density of a sequence is the sum of `value / distance` over all indexed
+        sequences at Hamming distance `0 < distance <= radius` from it.
+
+        Returns:
+            An array of densities, one per query sequence.
+
+        """
+        if len(sequences) == 0 or self._size == 0:
+            return np.zeros(len(sequences))
+
+        codes = s_utils.sequences_to_indices(sequences, self.alphabet)
+
+        query_inds, candidate_inds = [], []
+        for buckets, hashes in zip(self._buckets, self._segment_hashes(codes)):
+            for query, h in enumerate(hashes.tolist()):
+                candidates = buckets.get(h)
+                if candidates is not None:
+                    query_inds.append(np.full(len(candidates), query))
+                    candidate_inds.append(candidates)
+
+        if len(query_inds) == 0:
+            return np.zeros(len(sequences))
+
+        # A pair can share several segments, so deduplicate before verifying
+        pairs = np.unique(
+            np.concatenate(query_inds) * self._size + np.concatenate(candidate_inds)
+        )
+        query_inds, candidate_inds = np.divmod(pairs, self._size)
+        dists = np.count_nonzero(
+            codes[query_inds] != self._codes[candidate_inds], axis=1
+        )
+
+        within_radius = (dists > 0) & (dists <= self.radius)
+        return np.bincount(
+            query_inds[within_radius],
+            weights=self._values[candidate_inds[within_radius]] / dists[within_radius],
+            minlength=len(sequences),
+        )
+
+    def __contains__(self, sequence: str) -> bool:
+        return sequence in self._ids
+
+    def __len__(self) -> int:
+        return self._size
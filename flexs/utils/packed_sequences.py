@@ -0,0 +1,203 @@
+"""Bit-packed arrays of fixed-length sequences."""
+from typing import Sequence, Union
+
+import numpy as np
+
+from flexs.utils import sequence_utils as s_utils
+
+
+def _popcount(words: np.ndarray) -> np.ndarray:
+    """Return the number of set bits of each uint64 word (SWAR popcount)."""
+    words = words - ((words >> np.uint64(1)) & np.uint64(0x5555555555555555))
+    words = (words & np.uint64(0x3333333333333333)) + (
+        (words >> np.uint64(2)) & np.uint64(0x3333333333333333)
+    )
+    words = (words + (words >> np.uint64(4))) & np.uint64(0x0F0F0F0F0F0F0F0F)
+    with np.errstate(over="ignore"):
+        return (words * np.uint64(0x0101010101010101)) >> np.uint64(56)
+
+
+def bits_per_residue(alphabet: str) -> int:
+    """Return the packed width of a residue: 2, 5 or 8 bits."""
+    for bits in [2, 5, 8]:
+        if len(alphabet) <= 2**bits:
+            return bits
+
+    raise ValueError("`alphabet` must have at most 256 characters")
+
+
+class PackedSequences:
+    """
+    An array of equal-length sequences packed `bits` bits per residue.
+
+    Residues take 2 bits for nucleotide alphabets, 5 for amino acids and 8 for
+    anything else up to 256 characters. They are packed into 64-bit words (32, 12
+    or 8 residues per word, never straddling two words), stored as a
+    `(num_sequences, num_words)` array, so DNA takes 1/4 of a byte per residue
+    against 32 bytes for a float64 one-hot.
+
+    Hamming distances are computed on the packed words directly: XOR marks the
+    differing bits, each residue's bits are folded onto its lowest bit, and the
+    surviving bits are counted with a bitwise (SWAR) popcount.
+
+    Attributes:
+        words (np.ndarray): `(num_sequences, num_words)` uint64 packed residues.
+        seq_len (int): Length of sequences.
+        alphabet (str): Alphabet string.
+        bits (int): Bits per residue.
+
+    """
+
+    def __init__(self, words: np.ndarray, seq_len: int, alphabet: str):
+        """
+        Wrap already packed words (see `from_sequences` and `from_indices`).
+
+        Args:
+            words: `(num_sequences, num_words)` uint64 packed residues.
+            seq_len: Length of sequences.
+            alphabet: Alphabet string.
+
+        """
+        self.bits = bits_per_residue(alphabet)
+        self.seq_len = seq_len
+        self.alphabet = alphabet
+        words = np.asarray(words, dtype=np.uint64)
+        num_words = self._num_words(seq_len, self.bits)
+        if num_words > 0:
+            self.words = words.reshape(-1, num_words)
+        else:
+            # Zero-length sequences: the row count can't be inferred from the size
+            self.words = words.reshape(words.shape[0] if words.ndim == 2 else 1, 0)
+
+    @staticmethod
+    def _residues_per_word(bits: int) -> int:
+        return 64 // bits
+
+    @classmethod
+    def _num_words(cls, seq_len: int, bits: int) -> int:
+        return -(-seq_len // cls._residues_per_word(bits))
+
+    def _shifts(self) -> np.ndarray:
+        return np.arange(self._residues_per_word(self.bits), dtype=np.uint64) * (
+            np.uint64(self.bits)
+        )
+
+    @classmethod
+    def from_indices(cls, indices: np.ndarray, alphabet: str) -> "PackedSequences":
+        """Pack an integer-encoded `(num_sequences, seq_len)` array."""
+        indices = np.asarray(indices)
+        num_seqs, seq_len = indices.shape
+        bits = bits_per_residue(alphabet)
+        per_word = cls._residues_per_word(bits)
+        num_words = cls._num_words(seq_len, bits)
+
+        padded = np.zeros((num_seqs, num_words * per_word), dtype=np.uint64)
+        padded[:, :seq_len] = indices
+        shifts = np.arange(per_word, dtype=np.uint64) * np.uint64(bits)
+        words = np.bitwise_or.reduce(
+            padded.reshape(num_seqs, num_words, per_word) << shifts, axis=2
+        )
+
+        return cls(words, seq_len, alphabet)
+
+    @classmethod
+    def from_sequences(
+        cls, sequences: Sequence[str], alphabet: str
+    ) -> "PackedSequences":
+        """Pack equal-length sequence strings."""
+        sequences = list(sequences)
+        indices = s_utils.sequences_to_indices(sequences, alphabet)
+        if len(sequences) == 0:
+            return cls(np.zeros((0, 0), dtype=np.uint64), 0, alphabet)
+
+        return cls.from_indices(indices, alphabet)
+
+    def to_indices(self) -> np.ndarray:
+        """Return the integer encoding of the sequences, as `int64`."""
+        mask = np.uint64(2**self.bits - 1)
+        residues = (self.words[:, :, None] >> self._shifts()) & mask
+
+        return residues.reshape(len(self), residues.shape[1] * residues.shape[2])[
+            :, : self.seq_len
+        ].astype(np.int64)
+
+    def to_sequences(self) -> np.ndarray:
+        """Return the sequence strings."""
+        if len(self) == 0:
+            return np.zeros(0, dtype=str)
+
+        return s_utils.indices_to_sequences(self.to_indices(), self.alphabet)
+
+    def one_hot(self) -> np.ndarray:
+        """Return the float32 one-hot encoding, `(num_sequences, seq_len, A)`."""
+        return np.eye(len(self.alphabet), dtype=np.float32)[self.to_indices()]
+
+    def hash(self) -> np.ndarray:
+        """Return a deterministic 64-bit hash of each sequence."""
+        return s_utils.hash_indices(self.words)
+
+    def _low_bits_mask(self) -> np.uint64:
+        # The lowest bit of every residue slot of a word
+        return np.bitwise_or.reduce(np.uint64(1) << self._shifts())
+
+    def hamming_distance(self, other: "PackedSequences") -> np.ndarray:
+        """
+        Return the Hamming distance between corresponding sequences.
+
+        `self` and `other` must have the same length, or one of them a single
+        sequence, in which case it is compared with every sequence of the other.
+        """
+        self._check_compatible(other)
+        diff = self.words ^ other.words
+
+        # Fold each residue's differing bits onto its lowest bit
+        folded = diff
+        for shift in range(1, self.bits):
+            folded = folded | (diff >> np.uint64(shift))
+        folded &= self._low_bits_mask()
+
+        return _popcount(folded).sum(axis=1, dtype=np.int64)
+
+    def pairwise_hamming_distances(
+        self, other: "PackedSequences", batch_size: int = 1024
+    ) -> np.ndarray:
+        """Return the `(len(self), len(other))` matrix of Hamming distances."""
+        self._check_compatible(other)
+        distances = np.zeros((len(self), len(other)), dtype=np.int64)
+        for i in range(len(self)):
+            for start in range(0, len(other), batch_size):
+                distances[i, start : start + batch_size] = self[i].hamming_distance(
+                    other[start : start + batch_size]
+                )
+
+        return distances
+
+    def _check_compatible(self, other: "PackedSequences"):
+        if other.seq_len != self.seq_len or other.alphabet != self.alphabet:
+            raise ValueError("Sequences must share a length and an alphabet")
+
+    @classmethod
+    def concatenate(cls, arrays: Sequence["PackedSequences"]) -> "PackedSequences":
+        """Concatenate packed arrays sharing a length and an alphabet."""
+        for array in arrays[1:]:
+            arrays[0]._check_compatible(array)
+
+        return cls(
+            np.concatenate([array.words for array in arrays]),
+            arrays[0].seq_len,
+            arrays[0].alphabet,
+        )
+
+    @property
+    def nbytes(self) -> int:
+        """Size of the packed words in bytes."""
+        return self.words.nbytes
+
+    def __len__(self) -> int:
+        return len(self.words)
+
+    def __getitem__(
+        self, key: Union[int, slice, np.ndarray, Sequence[int]]
+    ) -> "PackedSequences":
+        words = self.words[key]
+        return PackedSequences(words, self.seq_len, self.alphabet)
@@ -1,7 +1,7 @@
 """Defines replay buffers used by some explorers."""
 import operator
 import random
-from typing import Callable, Dict, List
+from typing import Callable, Dict, List, Optional
 
 import numpy as np
 
@@ -278,3 +278,66 @@ class PrioritizedReplayBuffer(ReplayBuffer):
         weight = weight / max_weight
 
         return weight
+
+
+class WeightedSampleBuffer:
+    """
+    A growable numpy buffer of (encoded) samples and their weights.
+
+    Storage is preallocated and doubled when full, so adding samples is amortized
+    O(1) per sample rather than copying the whole pool on every append.
+    """
+
+    def __init__(self, sample_dim: int, initial_capacity: int = 1024):
+        """Initialize."""
+        self.samples_buf = np.zeros([initial_capacity, sample_dim], dtype=np.float32)
+        self.weights_buf = np.zeros([initial_capacity], dtype=np.float32)
+        self.size = 0
+
+    def _grow(self, min_capacity: int):
+        capacity = len(self.weights_buf)
+        while capacity < min_capacity:
+            capacity *= 2
+
+        samples_buf = np.zeros([capacity, self.samples_buf.shape[1]], dtype=np.float32)
+        weights_buf = np.zeros([capacity], dtype=np.float32)
+        samples_buf[: self.size] = self.samples_buf[: self.size]
+        weights_buf[: self.size] = self.weights_buf[: self.size]
+        self.samples_buf, self.weights_buf = samples_buf, weights_buf
+
+    def add(self, samples: np.ndarray, weights: np.ndarray):
+        """Append a batch of samples and their weights to the buffer."""
+        if self.size + len(samples) > len(self.weights_buf):
+            self._grow(self.size + len(samples))
+
+        self.samples_buf[self.size : self.size + len(samples)] = samples
+        self.weights_buf[self.size : self.size + len(samples)] = weights
+        self.size += len(samples)
+
+    @property
+    def samples(self) -> np.ndarray:
+        """View of all samples in the buffer."""
+        return self.samples_buf[: self.size]
+
+    @property
+    def weights(self) -> np.ndarray:
+        """View of all weights in the buffer."""
+        return self.weights_buf[: self.size]
+
+    def sample_batch(
+        self, batch_size: int, end: Optional[int] = None
+    ) -> Dict[str, np.ndarray]:
+        """
+        Sample (without replacement) up to `batch_size` samples with non-zero
+        weight from the first `end` entries of the buffer.
+        """
+        end = self.size if end is None else end
+        candidates = np.flatnonzero(self.weights_buf[:end])
+        idxs = np.random.choice(
+            candidates, size=min(batch_size, len(candidates)), replace=False
+        )
+        return dict(samples=self.samples_buf[idxs], weights=self.weights_buf[idxs])
+
+    def __len__(self) -> int:
+        """len(buffer) == `buffer.size`"""
+        return self.size
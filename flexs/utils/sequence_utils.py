@@ -1,6 +1,7 @@
 """Utility functions for manipulating sequences."""
+import functools
 import random
-from typing import List, Union
+from typing import List, Sequence, Tuple, Union
 
 import numpy as np
 
@@ -66,6 +67,144 @@ def one_hot_to_string(
     return "".join([alphabet[idx] for idx in residue_idxs])
 
 
+def sequences_to_indices(sequences: List[str], alphabet: str) -> np.ndarray:
+    """
+    Return the integer-encoded representation of equal-length sequence strings.
+
+    Args:
+        sequences: Sequence strings (all of the same length) to encode.
+        alphabet: Alphabet string (assigns each character an index).
+
+    Returns:
+        Integer numpy array of shape `(len(sequences), len(sequence))` where entry
+        `[i, j]` is the index in `alphabet` of residue `j` of sequence `i`.
+
+    """
+    sequences = list(sequences)
+    if len(sequences) == 0:
+        return np.zeros((0, 0), dtype=np.int64)
+
+    lookup = np.full(256, -1, dtype=np.int64)
+    lookup[np.frombuffer(alphabet.encode("ascii"), dtype=np.uint8)] = np.arange(
+        len(alphabet)
+    )
+
+    chars = np.frombuffer("".join(sequences).encode("ascii"), dtype=np.uint8)
+    indices = lookup[chars].reshape(len(sequences), -1)
+
+    if (indices < 0).any():
+        raise ValueError("Sequences contain characters that are not in `alphabet`")
+
+    return indices
+
+
+def indices_to_sequences(indices: np.ndarray, alphabet: str) -> np.ndarray:
+    """
+    Return the sequence strings represented by an integer-encoded array.
+
+    Inverse of `sequences_to_indices`.
+
+    Args:
+        indices: Integer array of shape `(num_sequences, len(sequence))`.
+        alphabet: Alphabet string (assigns each character an index).
+
+    Returns:
+        Numpy array of sequence strings.
+
+    """
+    indices = np.asarray(indices)
+    chars = np.frombuffer(alphabet.encode("ascii"), dtype=np.uint8)[indices]
+    packed = np.ascontiguousarray(chars).view(f"S{indices.shape[1]}").ravel()
+    return packed.astype(str)
+
+
+def hash_indices(indices: np.ndarray) -> np.ndarray:
+    """
+    Return a 64-bit hash of each row of an integer-encoded sequence array.
+
+    Hashes are deterministic across runs, so they can be stored and compared
+    in place of the sequences themselves (collisions are vanishingly unlikely).
+
+    Args:
+        indices: Integer array of shape `(num_sequences, len(sequence))`.
+
+    Returns:
+        Numpy array of `num_sequences` unsigned 64-bit hashes.
+
+    """
+    indices = np.asarray(indices, dtype=np.uint64)
+    multipliers = _hash_multipliers(indices.shape[1])
+
+    with np.errstate(over="ignore"):
+        hashes = ((indices + np.uint64(1)) * multipliers).sum(axis=1, dtype=np.uint64)
+
+        # splitmix64 finalizer to mix the bits of the weighted sum
+        hashes ^= hashes >> np.uint64(30)
+        hashes *= np.uint64(0xBF58476D1CE4E5B9)
+        hashes ^= hashes >> np.uint64(27)
+        hashes *= np.uint64(0x94D049BB133111EB)
+        hashes ^= hashes >> np.uint64(31)
+
+    return hashes
+
+
+@functools.lru_cache(maxsize=None)
+def _hash_multipliers(length: int) -> np.ndarray:
+    """Return fixed, odd, per-position 64-bit multipliers for `hash_indices`."""
+    rng = np.random.default_rng(0)
+    multipliers = rng.integers(0, 2**63, size=length, dtype=np.uint64)
+    return (multipliers << np.uint64(1)) | np.uint64(1)
+
+
+def apply_mutations(
+    parent: str, mutations: Sequence[Sequence[Tuple[int, str]]]
+) -> List[str]:
+    """
+    Return the mutants of `parent` described by `mutations`.
+
+    Args:
+        parent: Parent sequence.
+        mutations: For each mutant, a list of `(position, residue)` substitutions.
+
+    Returns:
+        List of mutant sequence strings.
+
+    """
+    mutants = []
+    for substitutions in mutations:
+        mutant = list(parent)
+        for position, residue in substitutions:
+            mutant[position] = residue
+        mutants.append("".join(mutant))
+
+    return mutants
+
+
+def mutations_to_indices(
+    mutations: Sequence[Sequence[Tuple[int, str]]], alphabet: str
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Flatten per-mutant substitution lists into aligned index arrays.
+
+    Args:
+        mutations: For each mutant, a list of `(position, residue)` substitutions.
+        alphabet: Alphabet string (assigns each character an index).
+
+    Returns:
+        The mutant index, position and residue index of every substitution.
+
+    """
+    mutant_ids = [i for i, subs in enumerate(mutations) for _ in range(len(subs))]
+    positions = [position for subs in mutations for position, _ in subs]
+    residues = [alphabet.index(residue) for subs in mutations for _, residue in subs]
+
+    return (
+        np.array(mutant_ids, dtype=np.int64),
+        np.array(positions, dtype=np.int64),
+        np.array(residues, dtype=np.int64),
+    )
+
+
 def generate_single_mutants(wt: str, alphabet: str) -> List[str]:
     """Generate all single mutants of `wt`."""
     sequences = [wt]
@@ -77,6 +216,28 @@ def generate_single_mutants(wt: str, alphabet: str) -> List[str]:
     return sequences
 
 
+def single_mutant_indices(
+    sequence: str, alphabet: str
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Return the positions and residue indices of all single mutants of `sequence`.
+
+    Mutants are ordered row-major in the `(len(sequence), len(alphabet))` matrix of
+    substitutions, skipping `sequence`'s own residues.
+
+    Args:
+        sequence: Parent sequence.
+        alphabet: Alphabet string (assigns each character an index).
+
+    Returns:
+        Positions and residue indices, each of length
+        `len(sequence) * (len(alphabet) - 1)`.
+
+    """
+    parent_indices = sequences_to_indices([sequence], alphabet)[0]
+    return np.nonzero(np.arange(len(alphabet)) != parent_indices[:, None])
+
+
 def generate_random_sequences(length: int, number: int, alphabet: str) -> List[str]:
     """Generate random sequences of particular length."""
     return [
@@ -1,4 +1,6 @@
 import numpy as np
+import pytest
+import tensorflow as tf
 
 import flexs
 from flexs import baselines
@@ -58,17 +60,33 @@ def test_bo():
     )
     explorer.run(fakeLandscape)
 
+    for method in ["EI", "UCB"]:
+        explorer = baselines.explorers.BO(
+            model=flexs.Ensemble([fakeModel, fakeModel], combine_with=lambda x: x),
+            rounds=3,
+            sequences_batch_size=5,
+            model_queries_per_batch=60,
+            starting_sequence=starting_sequence,
+            alphabet="ATCG",
+            method=method,
+            recomb_rate=0.2,
+            num_chains=3,
+        )
+        explorer.run(fakeLandscape)
+
 
 def test_gpr_bo():
-    explorer = baselines.explorers.GPR_BO(
-        model=fakeModel,
-        rounds=3,
-        sequences_batch_size=5,
-        model_queries_per_batch=20,
-        starting_sequence=starting_sequence,
-        alphabet="ATCG",
-    )
-    explorer.run(fakeLandscape)
+    for num_workers in [1, 2]:
+        explorer = baselines.explorers.GPR_BO(
+            model=fakeModel,
+            rounds=3,
+            sequences_batch_size=5,
+            model_queries_per_batch=20,
+            starting_sequence=starting_sequence,
+            alphabet="ATCG",
+            num_workers=num_workers,
+        )
+        explorer.run(fakeLandscape)
 
 
 def test_dqn():
@@ -84,45 +102,245 @@ def test_dqn():
 
 
 def test_dynappo():
-    explorer = baselines.explorers.DynaPPO(
+    for backend in ["tf_agents", "torch"]:
+        explorer = baselines.explorers.DynaPPO(
+            landscape=fakeLandscape,
+            rounds=3,
+            sequences_batch_size=5,
+            model_queries_per_batch=20,
+            starting_sequence=starting_sequence,
+            alphabet="ATCG",
+            num_experiment_rounds=1,
+            num_model_rounds=1,
+            backend=backend,
+        )
+        explorer.run(fakeLandscape)
+
+
+def test_dynappo_mutative():
+    for num_workers, backend in [(1, "tf_agents"), (1, "torch"), (2, "torch")]:
+        explorer = baselines.explorers.DynaPPOMutative(
+            landscape=fakeLandscape,
+            rounds=3,
+            sequences_batch_size=5,
+            model_queries_per_batch=20,
+            starting_sequence=starting_sequence,
+            alphabet="ATCG",
+            model=fakeModel,
+            num_experiment_rounds=1,
+            num_model_rounds=1,
+            num_workers=num_workers,
+            backend=backend,
+        )
+        explorer.run(fakeLandscape)
+        explorer.close()
+        assert explorer.env.landscape_pool._executor is None
+
+    # With one round, experiment-based training uses up the whole batch
+    explorer = baselines.explorers.DynaPPOMutative(
         landscape=fakeLandscape,
-        rounds=3,
+        rounds=1,
         sequences_batch_size=5,
         model_queries_per_batch=20,
         starting_sequence=starting_sequence,
         alphabet="ATCG",
+        model=fakeModel,
         num_experiment_rounds=1,
         num_model_rounds=1,
+        backend="torch",
     )
-    explorer.run(fakeLandscape)
+    sequences_data, _ = explorer.run(fakeLandscape)
+    assert len(sequences_data) == 1
+
+
+def test_dynappo_ensemble():
+    class CountingModel(FakeModel):
+        def __init__(self, name, constant):
+            super().__init__(name)
+            self.constant = constant
+            self.num_trainings = 0
+
+        def _fitness_function(self, sequences):
+            if self.constant:
+                return np.zeros(len(sequences))
+            return np.array([seq.count("A") for seq in sequences], dtype=float)
+
+        def train(self, *args, **kwargs):
+            self.num_trainings += 1
+
+    models = [CountingModel("Constant", True), CountingModel("CountA", False)]
+    ensemble = baselines.explorers.dyna_ppo.DynaPPOEnsemble(
+        len(starting_sequence), "ATCG", models=models, max_workers=2, patience=2
+    )
+
+    sequences = ["".join(np.random.choice(list("ATCG"), 8)) for _ in range(40)]
+    labels = np.array([seq.count("A") for seq in sequences], dtype=float)
+    for _ in range(4):
+        ensemble.train(sequences, labels)
+
+    # The constant model always has r^2 = 0, so it stops being refit after 2 rounds
+    assert models[0].num_trainings == 2
+    assert models[1].num_trainings == 4
+    assert ensemble.r_squared_vals[0] == 0
+    assert ensemble.get_fitness(sequences).shape == (len(sequences),)
+
+
+def test_ppo():
+    for backend in ["tf_agents", "torch"]:
+        explorer = baselines.explorers.PPO(
+            model=fakeModel,
+            rounds=3,
+            sequences_batch_size=5,
+            model_queries_per_batch=20,
+            starting_sequence=starting_sequence,
+            alphabet="ATCG",
+            backend=backend,
+        )
+        explorer.run(fakeLandscape)
 
 
 def test_cmaes():
-    explorer = baselines.explorers.CMAES(
-        fakeModel,
-        population_size=15,
-        max_iter=200,
-        initial_variance=0.3,
+    for covariance in ["full", "diagonal", "vd"]:
+        explorer = baselines.explorers.CMAES(
+            fakeModel,
+            population_size=15,
+            max_iter=200,
+            initial_variance=0.3,
+            rounds=3,
+            starting_sequence=starting_sequence,
+            sequences_batch_size=5,
+            model_queries_per_batch=20,
+            alphabet="ATCG",
+            covariance=covariance,
+        )
+        explorer.run(fakeLandscape)
+
+
+def test_genetic_algorithm():
+    for parent_selection_strategy in ["top-proportion", "wright-fisher"]:
+        explorer = baselines.explorers.GeneticAlgorithm(
+            model=fakeModel,
+            rounds=3,
+            sequences_batch_size=5,
+            model_queries_per_batch=50,
+            starting_sequence=starting_sequence,
+            alphabet="ATCG",
+            population_size=10,
+            parent_selection_strategy=parent_selection_strategy,
+            children_proportion=0.5,
+            parent_selection_proportion=0.5,
+            beta=0.01,
+            recombination_rate=0.2,
+        )
+        explorer.run(fakeLandscape)
+
+
+def test_cbas():
+    vae = baselines.explorers.VAE(
+        len(starting_sequence), "ATCG", epochs=2, verbose=False
+    )
+    for replay_size in [None, 10]:
+        explorer = baselines.explorers.CbAS(
+            fakeModel,
+            vae,
+            rounds=3,
+            starting_sequence=starting_sequence,
+            sequences_batch_size=5,
+            model_queries_per_batch=20,
+            alphabet="ATCG",
+            replay_size=replay_size,
+        )
+        explorer.run(fakeLandscape)
+
+
+def test_vae_execution_mode():
+    # Creating a VAE must not switch other keras models to eager execution
+    run_eagerly = tf.config.functions_run_eagerly()
+    vae = baselines.explorers.VAE(
+        len(starting_sequence), "ATCG", epochs=1, validation_split=0, verbose=False
+    )
+    assert tf.config.functions_run_eagerly() == run_eagerly
+
+    mlp = baselines.models.MLP(len(starting_sequence), 4, "ATCG", epochs=1)
+    assert not mlp.model.run_eagerly
+
+    vae.train_model([starting_sequence] * 4, np.ones(4))
+    assert tf.config.functions_run_eagerly() == run_eagerly
+
+
+def test_run_iter():
+    explorer = baselines.explorers.Random(
+        model=fakeModel,
         rounds=3,
-        starting_sequence=starting_sequence,
         sequences_batch_size=5,
         model_queries_per_batch=20,
+        starting_sequence=starting_sequence,
         alphabet="ATCG",
     )
-    explorer.run(fakeLandscape)
 
-
-def test_cbas():
-    vae = baselines.explorers.VAE(
-        len(starting_sequence), "ATCG", epochs=2, verbose=False
+    records = list(explorer.run_iter(fakeLandscape))
+    assert [record["round"] for record in records] == [0, 1, 2, 3]
+    assert records[-1]["measurement_cost"] == 1 + sum(
+        len(record["sequences_data"]) for record in records[1:]
     )
-    explorer = baselines.explorers.CbAS(
-        fakeModel,
-        vae,
+    assert "stop_reason" not in records[-1]["metadata"]
+
+    # Runs end early once the target fitness or the deadline is reached
+    records = list(explorer.run_iter(fakeLandscape, target_fitness=0))
+    assert len(records) == 1
+    assert records[-1]["metadata"]["stop_reason"] == "target_fitness"
+
+    sequences_data, metadata = explorer.run(fakeLandscape, deadline=0)
+    assert len(sequences_data) == 1 and metadata["stop_reason"] == "deadline"
+
+
+def test_time_budgets():
+    explorer = baselines.explorers.Adalead(
+        model=fakeModel,
         rounds=3,
+        sequences_batch_size=5,
+        model_queries_per_batch=2000,
         starting_sequence=starting_sequence,
+        alphabet="ATCG",
+    )
+    with pytest.raises(ValueError):
+        explorer.set_time_budgets(round_time_budget=-1)
+
+    # Rounds stop early with the candidates found so far
+    explorer.set_time_budgets(round_time_budget=1e-9, clock="cpu")
+    sequences_data, metadata = explorer.run(fakeLandscape)
+    assert sequences_data["round"].max() == 3
+    assert metadata["time_budget"]["binding_constraints"] == ["round_time"] * 3
+    assert sequences_data["model_cost"].max() < 3 * 2000
+
+    # Every explorer proposes at least one candidate per round
+    common = dict(
+        model=fakeModel,
+        rounds=2,
         sequences_batch_size=5,
-        model_queries_per_batch=20,
+        model_queries_per_batch=200,
+        starting_sequence=starting_sequence,
         alphabet="ATCG",
     )
-    explorer.run(fakeLandscape)
+    for budgeted in [
+        baselines.explorers.GeneticAlgorithm(
+            **common,
+            population_size=10,
+            parent_selection_strategy="top-proportion",
+            children_proportion=0.5,
+            parent_selection_proportion=0.5,
+        ),
+        baselines.explorers.CMAES(**common, population_size=10, max_iter=200),
+        baselines.explorers.DQN(**common),
+        baselines.explorers.BO(**common),
+    ]:
+        budgeted.set_time_budgets(round_time_budget=1e-9, clock="cpu")
+        sequences_data, metadata = budgeted.run(fakeLandscape, verbose=False)
+        assert (sequences_data["round"].value_counts()[[1, 2]] > 0).all()
+        assert metadata["time_budget"]["binding_constraints"] == ["round_time"] * 2
+
+    # No round is started once the total budget is spent
+    explorer.set_time_budgets(total_time_budget=1e-9)
+    sequences_data, metadata = explorer.run(fakeLandscape)
+    assert sequences_data["round"].max() == 0
+    assert metadata["stop_reason"] == "total_time_budget"
@@ -1,6 +1,10 @@
+import os
 import shutil
 import warnings
 
+import numpy as np
+import pytest
+
 import flexs
 from flexs.utils import sequence_utils as s_utils
 
@@ -51,6 +55,102 @@ def test_tf_binding():
     test_seqs = s_utils.generate_random_sequences(8, 100, s_utils.DNAA)
     landscape.get_fitness(test_seqs)
 
+    scan = landscape.mutational_scan(test_seqs[0], s_utils.DNAA)
+    assert scan.shape == (8, 4)
+    assert np.allclose(
+        scan,
+        flexs.Landscape._mutational_scan(landscape, test_seqs[0], s_utils.DNAA),
+    )
+
+
+def test_nk():
+    for name in ["dna_N10_K1", "protein_N10_K2"]:
+        problem = flexs.landscapes.nk.registry()[name]
+        landscape = flexs.landscapes.NKLandscape(**problem["params"])
+
+        fitnesses = landscape.get_fitness(problem["starts"])
+        assert ((fitnesses >= 0) & (fitnesses <= 1)).all()
+
+    # Parameters are reproducible from the seed
+    landscape = flexs.landscapes.NKLandscape(20, 3, neighborhood="random", seed=1)
+    same_landscape = flexs.landscapes.NKLandscape(20, 3, neighborhood="random", seed=1)
+    test_seqs = s_utils.generate_random_sequences(20, 100, s_utils.DNAA)
+    assert np.allclose(
+        landscape.get_fitness(test_seqs), same_landscape.get_fitness(test_seqs)
+    )
+
+
+def test_potts():
+    problem = flexs.landscapes.potts.registry()["protein_L10_c1.0"]
+    landscape = flexs.landscapes.PottsLandscape(**problem["params"], batch_size=7)
+
+    # Compare against the explicit sum over fields and pairs
+    test_seqs = s_utils.generate_random_sequences(10, 20, s_utils.AAS)
+    expected = []
+    for seq in s_utils.sequences_to_indices(test_seqs, s_utils.AAS):
+        energy = sum(landscape.fields[i, seq[i]] for i in range(10))
+        for i in range(10):
+            for j in range(i + 1, 10):
+                energy += landscape.couplings[i, j, seq[i], seq[j]]
+        expected.append(energy / np.sqrt(10))
+    assert np.allclose(landscape.get_fitness(test_seqs), expected, atol=1e-5)
+
+    assert np.allclose(
+        landscape.mutational_scan(test_seqs[0], s_utils.AAS),
+        flexs.Landscape._mutational_scan(landscape, test_seqs[0], s_utils.AAS),
+        atol=1e-5,
+    )
+
+
+def test_tabulated(tmp_path):
+    landscape = flexs.landscapes.NKLandscape(6, 2, seed=0)
+    table_path = str(tmp_path / "nk.npy")
+
+    # Fill one chunk, then resume the build from a new object
+    partial = flexs.landscapes.TabulatedLandscape(
+        landscape, 6, s_utils.DNAA, table_path, chunk_size=1000, build=False
+    )
+    partial._write_chunks(
+        [0],
+        [(0, 1000)],
+        [landscape.get_fitness(list(map(partial.index_to_sequence, range(1000))))],
+    )
+    assert not partial.is_built
+
+    tabulated = flexs.landscapes.TabulatedLandscape(
+        landscape, 6, s_utils.DNAA, table_path, chunk_size=1000
+    )
+    assert tabulated.is_built
+    assert landscape.cost == 4**6
+
+    test_seqs = s_utils.generate_random_sequences(6, 100, s_utils.DNAA)
+    assert np.allclose(
+        tabulated.get_fitness(test_seqs), landscape.get_fitness(test_seqs)
+    )
+    assert np.allclose(
+        tabulated.get_fitness_by_index(tabulated.sequences_to_index(test_seqs)),
+        landscape.get_fitness(test_seqs),
+    )
+
+    best = tabulated.metadata["argmax_sequence"]
+    assert np.isclose(landscape.get_fitness([best])[0], tabulated.metadata["max"])
+    assert np.isclose(tabulated.regret(tabulated.get_fitness([best])), 0)
+    assert tabulated.percentile(tabulated.get_fitness([best]))[0] >= 0.99
+
+    assert tabulated.percentile(tabulated.get_fitness([best]), max_samples=100)[0] == 1
+
+    # A lost table is rebuilt rather than served from stale completion flags
+    os.remove(table_path)
+    rebuilt = flexs.landscapes.TabulatedLandscape(
+        landscape, 6, s_utils.DNAA, table_path, chunk_size=1000, build=False
+    )
+    assert not rebuilt.is_built and "max" not in rebuilt.metadata
+    rebuilt.build()
+    assert np.allclose(rebuilt.get_fitness(test_seqs), landscape.get_fitness(test_seqs))
+
+    with pytest.raises(ValueError):
+        flexs.landscapes.TabulatedLandscape(landscape, 7, s_utils.DNAA, table_path)
+
 
 # TODO: This test takes too long for github actions. Needs further investigation.
 """
@@ -77,6 +77,33 @@ def test_keras_models():
     mlp.get_fitness(["ATC"])
 
 
+def test_stacked_ensemble():
+    alphabet = flexs.utils.sequence_utils.DNAA
+    sequences = ["ATCG", "ATGG", "AAAA", "CGTA", "GGCA", "TTTA"]
+    labels = [seq.count("A") for seq in sequences]
+
+    for architecture in ["mlp", "cnn"]:
+        ens = baselines.models.StackedEnsemble(
+            seq_len=4,
+            alphabet=alphabet,
+            num_members=3,
+            architecture=architecture,
+            hidden_size=4,
+            num_filters=2,
+            kernel_size=2,
+            combine_with=lambda x: x,
+            epochs=2,
+        )
+        ens.train(sequences, labels)
+        assert ens.get_fitness(sequences).shape == (len(sequences), 3)
+
+    ens = baselines.models.StackedEnsemble(seq_len=4, alphabet=alphabet, num_members=2)
+    assert ens.get_fitness(sequences).shape == (len(sequences),)
+
+    with pytest.raises(ValueError):
+        baselines.models.StackedEnsemble(4, alphabet, architecture="rnn")
+
+
 def test_noisy_abstract_model():
     nam = baselines.models.NoisyAbstractModel(
         landscape=FakeLandscape(name="FakeLandscape")
@@ -113,3 +140,170 @@ def test_sklearn_models():
             m.get_fitness(["ATC"])
         m.train(["ATC", "ATG"], [1, 2])
         m.get_fitness(["ATC"])
+
+
+def test_model_cache(tmp_path):
+    cache = flexs.ModelCache(str(tmp_path))
+    sequences, labels = ["ATC", "ATG", "AAA", "CCC"], [1.0, 2.0, 3.0, 4.0]
+
+    model = flexs.CachedModel(
+        baselines.models.LinearRegression(flexs.utils.sequence_utils.DNAA), cache
+    )
+    model.train(sequences, labels)
+    assert cache.stats()["misses"] == 1 and len(cache) == 1
+
+    # A fresh model of the same configuration is restored instead of trained
+    restored = flexs.CachedModel(
+        baselines.models.LinearRegression(flexs.utils.sequence_utils.DNAA), cache
+    )
+    restored.train(sequences, labels)
+    assert cache.stats()["hits"] == 1
+    assert np.allclose(restored.get_fitness(sequences), model.get_fitness(sequences))
+
+    mlp = flexs.CachedModel(
+        baselines.models.MLP(3, 4, flexs.utils.sequence_utils.DNAA, epochs=1), cache
+    )
+    mlp.train(sequences, labels)
+    restored_mlp = flexs.CachedModel(
+        baselines.models.MLP(3, 4, flexs.utils.sequence_utils.DNAA, epochs=1), cache
+    )
+    restored_mlp.train(sequences, labels)
+    assert cache.stats()["hits"] == 2
+    assert np.allclose(restored_mlp.get_fitness(sequences), mlp.get_fitness(sequences))
+
+    # Different data or seeds miss, and eviction keeps the cache under its budget
+    model.train(sequences, [4.0, 3.0, 2.0, 1.0])
+    flexs.CachedModel(model.model, cache, seed=1).train(sequences, labels)
+    assert cache.stats()["misses"] == 4
+
+    small_cache = flexs.ModelCache(str(tmp_path / "small"), max_size_bytes=1)
+    flexs.CachedModel(model.model, small_cache).train(sequences, labels)
+    assert len(small_cache) == 0
+
+
+def test_prediction_cache():
+    class CountingModel(FakeConstantModel):
+        def __init__(self, constant):
+            super().__init__(constant)
+            self.num_scored = 0
+
+        def _fitness_function(self, sequences):
+            self.num_scored += len(sequences)
+            return super()._fitness_function(sequences)
+
+        def train(self, sequences, labels):
+            self.constant = np.mean(labels)
+
+    model = CountingModel(1)
+    model.enable_prediction_cache()
+    assert list(model.get_fitness(["ATC", "ATG", "ATC"])) == [1, 1, 1]
+    assert list(model.get_fitness(["ATC", "ATG"])) == [1, 1]
+    assert model.num_scored == 2 and model.cost == 5
+    assert model.prediction_cache_stats()["hits"] == 3
+
+    # Training (even through a subclass override) invalidates the cache
+    model.train(["ATC"], [2])
+    assert list(model.get_fitness(["ATC"])) == [2]
+    assert model.num_scored == 3
+
+    model.enable_prediction_cache(count_hits_as_cost=False)
+    model.cost = 0
+    model.get_fitness(["ATC", "ATC", "CCC"])
+    assert model.cost == 2
+
+    ens = flexs.Ensemble(
+        [FakeConstantModel(1), FakeConstantModel(2)], combine_with=lambda x: x
+    )
+    ens.enable_prediction_cache()
+    assert ens.get_fitness(["ATC", "ATC"]).shape == (2, 2)
+
+    explorer = baselines.explorers.Random(
+        model=model,
+        rounds=2,
+        sequences_batch_size=5,
+        model_queries_per_batch=20,
+        starting_sequence="ATCATCAT",
+        alphabet="ATCG",
+    )
+    _, metadata = explorer.run(FakeLandscape(name="FakeLandscape"), verbose=False)
+    assert "hit_rate" in metadata["prediction_cache"]
+
+
+def test_get_fitness_mutants():
+    alphabet = flexs.utils.sequence_utils.DNAA
+    sequences = ["ATCG", "ATGG", "AAAA", "CGTA", "GGCA", "TTTA"]
+    labels = [seq.count("A") for seq in sequences]
+    parent = "ATCG"
+    mutations = [[(0, "C")], [(1, "G"), (3, "A")], [], [(2, "C")]]
+    mutants = flexs.utils.sequence_utils.apply_mutations(parent, mutations)
+    assert mutants == ["CTCG", "AGCA", "ATCG", "ATCG"]
+
+    models = [
+        baselines.models.MLP(seq_len=4, hidden_size=8, alphabet=alphabet, epochs=1),
+        baselines.models.GlobalEpistasisModel(
+            seq_len=4, hidden_size=8, alphabet=alphabet, epochs=1
+        ),
+        baselines.models.CNN(
+            seq_len=4, num_filters=2, hidden_size=2, kernel_size=2, alphabet=alphabet
+        ),
+        baselines.models.LinearRegression(alphabet),
+        # Linear in its features, but predicts `exp(X @ coef_ + intercept_)`
+        baselines.models.SklearnRegressor(
+            sklearn.linear_model.PoissonRegressor(), alphabet, "poisson_regression"
+        ),
+        baselines.models.RandomForest(alphabet),
+        FakeConstantModel(1),
+    ]
+    for model in models:
+        model.train(sequences, labels)
+        cost = model.cost
+        assert np.allclose(
+            model.get_fitness_mutants(parent, mutations),
+            model.get_fitness(mutants),
+            atol=1e-5,
+        )
+        assert model.cost == cost + 2 * len(mutations)
+
+
+def test_mutational_scan():
+    alphabet = flexs.utils.sequence_utils.DNAA
+    sequences = ["ATCG", "ATGG", "AAAA", "CGTA", "GGCA", "TTTA"]
+    labels = [seq.count("A") for seq in sequences]
+    parent = "ATCG"
+    mutants = flexs.utils.sequence_utils.generate_single_mutants(parent, alphabet)[1:]
+
+    models = [
+        baselines.models.MLP(seq_len=4, hidden_size=8, alphabet=alphabet, epochs=1),
+        baselines.models.LinearRegression(alphabet),
+        baselines.models.RandomForest(alphabet),
+    ]
+    for model in models:
+        model.train(sequences, labels)
+        scan = model.mutational_scan(parent, alphabet)
+        assert scan.shape == (4, 4)
+        assert np.allclose(scan.ravel(), model.get_fitness(mutants), atol=1e-5)
+        assert model.cost == 13 + 16
+
+    ens = flexs.Ensemble(models, combine_with=lambda x: x)
+    assert ens.mutational_scan(parent, alphabet).shape == (4, 4, 3)
+
+
+def test_linear_mutational_scan():
+    alphabet = flexs.utils.sequence_utils.DNAA
+    sequences = ["ATCG", "ATGG", "AAAA", "CGTA", "GGCA", "TTTA"]
+    labels = [seq.count("A") for seq in sequences]
+    parent = "ATCG"
+
+    models = [
+        baselines.models.LinearRegression(alphabet),
+        baselines.models.SklearnRegressor(
+            sklearn.linear_model.PoissonRegressor(), alphabet, "poisson_regression"
+        ),
+    ]
+    for model in models:
+        model.train(sequences, labels)
+        scan = model.mutational_scan(parent, alphabet)
+        for i in range(len(parent)):
+            for j, residue in enumerate(alphabet):
+                mutant = parent[:i] + residue + parent[i + 1 :]
+                assert np.isclose(scan[i, j], model.get_fitness([mutant])[0])
@@ -0,0 +1,135 @@
+import numpy as np
+
+from flexs.utils import sequence_utils as s_utils
+from flexs.utils.candidate_pool import CandidatePool
+from flexs.utils.delta_sequences import DeltaSequence, Reference, materialize
+from flexs.utils.hamming_index import HammingDensityIndex
+from flexs.utils.packed_sequences import PackedSequences
+
+
+def hamming_distance(seq1, seq2):
+    return sum(c1 != c2 for c1, c2 in zip(seq1, seq2))
+
+
+def test_hamming_density_index():
+    rng = np.random.default_rng(0)
+    index = HammingDensityIndex(seq_len=10, alphabet=s_utils.RNAA, initial_capacity=4)
+    values = {}
+
+    start = "A" * 10
+    for _ in range(3):
+        # Mutate the same parent so that many sequences are within the radius
+        seqs = [
+            "".join(
+                c if rng.random() > 0.15 else rng.choice(list("ACGU")) for c in start
+            )
+            for _ in range(30)
+        ]
+        fitnesses = rng.random(len(seqs))
+        index.add(seqs, fitnesses)
+        values.update(zip(seqs, fitnesses))
+
+        queries = seqs[:10] + ["C" * 10]
+        expected = [
+            sum(
+                v / hamming_distance(s, q)
+                for s, v in values.items()
+                if 0 < hamming_distance(s, q) <= 2
+            )
+            for q in queries
+        ]
+        assert np.allclose(index.density(queries), expected)
+
+    assert len(index) == len(values)
+
+
+def test_delta_sequences():
+    wt = s_utils.generate_random_sequences(50, 1, s_utils.AAS)[0]
+    seqs = [s_utils.generate_random_mutant(wt, 0.1, s_utils.AAS) for _ in range(20)]
+
+    reference = Reference(wt, s_utils.AAS)
+    deltas = reference.encode(seqs)
+    assert [str(seq) for seq in deltas] == seqs
+    assert list(materialize(deltas)) == seqs
+    assert all(seq.num_edits == hamming_distance(s, wt) for seq, s in zip(deltas, seqs))
+
+    # Equality and hashing do not depend on the reference
+    other_deltas = Reference(seqs[0], s_utils.AAS).encode(seqs)
+    assert deltas == other_deltas
+    assert len(set(deltas) | set(other_deltas)) == len(set(seqs))
+    assert deltas[1].hamming_distance(other_deltas[2]) == hamming_distance(
+        seqs[1], seqs[2]
+    )
+
+    mutations = [(0, "A"), (3, wt[3])]
+    mutant = deltas[5].mutate(mutations)
+    assert str(mutant) == s_utils.apply_mutations(seqs[5], [mutations])[0]
+    assert mutant == DeltaSequence.from_sequence(str(mutant), reference)
+    assert mutant[0] == "A" and mutant[3] == wt[3]
+    assert reference.encode([]) == []
+
+    # Delta sequences can be kept in a diverse candidate pool
+    pool = CandidatePool(5, min_distance=3)
+    pool.add(deltas, np.arange(len(deltas)))
+    members = list(pool.top()[0])
+    assert all(
+        s1.hamming_distance(s2) >= 3 for s1 in members for s2 in members if s1 is not s2
+    )
+
+
+def test_packed_sequences():
+    for alphabet, bits in [
+        (s_utils.DNAA, 2),
+        (s_utils.AAS, 5),
+        ("".join(map(chr, range(40, 80))), 8),
+    ]:
+        seqs = s_utils.generate_random_sequences(70, 50, alphabet)
+        packed = PackedSequences.from_sequences(seqs, alphabet)
+        assert packed.bits == bits
+        assert list(packed.to_sequences()) == seqs
+
+        indices = s_utils.sequences_to_indices(seqs, alphabet)
+        assert np.array_equal(packed.one_hot(), np.eye(len(alphabet))[indices])
+
+        distances = np.array([[hamming_distance(s1, s2) for s2 in seqs] for s1 in seqs])
+        assert np.array_equal(packed.pairwise_hamming_distances(packed), distances)
+        assert np.array_equal(packed.hamming_distance(packed[3]), distances[3])
+
+        hashes = packed.hash()
+        assert np.array_equal(hashes, packed[::-1].hash()[::-1])
+        assert len(set(hashes.tolist())) == len(set(seqs))
+
+    empty = PackedSequences.from_sequences([], s_utils.DNAA)
+    assert len(empty) == 0 and len(empty.to_sequences()) == 0
+    assert empty.to_indices().shape == (0, 0) and len(empty.hash()) == 0
+
+
+def test_candidate_pool():
+    rng = np.random.default_rng(0)
+    seqs = s_utils.generate_random_sequences(10, 500, s_utils.DNAA)
+    scores = rng.random(len(seqs))
+    best = {seq: score for seq, score in zip(seqs, scores)}
+
+    # Only the top `capacity` distinct, non-excluded sequences are kept
+    pools = [CandidatePool(20, exclude=seqs[:5]) for _ in range(2)]
+    pools[0].add(seqs[:250], scores[:250])
+    pools[1].add(seqs[250:], scores[250:])
+    pools[0].merge(pools[1])
+
+    expected = sorted(set(seqs[5:]), key=best.get, reverse=True)[:20]
+    top_seqs, top_scores = pools[0].top()
+    assert list(top_seqs) == expected
+    assert np.allclose(top_scores, [best[seq] for seq in expected])
+    assert len(pools[0]) == 20 and expected[-1] in pools[0] and seqs[0] not in pools[0]
+    assert pools[0].min_score == best[expected[-1]]
+
+    # Members are kept at least `min_distance` apart
+    diverse = CandidatePool(10, min_distance=4)
+    diverse.add(seqs, scores)
+    members = list(diverse.top()[0])
+    assert all(
+        hamming_distance(s1, s2) >= 4
+        for i, s1 in enumerate(members)
+        for s2 in members[:i]
+    )
+    assert members[0] == max(best, key=best.get)